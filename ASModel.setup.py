@@ -41,6 +41,12 @@ extensions = [
         #extra_compile_args=["-Zi", "/Od"],
         #extra_link_args=["-debug"],        
         ),
+    Extension('ASModel.tideseries',
+        ['ASModel/tideseries.py'],
+        include_dirs = cython_include,
+        #extra_compile_args=["-Zi", "/Od"],
+        #extra_link_args=["-debug"],        
+        ),
     Extension('ASModel.river',
         ['ASModel/river.py'],
         include_dirs = cython_include,
@@ -53,6 +59,36 @@ extensions = [
         #extra_compile_args=["-Zi", "/Od"],
         #extra_link_args=["-debug"],        
         ),
+    Extension('ASModel.lrucache',
+        ['ASModel/lrucache.py'],
+        include_dirs = cython_include,
+        #extra_compile_args=["-Zi", "/Od"],
+        #extra_link_args=["-debug"],        
+        ),
+    Extension('ASModel.diskcache',
+        ['ASModel/diskcache.py'],
+        include_dirs = cython_include,
+        #extra_compile_args=["-Zi", "/Od"],
+        #extra_link_args=["-debug"],        
+        ),
+    Extension('ASModel.pathstore',
+        ['ASModel/pathstore.py'],
+        include_dirs = cython_include,
+        #extra_compile_args=["-Zi", "/Od"],
+        #extra_link_args=["-debug"],        
+        ),
+    Extension('ASModel.aswindows',
+        ['ASModel/aswindows.py'],
+        include_dirs = cython_include,
+        #extra_compile_args=["-Zi", "/Od"],
+        #extra_link_args=["-debug"],        
+        ),
+    Extension('ASModel.asclimate',
+        ['ASModel/asclimate.py'],
+        include_dirs = cython_include,
+        #extra_compile_args=["-Zi", "/Od"],
+        #extra_link_args=["-debug"],        
+        ),
     Extension('ASModel.station',
         ['ASModel/station.py'],
         include_dirs = cython_include,
@@ -81,5 +117,5 @@ extensions = [
 
 setup(
     name = 'ASModel',
-    ext_modules = cythonize(extensions),
+    ext_modules = cythonize(extensions, include_path=['ASModel']),
 )
@@ -30,10 +30,31 @@ from .station import DTA_DELTAT
 # ---  ASModel class
 from .asclass import ASModel
 from .asplume import ASPlume
+from .aswindows import ASWindows
+from .asclimate import ASClimatology
+from .asasync import AsyncASModel
 
 # ---  Static API
 from .asapi import init
+from .asapi import openDataset
+from .asapi import closeDataset
+from .asapi import getDataset
+from .asapi import getDatasetKeys
 from .asapi import getPointNames
 from .asapi import getTideSignal
 from .asapi import getOverflowData
+from .asapi import getOverflowDataBatch
+from .asapi import getOverflowWindows
+from .asapi import getClimatology
+from .asapi import iterOverflowData
 from .asapi import getOverflowPlumes
+from .asapi import iterOverflowPlumes
+from .asapi import getOverflowDataAndPlumes
+from .asapi import loadPlumes
+from .asapi import getLevelForResolution
+from .asapi import getPathCacheStats
+from .asapi import setPathCacheSize
+from .asapi import setDiskCache
+from .asapi import getResultCacheStats
+from .asapi import setResultCacheSize
+from .asapi import clearResultCache
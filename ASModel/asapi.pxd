@@ -8,7 +8,20 @@
 import cython
 cimport datetime
 
-@cython.locals (s_asModel = object)
+cpdef str          _getKey         (str dataDir)
+
+@cython.locals (key = str, mdl = object)
+cpdef str          openDataset     (str dataDir, bint default=*, bint reload=*)
+
+@cython.locals (mdl = object)
+cpdef              closeDataset    (str key)
+
+@cython.locals (k = str, mdls = list)
+cpdef object       getDataset      (object key=*)
+
+@cython.locals (keys = list)
+cpdef list         getDatasetKeys  ()
+
 cpdef              init            (str dataDir)
 
 cpdef str          getDataDir      ()
@@ -21,7 +34,32 @@ cpdef list         getPointTideNames(str name)
 
 cpdef list         getTideSignal   (datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt)
 
-cpdef list         getOverflowData (datetime.timedelta dt, list overflows, bint do_merge)
+cpdef list         getOverflowData (datetime.timedelta dt, list overflows, bint do_merge, bint match_tides=*)
+
+cpdef object       iterOverflowData(datetime.timedelta dt, list overflows, bint do_merge, bint match_tides=*, long nworkers=*)
+
+cpdef list         getOverflowDataBatch(datetime.timedelta dt, list scenarios, bint do_merge, bint match_tides=*)
+
+cpdef object       getOverflowWindows(datetime.timedelta dt, list overflows, bint do_merge, bint match_tides=*)
+
+cpdef object       getClimatology  (list names=*, datetime.datetime t_start=*, datetime.datetime t_end=*, datetime.timedelta step=*, bint match_tides=*)
+
+cpdef list         getOverflowPlumes(datetime.timedelta dt, list overflows, bint match_tides=*, bint lazy=*)
+
+cpdef object       iterOverflowPlumes(datetime.timedelta dt, list overflows, bint match_tides=*, bint lazy=*, long nworkers=*)
+
+cpdef tuple        getOverflowDataAndPlumes(datetime.timedelta dt, list overflows, bint do_merge, bint match_tides=*, bint lazy=*)
+
+cpdef              loadPlumes(list plumes, long level=*)
+
+cpdef dict         getPathCacheStats()
+
+cpdef              setPathCacheSize(long nbytes)
+
+cpdef              setDiskCache    (str fname=*, object key=*)
+
+cpdef dict         getResultCacheStats()
 
-cpdef list         getOverflowPlumes(datetime.timedelta dt, list overflows)
+cpdef              setResultCacheSize(long nbytes)
 
+cpdef              clearResultCache()
@@ -23,43 +23,121 @@ Modèle de calcul des temps d'arrivée d'une surverse
 API statique
 """
 
-from .asclass import ASModel
+import os
+import threading
 
-s_asModel = None
+from .asclass   import ASModel
+from .asclass   import RESULT_CACHE
+from .pathstore import PATH_CACHE
+from .pathstore import getLevelForResolution
+from .          import station
+
+s_lock    = threading.Lock()
+s_models  = {}      # Registre { répertoire normalisé: ASModel }
+s_default = None    # Clé de l'entrée par défaut
+
+def _getKey(dataDir):
+    return os.path.normcase( os.path.abspath(dataDir) )
+
+def openDataset(dataDir, default=False, reload=False):
+    """
+    La fonction openDataset() charge les données du répertoire dataDir
+    et les ajoute au registre, si elles n'y sont pas déjà. Avec reload,
+    les données sont relues. Avec default, ou si le registre n'a pas
+    d'entrée par défaut, l'entrée devient l'entrée par défaut des
+    fonctions du module.
+    La fonction retourne la clé de l'entrée, le répertoire normalisé.
+    Le chargement est fait hors du verrou, les requêtes sur les autres
+    entrées ne sont pas bloquées.
+    """
+    global s_default
+    key = _getKey(dataDir)
+    with s_lock:
+        mdl = None if reload else s_models.get(key)
+    if mdl is None:
+        mdl = ASModel(dataDir)
+        with s_lock:
+            if reload or key not in s_models: s_models[key] = mdl
+    with s_lock:
+        if default or s_default is None: s_default = key
+    return key
+
+def closeDataset(key):
+    """
+    La fonction closeDataset() retire l'entrée key du registre. Les
+    requêtes en cours sur l'entrée se terminent normalement.
+    """
+    global s_default
+    mdl = getDataset(key)
+    with s_lock:
+        for k, m in list(s_models.items()):
+            if m is mdl: del s_models[k]
+        if s_default not in s_models: s_default = None
+
+def getDataset(key=None):
+    """
+    La fonction getDataset() retourne le modèle (ASModel) de l'entrée
+    key du registre, ou de l'entrée par défaut si key est None.
+    key est le répertoire des données ou leur empreinte.
+    Lève KeyError si l'entrée n'existe pas.
+    """
+    with s_lock:
+        if key is None: key = s_default
+        try:
+            return s_models[key]
+        except KeyError:
+            pass
+        mdls = list( s_models.values() )
+    if key is not None:
+        k = _getKey(key)
+        for m in mdls:
+            if _getKey(m.getDataDir()) == k or m.getFingerprint() == key:
+                return m
+    raise KeyError('Dataset not opened: %s' % key)
+
+def getDatasetKeys():
+    """
+    La fonction getDatasetKeys() retourne la liste des clés du registre,
+    la clé par défaut en premier.
+    """
+    with s_lock:
+        keys = [ k for k in sorted(s_models.keys()) if k != s_default ]
+        if s_default in s_models: keys.insert(0, s_default)
+    return keys
 
 def init(dataDir):
     """
     La fonction init() doit être appelée avant toute utilisation de
-    xeq(...). Elle configure le système.
+    xeq(...). Elle configure le système: les données de dataDir sont
+    (re)chargées et deviennent l'entrée par défaut du registre.
     """
-    global s_asModel
-    s_asModel = ASModel(dataDir)
+    openDataset(dataDir, default=True, reload=True)
 
 def getDataDir():
     """
     La fonction getDataDir() retourne le répertoire des données
     """
-    return s_asModel.getDataDir()
+    return getDataset().getDataDir()
 
 def getInfo():
     """
     La fonction getInfo() retourne l'info sur les données.
     """
-    return s_asModel.getInfo()
+    return getDataset().getInfo()
 
 def getPointNames():
     """
     La fonction getPointNames() retourne la liste des noms
     des points de surverse.
     """
-    return s_asModel.getPointNames()
+    return getDataset().getPointNames()
 
 def getPointTideNames(name):
     """
     La fonction getPointTideNames() retourne la liste des noms
     des cycles de marée pour le point de surverse de nom 'name'.
     """
-    return s_asModel.getPointTideNames(name)
+    return getDataset().getPointTideNames(name)
 
 def getTideSignal(t_start, t_end, dt):
     """
@@ -69,9 +147,9 @@ def getTideSignal(t_start, t_end, dt):
     (temps, niveau d'eau).
     Tous les temps sont UTC.
     """
-    return s_asModel.getTideSignal(t_start, t_end, dt)
+    return getDataset().getTideSignal(t_start, t_end, dt)
 
-def getOverflowData(dt, overflows, do_merge):
+def getOverflowData(dt, overflows, do_merge, match_tides=False):
     """
     La fonction xeq(..) calcule les temps d'arrivée pour une surverse. L'intervalle de surverse
     est donné par [t_start, t_end], le pas de calcul est dt. Le calcul est effectué pour
@@ -79,7 +157,8 @@ def getOverflowData(dt, overflows, do_merge):
     son nom et la liste des cycles de marée. Une liste de marée vide implique tous les cycles.
     Par exemple: [ [p1, [c1, c2, c5]], [p2, []] ...].
     La valeur booléenne do_merge contrôle si les différents temps de transit sont agglomérés ou
-    gardés séparés.
+    gardés séparés. Avec match_tides, seul le cycle de marée le plus proche de la marée réelle
+    est utilisé.
 
     La fonction retourne l'information suivante:
     [
@@ -88,11 +167,116 @@ def getOverflowData(dt, overflows, do_merge):
     ]
     Tous les temps sont UTC.
     """
-    return s_asModel.getOverflowData(dt, overflows, do_merge)
+    return getDataset().getOverflowData(dt, overflows, do_merge, match_tides)
+
+def iterOverflowData(dt, overflows, do_merge, match_tides=False, nworkers=1):
+    """
+    Version générateur de getOverflowData: les résultats
+    (pnt_de_surverse, [...]) sont retournés au fur et à mesure,
+    dans l'ordre de fin de calcul si nworkers > 1.
+    Tous les temps sont UTC.
+    """
+    return getDataset().iterOverflowData(dt, overflows, do_merge, match_tides, nworkers)
+
+def getOverflowDataBatch(dt, scenarios, do_merge, match_tides=False):
+    """
+    Version par lots de getOverflowData, pour une liste de scénarios,
+    chacun une liste de surverses. Les calculs communs aux scénarios
+    ne sont faits qu'une seule fois.
+    La fonction retourne la liste des résultats de getOverflowData.
+    Tous les temps sont UTC.
+    """
+    return getDataset().getOverflowDataBatch(dt, scenarios, do_merge, match_tides)
+
+def getOverflowWindows(dt, overflows, do_merge, match_tides=False):
+    """
+    Version en colonnes de getOverflowData: les fenêtres d'exposition
+    sont retournées dans un ASWindows (tableau structuré NumPy),
+    exportable en .npz ou en DataFrame pandas.
+    Tous les temps sont UTC.
+    """
+    return getDataset().getOverflowWindows(dt, overflows, do_merge, match_tides)
+
+def getClimatology(names=None, t_start=None, t_end=None, step=station.DTA_DELTAT, match_tides=True):
+    """
+    La fonction getClimatology() retourne la climatologie d'exposition
+    (ASClimatology) des points de surverse names: les délais d'arrivée,
+    durées d'exposition et dilutions de pointe des déversements débutant
+    à chaque pas step de [t_start, t_end], par défaut toute la période de
+    la table des marées.
+    Tous les temps sont UTC.
+    """
+    return getDataset().getClimatology(names, t_start, t_end, step, match_tides)
 
-def getOverflowPlumes(dt, overflows):
+def getOverflowPlumes(dt, overflows, match_tides=False, lazy=True):
     """
     Retourne las param des particle path.
     Tous les temps sont UTC.
     """
-    return s_asModel.getOverflowPlumes(dt, overflows)
+    return getDataset().getOverflowPlumes(dt, overflows, match_tides, lazy)
+
+def iterOverflowPlumes(dt, overflows, match_tides=False, lazy=True, nworkers=1):
+    """
+    Version générateur de getOverflowPlumes: les panaches sont
+    retournés au fur et à mesure, par point de surverse.
+    Tous les temps sont UTC.
+    """
+    return getDataset().iterOverflowPlumes(dt, overflows, match_tides, lazy, nworkers)
+
+def getOverflowDataAndPlumes(dt, overflows, do_merge, match_tides=False, lazy=True):
+    """
+    Combinaison de getOverflowData et getOverflowPlumes, en une seule
+    passe de calcul.
+    Tous les temps sont UTC.
+    """
+    return getDataset().getOverflowDataAndPlumes(dt, overflows, do_merge, match_tides, lazy)
+
+def loadPlumes(plumes, level=0):
+    """
+    La fonction loadPlumes() charge en parallèle les trajectoires des
+    panaches paresseux (lazy), au niveau de détail level.
+    """
+    station.loadPlumes(plumes, level)
+
+def getPathCacheStats():
+    """
+    La fonction getPathCacheStats() retourne les statistiques de la cache
+    des trajectoires (hits, misses, evictions, items, bytes, maxBytes).
+    """
+    return PATH_CACHE.getStats()
+
+def setPathCacheSize(nbytes):
+    """
+    La fonction setPathCacheSize() fixe la taille maximale en octets de la
+    cache des trajectoires, partagée par tous les modèles.
+    """
+    PATH_CACHE.setMaxBytes(nbytes)
+
+def setDiskCache(fname='', key=None):
+    """
+    La fonction setDiskCache() active la cache persistante des résultats
+    de l'entrée key du registre, dans le fichier SQLite fname, par défaut
+    dans le répertoire des données. Avec fname à None, elle est désactivée.
+    """
+    getDataset(key).setDiskCache(fname)
+
+def getResultCacheStats():
+    """
+    La fonction getResultCacheStats() retourne les statistiques de la
+    cache des résultats (hits, misses, evictions, items, bytes, maxBytes).
+    """
+    return RESULT_CACHE.getStats()
+
+def setResultCacheSize(nbytes):
+    """
+    La fonction setResultCacheSize() fixe la taille maximale en octets de
+    la cache des résultats, partagée par tous les modèles. Une taille
+    nulle désactive la cache.
+    """
+    RESULT_CACHE.setMaxBytes(nbytes)
+
+def clearResultCache():
+    """
+    La fonction clearResultCache() vide la cache des résultats.
+    """
+    RESULT_CACHE.clear()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Modèle de calcul des temps d'arrivée d'une surverse
+Interface asyncio
+
+Les requêtes sont exécutées dans un exécuteur, une tâche par surverse,
+ce qui ne bloque pas la boucle d'événements. L'annulation d'une requête,
+ou l'expiration de son délai (timeout), annule les surverses qui ne sont
+pas encore commencées.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from .asclass import ASModel
+from .        import asapi
+
+LOGGER = logging.getLogger("INRS.ASModel.async")
+
+class AsyncASModel:
+    def __init__(self, model, executor=None, nworkers=4):
+        """
+        La fonction __init__() construit l'interface asyncio du modèle
+        model, un ASModel ou un répertoire de données (ouvert dans le
+        registre de asapi). Les calculs sont faits dans executor, ou à
+        défaut dans un pool de nworkers threads géré par l'objet.
+        """
+        if isinstance(model, ASModel):
+            self.m_model = model
+        else:
+            self.m_model = asapi.getDataset( asapi.openDataset(model) )
+        self.m_ownExec  = executor is None
+        self.m_executor = executor if executor else concurrent.futures.ThreadPoolExecutor(nworkers, thread_name_prefix='ASModel')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        La fonction close() libère l'exécuteur s'il est géré par l'objet.
+        Les calculs en attente sont annulés.
+        """
+        if self.m_ownExec and self.m_executor:
+            self.m_executor.shutdown(wait=False, cancel_futures=True)
+        self.m_executor = None
+
+    def getModel(self):
+        """
+        La fonction getModel() retourne le modèle synchrone (ASModel).
+        """
+        return self.m_model
+
+    async def __run(self, func, timeout):
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self.m_executor, func)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            fut.cancel()
+
+    async def __gather(self, calls, timeout):
+        """
+        Exécute les appels calls, retourne leurs résultats dans l'ordre.
+        """
+        loop = asyncio.get_running_loop()
+        futs = [ loop.run_in_executor(self.m_executor, c) for c in calls ]
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futs), timeout)
+        finally:
+            for fut in futs: fut.cancel()
+
+    async def __iterCompleted(self, calls, timeout):
+        """
+        Exécute les appels calls, retourne (yield) leurs résultats dans
+        l'ordre de fin de calcul.
+        """
+        loop = asyncio.get_running_loop()
+        futs = [ loop.run_in_executor(self.m_executor, c) for c in calls ]
+        try:
+            for fut in asyncio.as_completed(futs, timeout=timeout):
+                yield await fut
+        finally:
+            for fut in futs: fut.cancel()
+
+    async def getPointNames(self, timeout=None):
+        """
+        Version asynchrone de ASModel.getPointNames()
+        """
+        return await self.__run(self.m_model.getPointNames, timeout)
+
+    async def getPointTideNames(self, name, timeout=None):
+        """
+        Version asynchrone de ASModel.getPointTideNames()
+        """
+        return await self.__run(functools.partial(self.m_model.getPointTideNames, name), timeout)
+
+    async def getTideSignal(self, t_start, t_end, dt, timeout=None):
+        """
+        Version asynchrone de ASModel.getTideSignal()
+        """
+        return await self.__run(functools.partial(self.m_model.getTideSignal, t_start, t_end, dt), timeout)
+
+    async def getOverflowData(self, dt, overflows, do_merge, match_tides=False, timeout=None):
+        """
+        Version asynchrone de ASModel.getOverflowData(). Les surverses
+        sont calculées en parallèle, le résultat est dans l'ordre des
+        surverses. timeout est le délai maximal [s] de la requête, au-delà
+        duquel asyncio.TimeoutError est levée.
+        """
+        calls = [ functools.partial(self.m_model.getOverflowData, dt, [o], do_merge, match_tides) for o in overflows ]
+        res = await self.__gather(calls, timeout)
+        return [ r for rs in res for r in rs ]
+
+    async def getOverflowPlumes(self, dt, overflows, match_tides=False, lazy=True, timeout=None):
+        """
+        Version asynchrone de ASModel.getOverflowPlumes(), résultat dans
+        l'ordre des surverses.
+        """
+        calls = [ functools.partial(self.m_model.getOverflowPlumes, dt, [o], match_tides, lazy) for o in overflows ]
+        res = await self.__gather(calls, timeout)
+        return [ r for rs in res for r in rs ]
+
+    async def iterOverflowData(self, dt, overflows, do_merge, match_tides=False, timeout=None):
+        """
+        Générateur asynchrone des résultats de getOverflowData(), sous la
+        forme (pnt_de_surverse, [...]), dans l'ordre de fin de calcul.
+        timeout est le délai maximal [s] pour l'ensemble des résultats.
+        """
+        calls = [ functools.partial(self.m_model.getOverflowData, dt, [o], do_merge, match_tides) for o in overflows ]
+        async for rs in self.__iterCompleted(calls, timeout):
+            for r in rs:
+                yield r
+
+    async def iterOverflowPlumes(self, dt, overflows, match_tides=False, lazy=True, timeout=None):
+        """
+        Générateur asynchrone des panaches (Plume), par point de surverse
+        dans l'ordre de fin de calcul.
+        """
+        calls = [ functools.partial(self.m_model.getOverflowPlumes, dt, [o], match_tides, lazy) for o in overflows ]
+        async for rs in self.__iterCompleted(calls, timeout):
+            for r in rs:
+                yield r
+
+    async def loadPlumes(self, plumes, level=0, timeout=None):
+        """
+        Version asynchrone de asapi.loadPlumes(): charge les trajectoires
+        des panaches paresseux (lazy) au niveau de détail level.
+        """
+        return await self.__run(functools.partial(asapi.loadPlumes, plumes, level), timeout)
+
+if __name__ == '__main__':
+    import datetime
+    import sys
+    import time
+    import pytz
+
+    def main():
+        import addLogLevel
+        addLogLevel.addLoggingLevel('TRACE', logging.DEBUG - 5)
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s %(levelname)s %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.DEBUG)
+
+        async def xeq(dataDir):
+            from .overflow import Overflow
+            async with AsyncASModel(dataDir) as mdl:
+                t0 = datetime.datetime.now(tz=pytz.utc)
+                dt = datetime.timedelta(seconds=900)
+                ovs = [ Overflow(n, t0, t0+datetime.timedelta(hours=12), []) for n in await mdl.getPointNames() ]
+                async for name, r in mdl.iterOverflowData(dt, ovs, True):
+                    LOGGER.info('%s: %d windows', name, len(r[0]) if r else 0)
+
+        asyncio.run( xeq(sys.argv[1] if len(sys.argv) > 1 else '.') )
+
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Headless batch evaluation of overflow scenarios
+
+A scenario file holds one overflow per record, either as CSV with
+a header line, or as JSON list of objects. The fields are:
+    id:         scenario id (optional, record index by default)
+    name:       overflow point name
+    start:      overflow start, iso format, UTC if no time zone
+    end:        overflow end, iso format, UTC if no time zone
+    tides:      tide cycle names, ';' separated in CSV, list in JSON
+                (optional, all cycles by default)
+    dataset:    data directory (optional, see option -D)
+
+The scenarios are grouped by dataset and evaluated in chunks on a
+process pool, each worker loading a dataset once. The results are
+written as JSON, or as CSV with one row per exposure time slot (and
+one row per plume in <output>.plumes.csv).
+"""
+
+import codecs
+import collections
+import concurrent.futures
+import csv
+import datetime
+import json
+import logging
+import optparse
+import os
+import sys
+import time
+
+try:
+    from .         import asapi
+    from .overflow import Overflow
+    from .tide     import fromisoformat
+except ImportError:
+    # ---  Run as a script, import from the package
+    selfDir = os.path.dirname( os.path.abspath(__file__) )
+    supPath = os.path.normpath( os.path.join(selfDir, '..') )
+    if os.path.isdir(supPath) and supPath not in sys.path: sys.path.append(supPath)
+    from ASModel          import asapi
+    from ASModel.overflow import Overflow
+    from ASModel.tide     import fromisoformat
+
+LOGGER = logging.getLogger("INRS.ASModel.batch")
+
+Scenario = collections.namedtuple('Scenario', ('id', 'name', 'start', 'end', 'tides', 'dataset', 'error'), defaults=('',))
+
+CSV_WINDOW_FIELDS = ('id', 'name', 'transit', 'part', 't_start', 't_end', 'dilution')
+CSV_PLUME_FIELDS  = ('id', 'name', 'parent', 't_injection', 't_contact', 'dilution', 'direct', 'length')
+
+def toDatetime(s):
+    """
+    Parse an iso string, naive times are UTC
+    """
+    t = fromisoformat(s.strip())
+    if t.tzinfo is None: t = t.replace(tzinfo=datetime.timezone.utc)
+    return t
+
+def toIso(t):
+    return t.isoformat() if isinstance(t, datetime.datetime) else None
+
+def _toScenario(i, rec, dataDir):
+    """
+    Scenario of the record rec. An invalid record gives a Scenario
+    with error set, to be reported without being evaluated.
+    """
+    sid = str(rec.get('id') or i)
+    dataset = rec.get('dataset') or dataDir
+    try:
+        tides = rec.get('tides') or []
+        if isinstance(tides, str):
+            tides = [ t.strip() for t in tides.split(';') if t.strip() ]
+        if not dataset:
+            raise ValueError('no dataset')
+        return Scenario(id      = sid,
+                        name    = rec['name'].strip(),
+                        start   = toDatetime(rec['start']),
+                        end     = toDatetime(rec['end']),
+                        tides   = list(tides),
+                        dataset = os.path.abspath(dataset))
+    except KeyError as e:
+        err = 'Missing field: %s' % e.args[0]
+    except (AttributeError, TypeError, ValueError) as e:
+        err = str(e)
+    LOGGER.warning('Scenario %s: invalid record: %s', sid, err)
+    return Scenario(id      = sid,
+                    name    = str(rec.get('name') or '').strip(),
+                    start   = None,
+                    end     = None,
+                    tides   = [],
+                    dataset = os.path.abspath(dataset) if dataset else '',
+                    error   = 'Invalid record: %s' % err)
+
+def readScenarios(fname, dataDir=None):
+    """
+    Read the scenario file fname, CSV or JSON on the file extension.
+    dataDir is the dataset of the records without one.
+    Returns the list of Scenario, with error set for the invalid records.
+    """
+    with codecs.open(fname, 'r', encoding='utf-8') as f:
+        if os.path.splitext(fname)[1].lower() == '.json':
+            recs = json.load(f)
+        else:
+            lines = [ l for l in f if l.strip() and l.lstrip()[0] != '#' ]
+            recs = list( csv.DictReader(lines, skipinitialspace=True) )
+    return [ _toScenario(i, rec, dataDir) for i, rec in enumerate(recs) ]
+
+# ---  Worker side: one model per dataset and per process, in the registry
+def _initWorker(level):
+    if not hasattr(logging, 'TRACE'):
+        import addLogLevel
+        addLogLevel.addLoggingLevel('TRACE', logging.DEBUG - 5)
+    logging.basicConfig(format="%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s")
+    logging.getLogger("INRS").setLevel(level)
+
+def _getModel(dataDir, cache=None):
+    mdl = asapi.getDataset( asapi.openDataset(dataDir) )
+    if cache is not None and not mdl.getDiskCache(): mdl.setDiskCache(cache)
+    return mdl
+
+def plumeToDict(plm):
+    return {
+        'name'        : plm.stationName,
+        'parent'      : plm.parentName,
+        't_injection' : toIso(plm.injectionTime),
+        't_contact'   : toIso(plm.contactTime),
+        'dilution'    : plm.dilution,
+        'direct'      : bool(plm.isPlumeDirect),
+        'length'      : plm.plumeLength,
+    }
+
+def windowsToList(wins):
+    """
+    Convert the exposure windows of doOverflow to nested lists
+    of (t_start, t_end, dilution), times as iso strings.
+    """
+    return [ [ [ (toIso(t0), toIso(t1), d) for t0, t1, d in p ] for p in ps ] for ps in wins ]
+
+def scenarioToDict(s):
+    """
+    Result of the scenario s, without windows nor plumes
+    """
+    return { 'id': s.id, 'name': s.name, 'start': toIso(s.start), 'end': toIso(s.end),
+             'tides': s.tides, 'dataset': s.dataset, 'windows': [], 'plumes': [], 'error': s.error }
+
+def runScenarios(dataDir, scenarios, dt, do_merge, match_tides, do_plumes, cache=None):
+    """
+    Evaluate the scenarios of the dataset dataDir.
+    With cache, the persistent result cache file, '' for the default
+    in the dataset directory, the results are reused between runs.
+    Returns a list of dict, one for each scenario, with only
+    serializable values.
+    """
+    mdl = _getModel(dataDir, cache)
+    res = []
+    ovs = {}
+    for i, s in enumerate(scenarios):
+        r = scenarioToDict(s)
+        res.append(r)
+        if s.error: continue
+        o = Overflow(s.name, s.start, s.end, s.tides)
+        err = o.isValid()
+        if err or s.name not in mdl.getPointNames():
+            r['error'] = err or 'Unknown point: %s' % s.name
+        else:
+            ovs[i] = o
+
+    # ---  Without plumes, all the scenarios in one batch
+    if not do_plumes and ovs:
+        try:
+            dtas = mdl.getOverflowDataBatch(dt, [ [o] for o in ovs.values() ], do_merge, match_tides)
+            for i, dta in zip(ovs, dtas):
+                for name, wins in dta:
+                    res[i]['windows'] = windowsToList(wins)
+            return res
+        except Exception as e:
+            LOGGER.exception('Batch of %d scenarios, evaluated one by one', len(ovs))
+
+    for i, o in ovs.items():
+        r = res[i]
+        try:
+            if do_plumes:
+                dta, pth = mdl.getOverflowDataAndPlumes(dt, [o], do_merge, match_tides, lazy=True)
+                r['plumes'] = [ plumeToDict(p) for p in pth if p.parentName ]     # skip the root, polygon only
+            else:
+                dta = mdl.getOverflowData(dt, [o], do_merge, match_tides)
+            for name, wins in dta:
+                r['windows'] = windowsToList(wins)
+        except Exception as e:
+            LOGGER.exception('Scenario %s', r['id'])
+            r['error'] = str(e)
+    return res
+
+# ---  Master side
+def _getChunks(scenarios, nworkers, chunkSize):
+    """
+    Group the scenarios by dataset, then split in chunks.
+    Yields (dataset, [(i, scenario), ...]) with i the scenario index.
+    """
+    grps = collections.OrderedDict()
+    for i, s in enumerate(scenarios):
+        if s.error: continue
+        grps.setdefault(s.dataset, []).append( (i, s) )
+    for ds, items in grps.items():
+        n = chunkSize if chunkSize > 0 else max(1, min(64, len(items) // (4*nworkers)))
+        for i in range(0, len(items), n):
+            yield ds, items[i:i+n]
+
+def runBatch(scenarios, dt=datetime.timedelta(seconds=900), do_merge=True, match_tides=False, do_plumes=False, nworkers=4, chunkSize=0, cache=None):
+    """
+    Evaluate the scenarios on a pool of nworkers processes. With
+    nworkers <= 1 the scenarios are evaluated in the calling process.
+    cache is the persistent result cache, see runScenarios.
+    The invalid scenarios are reported with their error.
+    Returns the results in the order of the scenarios.
+    """
+    t0 = time.time()
+    res = [ scenarioToDict(s) if s.error else None for s in scenarios ]
+    chunks = list( _getChunks(scenarios, max(nworkers, 1), chunkSize) )
+    if nworkers <= 1:
+        for ds, items in chunks:
+            rs = runScenarios(ds, [s for i, s in items], dt, do_merge, match_tides, do_plumes, cache)
+            for (i, s), r in zip(items, rs): res[i] = r
+    else:
+        lvl = logging.getLogger("INRS").getEffectiveLevel()
+        with concurrent.futures.ProcessPoolExecutor(nworkers, initializer=_initWorker, initargs=(lvl,)) as pool:
+            futs = { pool.submit(runScenarios, ds, [s for i, s in items], dt, do_merge, match_tides, do_plumes, cache): items for ds, items in chunks }
+            for fut in concurrent.futures.as_completed(futs):
+                items = futs[fut]
+                try:
+                    rs = fut.result()
+                except Exception as e:
+                    LOGGER.error('Chunk of %d scenarios failed: %s', len(items), str(e))
+                    rs = [ scenarioToDict(s._replace(error=str(e))) for i, s in items ]
+                for (i, s), r in zip(items, rs): res[i] = r
+    LOGGER.info('%d scenarios in %d chunks evaluated in %.3fs', len(scenarios), len(chunks), time.time()-t0)
+    return res
+
+def writeJSON(fname, results):
+    with codecs.open(fname, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+
+def writeCSV(fname, results, do_plumes=False):
+    """
+    Write the exposure windows, one row per time slot. Scenarios in
+    error or without exposure are written as a row with empty times.
+    The plumes are written in <fname>.plumes.csv.
+    """
+    with open(fname, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(CSV_WINDOW_FIELDS + ('error',))
+        for r in results:
+            n = 0
+            for it, ps in enumerate(r['windows']):
+                for ip, p in enumerate(ps):
+                    for t0, t1, d in p:
+                        w.writerow( (r['id'], r['name'], it, ip, t0, t1, d, '') )
+                        n += 1
+            if n == 0:
+                w.writerow( (r['id'], r['name'], '', '', '', '', '', r['error']) )
+    if not do_plumes: return
+    with open(os.path.splitext(fname)[0] + '.plumes.csv', 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(CSV_PLUME_FIELDS)
+        for r in results:
+            for p in r['plumes']:
+                w.writerow( (r['id'],) + tuple(p[k] for k in CSV_PLUME_FIELDS[1:]) )
+
+if __name__ == '__main__':
+    def main():
+        if not hasattr(logging, 'TRACE'):
+            import addLogLevel
+            addLogLevel.addLoggingLevel('TRACE', logging.DEBUG - 5)
+
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.INFO)
+
+        parser = optparse.OptionParser(usage='%prog [options] scenario_file output_file')
+        parser.add_option('-D', '--data',    dest='dataDir',  default=None,  help='dataset of the scenarios without one')
+        parser.add_option('-j', '--jobs',    dest='nworkers', default=4, type='int', help='parallel processes [%default]')
+        parser.add_option('-c', '--chunk',   dest='chunk',    default=0, type='int', help='scenarios per task, 0 for automatic [%default]')
+        parser.add_option('-t', '--dt',      dest='dt',       default=900.0, type='float', help='time step [s] [%default]')
+        parser.add_option('-s', '--split',   dest='merge',    default=True,  action='store_false', help='keep the river transit times separated')
+        parser.add_option('-m', '--match',   dest='match',    default=False, action='store_true',  help='use only the tide cycle matching the real tide')
+        parser.add_option('-p', '--plumes',  dest='plumes',   default=False, action='store_true',  help='compute the plumes')
+        parser.add_option('-C', '--cache',   dest='cache',    default=None,  action='store_const', const='', help='persistent result cache, in the dataset directory')
+        parser.add_option('--cache-file',    dest='cache',    metavar='FILE', help='persistent result cache file')
+        opts, args = parser.parse_args()
+        if len(args) != 2: parser.error('scenario_file and output_file are required')
+
+        try:
+            scns = readScenarios(args[0], opts.dataDir)
+        except (AttributeError, KeyError, ValueError) as e:
+            parser.error('invalid scenario file: %s' % str(e))
+        dt   = datetime.timedelta(seconds=opts.dt)
+        res  = runBatch(scns, dt, opts.merge, opts.match, opts.plumes, opts.nworkers, opts.chunk, opts.cache)
+        if os.path.splitext(args[1])[1].lower() == '.json':
+            writeJSON(args[1], res)
+        else:
+            writeCSV(args[1], res, opts.plumes)
+        nerr = sum(1 for r in res if r['error'])
+        if nerr: LOGGER.warning('%d scenarios in error', nerr)
+        sys.exit(1 if nerr else 0)
+
+    main()
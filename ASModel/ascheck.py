@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Dataset integrity checker
+
+Validation of a model delivery:
+    - the path files referenced by the points exist, in the path
+      directories or in the packed file;
+    - optionally (deep), the path files can be read and have the
+      expected shape;
+    - optionally, a dataset is included in a dataset of lower
+      dilution.
+The path directories are scanned in parallel, the references are
+checked with set operations on arrays. The result is a CheckReport,
+summarized at the end instead of one warning per problem.
+"""
+
+import collections
+import concurrent.futures
+import logging
+import optparse
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    from .river     import Rivers
+    from .station   import OverflowPoints
+    from .pathstore import PATH_NCOLS, readPathFile
+except ImportError:
+    # ---  Run as a script, import from the package
+    selfDir = os.path.dirname( os.path.abspath(__file__) )
+    supPath = os.path.normpath( os.path.join(selfDir, '..') )
+    if os.path.isdir(supPath) and supPath not in sys.path: sys.path.append(supPath)
+    from ASModel.river     import Rivers
+    from ASModel.station   import OverflowPoints
+    from ASModel.pathstore import PATH_NCOLS, readPathFile
+
+LOGGER = logging.getLogger("INRS.ASModel.check")
+
+MAX_DETAILS = 20        # Max number of details reported per category
+
+class CheckReport:
+    """
+    Counters and details of the problems found, by category
+    """
+    def __init__(self, title=''):
+        self.m_title = title
+        self.m_stats = collections.OrderedDict()    # name -> value
+        self.m_errs  = collections.OrderedDict()    # category -> count
+        self.m_dtls  = collections.OrderedDict()    # category -> [details]
+
+    def setStat(self, name, value):
+        self.m_stats[name] = value
+
+    def addError(self, category, detail='', count=1):
+        self.m_errs[category] = self.m_errs.get(category, 0) + count
+        dtls = self.m_dtls.setdefault(category, [])
+        if detail and len(dtls) < MAX_DETAILS: dtls.append(detail)
+
+    def getErrorCount(self):
+        return sum(self.m_errs.values())
+
+    def isOk(self):
+        return self.getErrorCount() == 0
+
+    def merge(self, other):
+        for k, v in other.m_stats.items(): self.m_stats[k] = v
+        for k, n in other.m_errs.items():
+            self.m_errs[k] = self.m_errs.get(k, 0) + n
+            dtls = self.m_dtls.setdefault(k, [])
+            dtls.extend(other.m_dtls.get(k, [])[:MAX_DETAILS-len(dtls)])
+
+    def __str__(self):
+        lines = []
+        lines.append('=== %s' % self.m_title)
+        for k, v in self.m_stats.items():
+            lines.append('   %-28s %s' % (k+':', v))
+        if self.isOk():
+            lines.append('   OK')
+        for k, n in self.m_errs.items():
+            lines.append('   ERROR %-22s %d' % (k+':', n))
+            for d in self.m_dtls[k]:
+                lines.append('      %s' % d)
+            if n > len(self.m_dtls[k]): lines.append('      ...')
+        return '\n'.join(lines)
+
+def loadPoints(dataDir):
+    """
+    Load the overflow points of the dataset in dataDir
+    """
+    rivers = Rivers()
+    rivers.load(dataDir)
+    points = OverflowPoints()
+    points.load(dataDir, rivers)
+    return points
+
+def _scanDir(pathDir):
+    """
+    Returns the md5 of the path files in pathDir
+    """
+    md5s = []
+    try:
+        with os.scandir(pathDir) as it:
+            for e in it:
+                if e.name.startswith('path-') and e.name.endswith('.pkl'):
+                    md5s.append(e.name[5:-4])
+    except FileNotFoundError:
+        return None
+    return np.array(md5s, dtype='U32')
+
+def scanPathDirs(pathDirs, nworkers=8):
+    """
+    Scan the directories in parallel.
+    Returns {dir: array of md5}, the array being None for a missing directory.
+    """
+    pathDirs = sorted(set(pathDirs))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=nworkers) as pool:
+        return dict( zip(pathDirs, pool.map(_scanDir, pathDirs)) )
+
+def _checkPathFile(fullPath):
+    """
+    Read a path file and check its shape. Returns '' or the error.
+    """
+    try:
+        pth = np.asarray(readPathFile(fullPath), dtype=np.float64)
+    except Exception as e:
+        return '%s: %s' % (os.path.basename(fullPath), e)
+    if pth.ndim != 2 or pth.shape[1] != PATH_NCOLS:
+        return '%s: bad shape %s' % (os.path.basename(fullPath), pth.shape)
+    if pth.shape[0] == 0:
+        return '%s: empty path' % os.path.basename(fullPath)
+    if not np.all(np.isfinite(pth)):
+        return '%s: non finite values' % os.path.basename(fullPath)
+    return ''
+
+def _checkPathFiles(fullPaths):
+    return [ _checkPathFile(f) for f in fullPaths ]
+
+def checkPaths(points, nworkers=8, deep=False):
+    """
+    Check that all the path files referenced by the points exist.
+    With deep, the files are read, in parallel processes, and their
+    shape checked.
+    Returns a CheckReport.
+    """
+    rpt = CheckReport('Paths: %s' % points.m_dataDir)
+    store = points.getPathStore()
+    packed = np.array(sorted(store.m_index.keys()) if store else [], dtype='U32')
+
+    # ---  Collect the references, by tuple of path dirs
+    refs = collections.OrderedDict()        # dirs -> [md5]
+    nref = 0
+    for name in points.getNames():
+        for m in points[name].m_tideRsp:
+            md5s = refs.setdefault(tuple(m.m_pathDirs), [])
+            for ix, dta in m.m_pathDta.items():
+                md5s.extend(md5 for iy, md5, dd in dta)
+                nref += len(dta)
+    allDirs = [ d for k in refs for d in k ]
+    t0 = time.time()
+    files = scanPathDirs(allDirs, nworkers)
+    LOGGER.info('checkPaths: %d directories scanned in %.2fs', len(files), time.time()-t0)
+    for d, md5s in files.items():
+        if md5s is None: rpt.addError('missing directory', d)
+    rpt.setStat('references', nref)
+    rpt.setStat('path directories', len(files))
+    rpt.setStat('path files', sum(len(v) for v in files.values() if v is not None))
+    rpt.setStat('packed paths', packed.shape[0])
+
+    # ---  Missing files, with set operations
+    found = {}                              # md5 -> full path, for deep
+    for dirs, md5s in refs.items():
+        md5s = np.unique(np.array(md5s, dtype='U32'))
+        miss = md5s[ ~np.isin(md5s, packed) ]
+        for d in dirs:
+            if files[d] is None or miss.shape[0] == 0: continue
+            isIn = np.isin(miss, files[d])
+            if deep:
+                for md5 in miss[isIn]: found.setdefault(md5, os.path.join(d, 'path-%s.pkl' % md5))
+            miss = miss[~isIn]
+        for md5 in miss:
+            rpt.addError('missing path file', 'path-%s.pkl in %s' % (md5, ', '.join(dirs)))
+
+    # ---  Read the files
+    if deep:
+        if store and store.isPacked():
+            bad = ~np.all(np.isfinite(store.m_data), axis=1)
+            if np.any(bad): rpt.addError('packed non finite rows', '%s' % np.nonzero(bad)[0][:MAX_DETAILS].tolist(), int(np.sum(bad)))
+        fullPaths = sorted(found.values())
+        chunks = [ fullPaths[i:i+256] for i in range(0, len(fullPaths), 256) ]
+        t0 = time.time()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=nworkers) as pool:
+            for errs in pool.map(_checkPathFiles, chunks):
+                for e in errs:
+                    if e: rpt.addError('bad path file', e)
+        LOGGER.info('checkPaths: %d path files read in %.2fs', len(fullPaths), time.time()-t0)
+        rpt.setStat('path files read', len(fullPaths))
+    return rpt
+
+def _tideKeys(m):
+    """
+    Returns the tide data of m as arrays (keys, dilution),
+    with keys = ix*2**20 + iy.
+    """
+    ks, vs = [], []
+    for ix, dta in m.m_tideDta.items():
+        for iy, a in dta:
+            ks.append( (ix << 20) + iy )
+            vs.append( a )
+    return np.array(ks, dtype=np.int64), np.array(vs, dtype=np.float64)
+
+def compareDatasets(points, other):
+    """
+    Check that the dataset other is included in points, of lower
+    dilution: same points, same tides, and every tide data (ix, iy, a)
+    of other present in points.
+    Returns a CheckReport.
+    """
+    rpt = CheckReport('Inclusion: %s in %s' % (other.m_dataDir, points.m_dataDir))
+    if points.m_dilution >= other.m_dilution:
+        rpt.addError('incoherent dilution', '%.2e >= %.2e' % (points.m_dilution, other.m_dilution))
+    nitm = 0
+    for name in other.getNames():
+        try:
+            spnt = points[name]
+        except KeyError:
+            rpt.addError('missing point', name)
+            continue
+        opnt = other[name]
+        sriv = spnt.m_river.name if spnt.m_river else None
+        oriv = opnt.m_river.name if opnt.m_river else None
+        if sriv != oriv:
+            rpt.addError('incoherent river', '%s: %s vs %s' % (name, sriv, oriv))
+        stides = { (m.m_dt, m.m_dh): m for m in spnt.m_tideRsp }
+        for om in opnt.m_tideRsp:
+            try:
+                sm = stides[(om.m_dt, om.m_dh)]
+            except KeyError:
+                rpt.addError('missing tide', '%s: %s' % (name, (om.m_dt, om.m_dh)))
+                continue
+            sk, sv = _tideKeys(sm)
+            ok, ov = _tideKeys(om)
+            nitm += ok.shape[0]
+            # ---  Items of other absent from self
+            isIn = np.isin(ok, sk)
+            for k in ok[~isIn]:
+                rpt.addError('missing item', '%s %s: (%d, %d)' % (name, (om.m_dt, om.m_dh), k >> 20, k & 0xFFFFF))
+            # ---  Common items with another dilution
+            order = np.argsort(sk)
+            pos   = order[ np.searchsorted(sk, ok[isIn], sorter=order) ]
+            bad   = sv[pos] != ov[isIn]
+            for k, a, b in zip(ok[isIn][bad], sv[pos][bad], ov[isIn][bad]):
+                rpt.addError('bad dilution', '%s %s: (%d, %d): %.2e %.2e' % (name, (om.m_dt, om.m_dh), k >> 20, k & 0xFFFFF, a, b))
+    rpt.setStat('points compared', len(other.getNames()))
+    rpt.setStat('items compared', nitm)
+    return rpt
+
+def checkDataset(dataDir, nworkers=8, deep=False, otherDir=None):
+    """
+    Check the dataset in dataDir, and its inclusion of the dataset
+    otherDir if given.
+    Returns a CheckReport.
+    """
+    t0 = time.time()
+    points = loadPoints(dataDir)
+    rpt = CheckReport('Dataset: %s' % dataDir)
+    rpt.setStat('dilution', '%.2e' % points.m_dilution)
+    rpt.setStat('points', len(points.getNames()))
+    rpt.setStat('tide cycles', len(points.getCycles()))
+    rpt.merge( checkPaths(points, nworkers, deep) )
+    if otherDir:
+        rpt.merge( compareDatasets(points, loadPoints(otherDir)) )
+    rpt.setStat('elapsed', '%.2fs' % (time.time()-t0))
+    return rpt
+
+if __name__ == '__main__':
+    import addLogLevel
+    addLogLevel.addLoggingLevel('TRACE', logging.DEBUG - 5)
+
+    def main():
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.INFO)
+
+        parser = optparse.OptionParser(usage='%prog [options] data_dir')
+        parser.add_option('-j', '--jobs',    dest='nworkers', default=8, type='int', help='parallel workers [%default]')
+        parser.add_option('-d', '--deep',    dest='deep',     default=False, action='store_true', help='read the path files and check their shape')
+        parser.add_option('-c', '--compare', dest='otherDir', default=None,  help='dataset of higher dilution, to be included in data_dir')
+        opts, args = parser.parse_args()
+        if len(args) != 1: parser.error('data_dir is required')
+
+        rpt = checkDataset(args[0], opts.nworkers, opts.deep, opts.otherDir)
+        print(rpt)
+        sys.exit(0 if rpt.isOk() else 1)
+
+    main()
@@ -11,24 +11,73 @@ cimport overflow
 cimport river
 cimport station
 cimport tide
+cimport asplume
+
+@cython.locals (n = long, p = list, ps = list)
+cpdef long         getWindowsSize  (list wins)
+cpdef long         getPlumesSize   (list plms)
+@cython.locals (amps = list, n = long)
+cpdef long         getAmplitudesSize(list ampss)
+@cython.locals (a = object, n = long)
+cpdef long         getClimatologySize(tuple clim)
+@cython.locals (p = list, ps = list)
+cpdef list         copyWindows     (list wins)
+@cython.locals (p = asplume.ASPlume, res = list)
+cpdef list         copyPlumes      (list plms, bint lazy)
 
 cdef class ASModel:
+    cdef public long         m_cycleIdx
     cdef public str          m_dataDir
+    cdef public object       m_diskCache
+    cdef public str          m_fingerprint
     cdef public station.OverflowPoints m_points
     cdef public river.Rivers m_rivers
     cdef public tide.TideTable m_tide
+    cdef public tide.TideStation m_tideStn
     #
     cpdef str          getDataDir      (ASModel self)
+    @cython.locals (dirs = list, f = str, files = list, fname = str, h = object, root = str, st = object)
+    cpdef str          getFingerprint  (ASModel self)
+    cpdef              setDiskCache    (ASModel self, str fname=*)
+    cpdef object       getDiskCache    (ASModel self)
     cpdef list         getInfo         (ASModel self)
+    cpdef              setPathQuantization(ASModel self, object bbox=*)
     cpdef list         getPointNames   (ASModel self)
     cpdef list         getPointTideNames(ASModel self, str name)
     @cython.locals (sgnl = list)
     cpdef list         getTideSignal   (ASModel self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt)
-    @cython.locals (o = overflow.Overflow, p = station.OverflowPoint, r = list, res = list)
-    cpdef list         getOverflowData (ASModel self, datetime.timedelta dt, list overflows, bint do_merge)
-    @cython.locals (o = overflow.Overflow, p = station.OverflowPoint, r = list, res = list)
-    cpdef list         getOverflowPlumes(ASModel self, datetime.timedelta dt, list overflows)
+    @cython.locals (cycleIdx = long, o = overflow.Overflow, r = list, res = list)
+    cpdef list         getOverflowData (ASModel self, datetime.timedelta dt, list overflows, bint do_merge, bint match_tides=*)
+    @cython.locals (cycleIdx = long, i = long, j = long, o = overflow.Overflow, overflows = list, wins = dict)
+    cpdef list         getOverflowDataBatch(ASModel self, datetime.timedelta dt, list scenarios, bint do_merge, bint match_tides=*)
+    @cython.locals (cols = dict, cycleIdx = long, j = long, o = overflow.Overflow)
+    cpdef object       getOverflowWindows(ASModel self, datetime.timedelta dt, list overflows, bint do_merge, bint match_tides=*)
+    cpdef tuple        __getKey        (ASModel self, str kind, overflow.Overflow o, datetime.timedelta dt, long cycleIdx, bint do_merge=*)
+    @cython.locals (tend = str, tini = str)
+    cpdef str          __getDiskKey    (ASModel self, str kind, overflow.Overflow o, datetime.timedelta dt, long cycleIdx, bint do_merge=*)
+    @cython.locals (key = tuple, p = station.OverflowPoint, plm = object, r = list, us = datetime.timedelta, v = object)
+    cpdef object       __getResult     (ASModel self, str kind, overflow.Overflow o, datetime.timedelta dt, long cycleIdx, bint do_merge=*)
+    @cython.locals (key = tuple, p = station.OverflowPoint, us = datetime.timedelta, v = list)
+    cpdef              __putResult     (ASModel self, str kind, overflow.Overflow o, datetime.timedelta dt, long cycleIdx, bint do_merge, list r)
+    cpdef tuple        __getAmpsKey    (ASModel self, overflow.Overflow o, datetime.timedelta dt, long cycleIdx, bint do_merge)
+    @cython.locals (ampss = list, key = tuple, prv = tuple, r = tuple, t_end = datetime.datetime, wins = list)
+    cpdef list         __computeOverflow(ASModel self, station.OverflowPoint p, overflow.Overflow o, datetime.timedelta dt, bint do_merge, long cycleIdx)
+    @cython.locals (p = station.OverflowPoint, r = list)
+    cpdef list         __doOverflow    (ASModel self, overflow.Overflow o, datetime.timedelta dt, bint do_merge, long cycleIdx)
+    @cython.locals (p = station.OverflowPoint, r = list)
+    cpdef list         __doPlumes      (ASModel self, overflow.Overflow o, datetime.timedelta dt, long cycleIdx, bint lazy)
+    @cython.locals (ampss = list, p = station.OverflowPoint, r = list, w = list)
+    cpdef tuple        __doOverflowAndPlumes(ASModel self, overflow.Overflow o, datetime.timedelta dt, bint do_merge, long cycleIdx, bint lazy)
+    @cython.locals (grps = dict, i = long, items = list, j = long, name = str, o = overflow.Overflow, overflows = list, p = station.OverflowPoint, r = list, res = dict, w = object)
+    cpdef dict         __doOverflowBatch(ASModel self, datetime.timedelta dt, list scenarios, bint do_merge, long cycleIdx, bint columnar)
+    @cython.locals (cycleIdx = long, o = overflow.Overflow, r = list, res = list)
+    cpdef list         getOverflowPlumes(ASModel self, datetime.timedelta dt, list overflows, bint match_tides=*, bint lazy=*)
+    @cython.locals (cycleIdx = long, dta = list, o = overflow.Overflow, pth = list, r = list, w = list)
+    cpdef tuple        getOverflowDataAndPlumes(ASModel self, datetime.timedelta dt, list overflows, bint do_merge, bint match_tides=*, bint lazy=*)
+    @cython.locals (cols = list, cycleIdx = long, n = long, name = str, r = tuple, rng = tuple, t = object)
+    cpdef object       getClimatology  (ASModel self, list names=*, datetime.datetime t_start=*, datetime.datetime t_end=*, datetime.timedelta step=*, bint match_tides=*)
+    @cython.locals (dkey = str, k = long, key = tuple, p = station.OverflowPoint, r = tuple, v = list)
+    cpdef tuple        __getClimatology(ASModel self, str name, datetime.datetime t_start, long n, datetime.timedelta step, long cycleIdx)
 
 @cython.locals (FORMAT = str, dt = object, logHndlr = object, mdl = object, t0 = object, t1 = object)
 cpdef              main            ()
-
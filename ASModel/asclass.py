@@ -22,16 +22,80 @@
 Modèle de calcul des temps d'arrivée d'une surverse
 """
 
+import concurrent.futures
 import datetime
+import functools
+import hashlib
 import logging
+import os
+import sqlite3
+
+import numpy as np
 
 from .river    import Rivers
 from .station  import OverflowPoints
+from .station  import DTA_DELTAT
 from .tide     import TideTable
 from .overflow import Overflow
+from .aswindows import ASWindows
+from .asclimate import ASClimatology
+from .pathstore import PATH_CACHE, PACK_DATA, PACK_INDEX, PACK_LOD
+from .lrucache import LRUCache
+from .diskcache import DiskCache, DISK_CACHE_NAME, getKeyHash
 
 LOGGER = logging.getLogger("INRS.ASModel.ASModel")
 
+RESULT_CACHE_SIZE = 64*1024*1024    # Default budget of RESULT_CACHE [bytes]
+
+def getWindowsSize(wins):
+    """
+    Estimated memory size of the exposure windows of one overflow [bytes]
+    """
+    n = 64
+    for ps in wins:
+        n += 64
+        for p in ps:
+            n += 64 + 160*len(p)
+    return n
+
+def getPlumesSize(plms):
+    """
+    Estimated memory size of plumes without path [bytes]
+    """
+    return 64 + 512*len(plms)
+
+def getAmplitudesSize(ampss):
+    """
+    Estimated memory size of the hit amplitudes of one overflow [bytes]
+    """
+    n = 64
+    for amps in ampss:
+        n += 64 + 32*len(amps)
+    return n
+
+def getClimatologySize(clim):
+    """
+    Memory size of the climatology arrays of one point [bytes]
+    """
+    n = 64
+    for a in clim:
+        n += a.nbytes
+    return n
+
+def copyWindows(wins):
+    return [ [ list(p) for p in ps ] for ps in wins ]
+
+def copyPlumes(plms, lazy):
+    res = [ p.copy() for p in plms ]
+    if not lazy:
+        for p in res: p.load()
+    return res
+
+# ---  Process-wide cache of the results by overflow, shared by all the
+# ---  models and keyed by the dataset fingerprint. The plumes are kept
+# ---  without path.
+RESULT_CACHE = LRUCache(RESULT_CACHE_SIZE, name='results')
+
 class ASModel:
     def __init__(self, dataDir):
         """
@@ -46,8 +110,12 @@ class ASModel:
 
         self.m_tide = TideTable()
         self.m_tide.load(dataDir)
+        self.m_tideStn  = self.m_tide.getStation(self.m_points.getStation())
+        self.m_cycleIdx = self.m_points.buildCycleIndex(self.m_tideStn)
 
         self.m_dataDir = dataDir
+        self.m_fingerprint = ''
+        self.m_diskCache = None
 
     def getDataDir(self):
         """
@@ -55,12 +123,72 @@ class ASModel:
         """
         return self.m_dataDir
 
+    def getFingerprint(self):
+        """
+        La fonction getFingerprint() retourne l'empreinte (md5) des
+        données, calculée sur le contenu des fichiers texte du répertoire
+        des données (définition des points, rivières et marées), et sur
+        la taille et la date de modification des fichiers des trajectoires
+        (fichiers path-*.pkl et fichiers compactés de PathStore).
+        """
+        if not self.m_fingerprint:
+            h = hashlib.md5()
+            for f in sorted( os.listdir(self.m_dataDir) ):
+                fname = os.path.join(self.m_dataDir, f)
+                if os.path.splitext(f)[1].lower() != '.txt' or not os.path.isfile(fname): continue
+                h.update(f.encode('utf-8'))
+                with open(fname, 'rb') as fi:
+                    h.update(fi.read())
+            # ---  Path files, by size and modification time
+            for root, dirs, files in os.walk(self.m_dataDir):
+                dirs.sort()
+                for f in sorted(files):
+                    if f not in (PACK_DATA, PACK_INDEX, PACK_LOD) and not (f.startswith('path-') and f.endswith('.pkl')): continue
+                    fname = os.path.join(root, f)
+                    st = os.stat(fname)
+                    f = os.path.relpath(fname, self.m_dataDir).replace(os.sep, '/')
+                    h.update( ('%s;%d;%d' % (f, st.st_size, st.st_mtime_ns)).encode('utf-8') )
+            self.m_fingerprint = h.hexdigest()
+        return self.m_fingerprint
+
+    def setDiskCache(self, fname=''):
+        """
+        La fonction setDiskCache() active la cache persistante des
+        résultats, dans le fichier SQLite fname, par défaut dans le
+        répertoire des données. Les entrées sont indexées par l'empreinte
+        des données. Avec fname à None, la cache est désactivée.
+        """
+        if self.m_diskCache: self.m_diskCache.close()
+        self.m_diskCache = None
+        if fname is None: return
+        if not fname: fname = os.path.join(self.m_dataDir, DISK_CACHE_NAME)
+        try:
+            self.m_diskCache = DiskCache(fname)
+        except sqlite3.Error as e:
+            LOGGER.warning('ASModel: Disk cache %s not available: %s', fname, str(e))
+
+    def getDiskCache(self):
+        """
+        La fonction getDiskCache() retourne la cache persistante (DiskCache),
+        None si elle n'est pas active.
+        """
+        return self.m_diskCache
+
     def getInfo(self):
         """
         La fonction getInfo() retourne l'information sur les données.
         """
         return self.m_points.getInfo()
 
+    def setPathQuantization(self, bbox=None):
+        """
+        La fonction setPathQuantization() active la quantification sur
+        int16 des trajectoires gardées en cache, par rapport à la boîte
+        englobante du projet bbox (xmin, ymin, xmax, ymax) en coordonnées
+        projetées. bbox à None désactive la quantification.
+        """
+        self.m_points.getPathStore().setQuantization(bbox)
+
     def getPointNames(self):
         """
         La fonction getPointNames() retourne la liste des noms
@@ -88,10 +216,10 @@ class ASModel:
         assert isinstance(t_end,   datetime.datetime)
         assert isinstance(dt,      datetime.timedelta)
 
-        sgnl = self.m_tide.getTideSignal(t_start, t_end, dt)
+        sgnl = self.m_tideStn.getTideSignal(t_start, t_end, dt)
         return [ (tr.dt, tr.wl) for tr in sgnl ]
 
-    def getOverflowData(self, dt, overflows, do_merge):
+    def getOverflowData(self, dt, overflows, do_merge, match_tides=False):
         """
         La fonction getOverflowData(..) calcule les temps d'arrivée pour une surverse.
         L'intervalle de surverse est donné par [t_start, t_end], le pas de
@@ -101,6 +229,10 @@ class ASModel:
         Une liste de marée vide implique tous les cycles.
         La valeur booléenne do_merge contrôle si les différents temps de
         transit sont agglomérés ou gardés séparés.
+        Avec match_tides, chaque surverse n'est calculée que pour le cycle
+        de marée le plus proche de la marée réelle.
+        Les surverses déjà calculées sont servies par la cache des
+        résultats (RESULT_CACHE), seules les nouvelles sont calculées.
 
         La fonction retourne l'information suivante:
         [
@@ -114,20 +246,309 @@ class ASModel:
         assert isinstance(overflows,    (list, tuple))
         assert len(overflows) == 0 or isinstance(overflows[0], Overflow)
 
+        cycleIdx = self.m_cycleIdx if match_tides else -1
         res = []
         for o in overflows:
             try:
-                p = self.m_points[o.name]
-                r = p.doOverflow(o.tini, o.tend, dt, self.m_tide, tide_cycles=o.tides, merge_transit_times = do_merge)
+                r = self.__doOverflow(o, dt, do_merge, cycleIdx)
                 res.append( (o.name, r) )
             except KeyError as e:
                 LOGGER.debug(str(e))
                 LOGGER.warning('ASModel.xeq: Skipping point %s', o.name)
         return res
 
-    def getOverflowPlumes(self, dt, overflows):
+    def iterOverflowData(self, dt, overflows, do_merge, match_tides=False, nworkers=1):
+        """
+        La fonction iterOverflowData(..) est la version générateur de
+        getOverflowData(..). Le résultat de chaque surverse est retourné
+        dès qu'il est calculé, sous la forme:
+            (pnt_de_surverse, [ (t_min, t_max) arrival for each transit time in river] )
+        Avec nworkers > 1, les surverses sont calculées en parallèle et les
+        résultats sont retournés dans l'ordre de fin de calcul.
+        Tous les temps sont UTC.
+        """
+        LOGGER.trace('ASModel.iterOverflowData')
+        assert isinstance(dt,           datetime.timedelta)
+        assert isinstance(overflows,    (list, tuple))
+        assert len(overflows) == 0 or isinstance(overflows[0], Overflow)
+
+        cycleIdx = self.m_cycleIdx if match_tides else -1
+        def xeq(o):
+            return self.__doOverflow(o, dt, do_merge, cycleIdx)
+
+        for o, fut in self.__iterCompleted(xeq, overflows, nworkers):
+            try:
+                yield (o.name, fut())
+            except KeyError as e:
+                LOGGER.debug(str(e))
+                LOGGER.warning('ASModel.xeq: Skipping point %s', o.name)
+
+    def iterOverflowPlumes(self, dt, overflows, match_tides=False, lazy=True, nworkers=1):
+        """
+        La fonction iterOverflowPlumes(..) est la version générateur de
+        getOverflowPlumes(..). Les panaches (Plume) sont retournés dès que
+        ceux d'un point de surverse sont calculés. Avec nworkers > 1, les
+        surverses sont calculées en parallèle et les panaches sont
+        retournés dans l'ordre de fin de calcul.
+        Tous les temps sont UTC.
+        """
+        LOGGER.trace('ASModel.iterOverflowPlumes')
+        assert isinstance(dt,           datetime.timedelta)
+        assert isinstance(overflows,    (list, tuple))
+        assert len(overflows) == 0 or isinstance(overflows[0], Overflow)
+
+        cycleIdx = self.m_cycleIdx if match_tides else -1
+        def xeq(o):
+            return self.__doPlumes(o, dt, cycleIdx, lazy)
+
+        for o, fut in self.__iterCompleted(xeq, overflows, nworkers):
+            try:
+                for plume in fut():
+                    yield plume
+            except KeyError as e:
+                LOGGER.debug(str(e))
+                LOGGER.warning('ASModel.xeq: Skipping point %s', o.name)
+        LOGGER.debug('%s', PATH_CACHE)
+
+    def __getKey(self, kind, o, dt, cycleIdx, do_merge=False):
+        """
+        Clé de la cache des résultats pour la surverse o
+        """
+        return (kind, self.getFingerprint(), o.name, tuple(o.tides), o.tini, o.tend, dt, cycleIdx, do_merge)
+
+    def __getDiskKey(self, kind, o, dt, cycleIdx, do_merge=False):
+        """
+        Clé de la cache persistante pour la surverse o, indépendante
+        du fuseau horaire des temps.
+        """
+        tini = o.tini.astimezone(datetime.timezone.utc).isoformat()
+        tend = o.tend.astimezone(datetime.timezone.utc).isoformat()
+        return getKeyHash( [kind, o.name, list(o.tides), tini, tend, dt.total_seconds(), cycleIdx, bool(do_merge)] )
+
+    def __getResult(self, kind, o, dt, cycleIdx, do_merge=False):
+        """
+        Résultat de la surverse o, de la cache des résultats, ou à
+        défaut de la cache persistante. Retourne None si absent.
+        """
+        key = self.__getKey(kind, o, dt, cycleIdx, do_merge)
+        r = RESULT_CACHE.get(key)
+        if r is not None or not self.m_diskCache: return r
+
+        try:
+            v = self.m_diskCache.get(self.getFingerprint(), self.__getDiskKey(kind, o, dt, cycleIdx, do_merge))
+        except sqlite3.Error as e:
+            LOGGER.warning('ASModel: Disk cache error: %s', str(e))
+            v = None
+        if v is None: return None
+        us = datetime.timedelta(microseconds=1)
+        if kind == 'data':
+            r = [ [ [ (o.tini+t0*us, o.tini+t1*us, d) for t0, t1, d in w ] for w in ps ] for ps in v ]
+            RESULT_CACHE.put(key, r, getWindowsSize(r))
+        else:
+            p = self.m_points[o.name]
+            r = [ p.loadPlume(d, o.tini) for d in v ]
+            for plm in r:
+                if plm is None: return None
+            RESULT_CACHE.put(key, r, getPlumesSize(r))
+        return r
+
+    def __putResult(self, kind, o, dt, cycleIdx, do_merge, r):
+        """
+        Ajoute le résultat r de la surverse o aux caches. Les panaches
+        sont gardés sans trajectoire.
+        """
+        key = self.__getKey(kind, o, dt, cycleIdx, do_merge)
+        if kind == 'data':
+            RESULT_CACHE.put(key, r, getWindowsSize(r))
+        else:
+            RESULT_CACHE.put(key, [ plm.copy() for plm in r ], getPlumesSize(r))
+        if not self.m_diskCache: return
+
+        if kind == 'data':
+            us = datetime.timedelta(microseconds=1)
+            v = [ [ [ ((t0-o.tini)//us, (t1-o.tini)//us, d) for t0, t1, d in w ] for w in ps ] for ps in r ]
+        else:
+            p = self.m_points[o.name]
+            v = [ p.dumpPlume(plm, o.tini) for plm in r ]
+        try:
+            self.m_diskCache.put(self.getFingerprint(), self.__getDiskKey(kind, o, dt, cycleIdx, do_merge), v)
+        except sqlite3.Error as e:
+            LOGGER.warning('ASModel: Disk cache error: %s', str(e))
+
+    def __getAmpsKey(self, o, dt, cycleIdx, do_merge):
+        """
+        Clé des amplitudes de la surverse o, sans le temps de fin
+        """
+        return ('amps', self.getFingerprint(), o.name, tuple(o.tides), o.tini, dt, cycleIdx, bool(do_merge))
+
+    def __computeOverflow(self, p, o, dt, do_merge, cycleIdx):
+        """
+        Calcule les fenêtres d'exposition de la surverse o. Si un calcul
+        antérieur de même début et de fin plus hâtive est en cache, seuls
+        les déversements après son temps de fin sont calculés.
+        """
+        key = self.__getAmpsKey(o, dt, cycleIdx, do_merge)
+        prv = RESULT_CACHE.get(key)
+        r = None
+        if prv is not None:
+            t_end, ampss = prv
+            r = p.extendOverflow(ampss, o.tini, t_end, o.tend, dt, self.m_tideStn, tide_cycles=o.tides, merge_transit_times=do_merge, cycle_index=cycleIdx)
+            if r is not None: LOGGER.debug('ASModel: %s extended from %s to %s', o.name, t_end, o.tend)
+        if r is None:
+            r = p.doOverflowAmplitudes(o.tini, o.tend, dt, self.m_tideStn, tide_cycles=o.tides, merge_transit_times=do_merge, cycle_index=cycleIdx)
+        ampss, wins = r
+        if ampss is not None:
+            RESULT_CACHE.put(key, (o.tend, ampss), getAmplitudesSize(ampss))
+        return wins
+
+    def __doOverflow(self, o, dt, do_merge, cycleIdx):
+        """
+        Fenêtres d'exposition de la surverse o, servies par les caches
+        si possible.
+        """
+        r = self.__getResult('data', o, dt, cycleIdx, do_merge)
+        if r is None:
+            p = self.m_points[o.name]
+            r = self.__computeOverflow(p, o, dt, do_merge, cycleIdx)
+            self.__putResult('data', o, dt, cycleIdx, do_merge, r)
+        return copyWindows(r)
+
+    def __doPlumes(self, o, dt, cycleIdx, lazy):
+        """
+        Panaches de la surverse o, servis par les caches si possible.
+        """
+        r = self.__getResult('plumes', o, dt, cycleIdx)
+        if r is None:
+            p = self.m_points[o.name]
+            r = p.doPlumes(o.tini, o.tend, dt, self.m_tideStn, tide_cycles=o.tides, cycle_index=cycleIdx, lazy=lazy)
+            self.__putResult('plumes', o, dt, cycleIdx, False, r)
+            return r
+        return copyPlumes(r, lazy)
+
+    def __doOverflowAndPlumes(self, o, dt, do_merge, cycleIdx, lazy):
+        """
+        Fenêtres d'exposition et panaches de la surverse o, servis par
+        les caches si possible. Si aucun des deux n'est en cache, les
+        impacts ne sont calculés qu'une seule fois; leurs amplitudes
+        sont gardées pour l'extension des fenêtres.
+        """
+        w = self.__getResult('data',   o, dt, cycleIdx, do_merge)
+        r = self.__getResult('plumes', o, dt, cycleIdx)
+        if w is not None and r is not None:
+            return copyWindows(w), copyPlumes(r, lazy)
+        if w is not None:
+            return copyWindows(w), self.__doPlumes(o, dt, cycleIdx, lazy)
+        if r is not None:
+            return self.__doOverflow(o, dt, do_merge, cycleIdx), copyPlumes(r, lazy)
+
+        p = self.m_points[o.name]
+        ampss, w, r = p.doOverflowAndPlumes(o.tini, o.tend, dt, self.m_tideStn, tide_cycles=o.tides, merge_transit_times=do_merge, cycle_index=cycleIdx, lazy=lazy)
+        if ampss is not None:
+            RESULT_CACHE.put(self.__getAmpsKey(o, dt, cycleIdx, do_merge), (o.tend, ampss), getAmplitudesSize(ampss))
+        self.__putResult('data',   o, dt, cycleIdx, do_merge, w)
+        self.__putResult('plumes', o, dt, cycleIdx, False, r)
+        return copyWindows(w), r
+
+    def __iterCompleted(self, xeq, overflows, nworkers):
+        """
+        Yields (o, result) for o in overflows, with result a callable
+        returning xeq(o) or raising its exception. With nworkers > 1,
+        xeq is run in a thread pool and the overflows are yielded in
+        completion order.
+        """
+        if nworkers <= 1 or len(overflows) <= 1:
+            for o in overflows:
+                yield o, functools.partial(xeq, o)
+            return
+        with concurrent.futures.ThreadPoolExecutor(nworkers) as pool:
+            futs = { pool.submit(xeq, o): o for o in overflows }
+            try:
+                for fut in concurrent.futures.as_completed(futs):
+                    yield futs[fut], fut.result
+            finally:
+                for fut in futs: fut.cancel()
+
+    def getOverflowDataBatch(self, dt, scenarios, do_merge, match_tides=False):
+        """
+        La fonction getOverflowDataBatch(..) est la version par lots de
+        getOverflowData(..), pour une liste de scénarios, chacun étant une
+        liste de surverses. Les surverses de tous les scénarios sont
+        regroupées par point de surverse; les temps de déversement
+        distincts n'y sont évalués qu'une seule fois, puis les résultats
+        sont découpés par scénario.
+
+        La fonction retourne la liste des résultats de getOverflowData(..),
+        dans l'ordre des scénarios.
+        Tous les temps sont UTC.
+        """
+        LOGGER.trace('ASModel.getOverflowDataBatch')
+        assert isinstance(dt,           datetime.timedelta)
+        assert isinstance(scenarios,    (list, tuple))
+
+        cycleIdx = self.m_cycleIdx if match_tides else -1
+        wins = self.__doOverflowBatch(dt, scenarios, do_merge, cycleIdx, False)
+        return [ [ (o.name, copyWindows(wins[(i, j)])) for j, o in enumerate(overflows) if (i, j) in wins ] for i, overflows in enumerate(scenarios) ]
+
+    def getOverflowWindows(self, dt, overflows, do_merge, match_tides=False):
+        """
+        La fonction getOverflowWindows(..) est la version en colonnes de
+        getOverflowData(..). Les fenêtres d'exposition sont construites
+        directement dans un tableau structuré, sans passer par les listes
+        imbriquées.
+
+        La fonction retourne un ASWindows, avec une ligne par pas de temps
+        des fenêtres:
+            (point, overflow, transit, window, t0, t1, dilution)
+        Tous les temps sont UTC.
+        """
+        LOGGER.trace('ASModel.getOverflowWindows')
+        assert isinstance(dt,           datetime.timedelta)
+        assert isinstance(overflows,    (list, tuple))
+        assert len(overflows) == 0 or isinstance(overflows[0], Overflow)
+
+        cycleIdx = self.m_cycleIdx if match_tides else -1
+        cols = self.__doOverflowBatch(dt, [overflows], do_merge, cycleIdx, True)
+        return ASWindows.fromColumns( [ (o.name, o.tini, cols[(0, j)]) for j, o in enumerate(overflows) if (0, j) in cols ] )
+
+    def __doOverflowBatch(self, dt, scenarios, do_merge, cycleIdx, columnar):
+        """
+        Regroupe les surverses des scénarios par point de surverse et
+        les calcule par lots. Retourne le dictionnaire des résultats,
+        indexé par (index du scénario, index de la surverse).
+        Sans columnar, les résultats sont servis par la cache des
+        résultats si possible; ils y sont partagés, à copier.
+        """
+        res = {}
+        grps = {}
+        for i, overflows in enumerate(scenarios):
+            for j, o in enumerate(overflows):
+                assert isinstance(o, Overflow)
+                if not columnar:
+                    w = self.__getResult('data', o, dt, cycleIdx, do_merge)
+                    if w is not None:
+                        res[(i, j)] = w
+                        continue
+                grps.setdefault(o.name, []).append( (i, j, o) )
+
+        for name, items in grps.items():
+            try:
+                p = self.m_points[name]
+                r = p.doOverflowBatch([ (o.tini, o.tend, o.tides) for i, j, o in items ], dt, self.m_tideStn, merge_transit_times=do_merge, cycle_index=cycleIdx, columnar=columnar)
+                for (i, j, o), w in zip(items, r):
+                    res[(i, j)] = w
+                    if not columnar:
+                        self.__putResult('data', o, dt, cycleIdx, do_merge, w)
+            except KeyError as e:
+                LOGGER.debug(str(e))
+                LOGGER.warning('ASModel.getOverflowDataBatch: Skipping point %s', name)
+        return res
+
+    def getOverflowPlumes(self, dt, overflows, match_tides=False, lazy=True):
         """
-        La fonction getOverflowPlumes(..)
+        La fonction getOverflowPlumes(..) calcule les panaches pour les
+        surverses. Avec match_tides, chaque surverse n'est calculée que pour
+        le cycle de marée le plus proche de la marée réelle. Avec lazy, les
+        trajectoires ne sont chargées qu'au premier accès à Plume.plume.
 
         La fonction retourne l'information suivante:
         [
@@ -140,19 +561,122 @@ class ASModel:
         assert isinstance(overflows,    (list, tuple))
         assert len(overflows) == 0 or isinstance(overflows[0], Overflow)
 
+        cycleIdx = self.m_cycleIdx if match_tides else -1
         res = []
         for o in overflows:
             try:
-                p = self.m_points[o.name]
-                LOGGER.debug('%s - %s', str(o), str(p))
-                r = p.doPlumes(o.tini, o.tend, dt, self.m_tide, tide_cycles=o.tides)
-
+                LOGGER.debug('%s', str(o))
+                r = self.__doPlumes(o, dt, cycleIdx, lazy)
                 res.extend(r)
             except KeyError as e:
                 LOGGER.debug(str(e))
                 LOGGER.warning('ASModel.xeq: Skipping point %s', o.name)
+        LOGGER.debug('%s', PATH_CACHE)
         return res
 
+    def getOverflowDataAndPlumes(self, dt, overflows, do_merge, match_tides=False, lazy=True):
+        """
+        La fonction getOverflowDataAndPlumes(..) combine getOverflowData(..)
+        et getOverflowPlumes(..). Les impacts ne sont calculés qu'une seule
+        fois par point de surverse, et les deux résultats en sont dérivés.
+        Les résultats en cache ne sont pas recalculés.
+
+        La fonction retourne l'information suivante:
+        (
+            résultat de getOverflowData(..),
+            résultat de getOverflowPlumes(..)
+        )
+        Tous les temps sont UTC.
+        """
+        LOGGER.trace('ASModel.getOverflowDataAndPlumes')
+        assert isinstance(dt,           datetime.timedelta)
+        assert isinstance(overflows,    (list, tuple))
+        assert len(overflows) == 0 or isinstance(overflows[0], Overflow)
+
+        cycleIdx = self.m_cycleIdx if match_tides else -1
+        dta = []
+        pth = []
+        for o in overflows:
+            try:
+                w, r = self.__doOverflowAndPlumes(o, dt, do_merge, cycleIdx, lazy)
+                dta.append( (o.name, w) )
+                pth.extend(r)
+            except KeyError as e:
+                LOGGER.debug(str(e))
+                LOGGER.warning('ASModel.xeq: Skipping point %s', o.name)
+        LOGGER.debug('%s', PATH_CACHE)
+        return dta, pth
+
+    def getClimatology(self, names=None, t_start=None, t_end=None, step=DTA_DELTAT, match_tides=True):
+        """
+        La fonction getClimatology(..) calcule la climatologie d'exposition
+        des points de surverse names, par défaut tous les points: les
+        statistiques d'exposition de déversements instantanés débutant à
+        chaque pas step de [t_start, t_end], par défaut toute la période
+        de la table des marées. Tous les déversements d'un point sont
+        évalués en une seule passe par cycle de marée. Avec match_tides,
+        chaque déversement n'est calculé que pour le cycle de marée le plus
+        proche de la marée réelle, sinon pour l'enveloppe de tous les cycles.
+        Les résultats sont gardés en cache par point de surverse.
+
+        La fonction retourne un ASClimatology, avec une ligne par point et
+        déversement:
+            (point, t, first, last, duration, peak)
+        Tous les temps sont UTC.
+        """
+        LOGGER.trace('ASModel.getClimatology')
+        assert isinstance(step, datetime.timedelta)
+
+        rng = self.m_tideStn.getTimeRange()
+        if rng is None: return ASClimatology()
+        t_start = max(t_start, rng[0]) if t_start else rng[0]
+        t_end   = min(t_end,   rng[1]) if t_end   else rng[1]
+        if t_end < t_start: return ASClimatology()
+        if names is None: names = self.getPointNames()
+
+        cycleIdx = self.m_cycleIdx if match_tides else -1
+        n = (t_end - t_start) // step + 1
+        t = np.datetime64(t_start.astimezone(datetime.timezone.utc).replace(tzinfo=None), 'us') + \
+            np.arange(n) * np.timedelta64(step // datetime.timedelta(microseconds=1), 'us')
+        cols = []
+        for name in names:
+            try:
+                r = self.__getClimatology(name, t_start, n, step, cycleIdx)
+                cols.append( (name, t, r) )
+            except KeyError as e:
+                LOGGER.debug(str(e))
+                LOGGER.warning('ASModel.getClimatology: Skipping point %s', name)
+        return ASClimatology.fromColumns(cols)
+
+    def __getClimatology(self, name, t_start, n, step, cycleIdx):
+        """
+        Climatologie du point name, pour les n déversements débutant à
+        t_start au pas step, servie par les caches si possible.
+        """
+        key = ('climate', self.getFingerprint(), name, t_start, n, step, cycleIdx)
+        r = RESULT_CACHE.get(key)
+        if r is not None: return r
+
+        dkey = getKeyHash( ['climate', name, t_start.astimezone(datetime.timezone.utc).isoformat(), n, step.total_seconds(), cycleIdx] )
+        v = None
+        if self.m_diskCache:
+            try:
+                v = self.m_diskCache.get(self.getFingerprint(), dkey)
+            except sqlite3.Error as e:
+                LOGGER.warning('ASModel: Disk cache error: %s', str(e))
+        if v is not None:
+            r = tuple([ np.array(v[0], dtype=bool) ] + [ np.array(a, dtype=np.float64) for a in v[1:] ])
+        else:
+            p = self.m_points[name]
+            r = p.doClimatology([ t_start + k*step for k in range(n) ], self.m_tideStn, [], cycleIdx)
+            if self.m_diskCache:
+                try:
+                    self.m_diskCache.put(self.getFingerprint(), dkey, [ a.tolist() for a in r ])
+                except sqlite3.Error as e:
+                    LOGGER.warning('ASModel: Disk cache error: %s', str(e))
+        RESULT_CACHE.put(key, r, getClimatologySize(r))
+        return r
+
 if __name__ == '__main__':
     import pytz
     def main():
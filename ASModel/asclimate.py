@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Exposure climatology
+
+The exposure statistics of instantaneous spills, for every spill
+start of a season on a regular grid, as returned by
+ASModel.getClimatology. One row per point and spill start.
+"""
+
+import csv
+import logging
+
+import numpy as np
+
+LOGGER = logging.getLogger("INRS.ASModel.climate")
+
+# ---  Times are UTC, without time zone. Delays and durations in seconds.
+CLIMATE_DTYPE = np.dtype([
+    ('point',    np.int32),         # index in names
+    ('t',        'datetime64[us]'), # spill start
+    ('first',    np.float64),       # delay to start of exposure, NaN without hit
+    ('last',     np.float64),       # delay to end of exposure, NaN without hit
+    ('duration', np.float64),       # exposure duration, 0 without hit
+    ('peak',     np.float64),       # peak dilution, NaN without hit
+])
+
+CLIMATE_COLUMNS = ('first', 'last', 'duration', 'peak')
+PERCENTILES = (5, 25, 50, 75, 95)
+
+class ASClimatology:
+    """
+    Exposure climatology as a structured array of dtype CLIMATE_DTYPE.
+
+    names are the point names. The spills outside of the tide table
+    are not part of the data. The statistics are computed on the
+    spills with exposure; getExposureRates gives their proportion.
+    """
+    def __init__(self, data=None, names=()):
+        self.m_data  = data if data is not None else np.empty(0, dtype=CLIMATE_DTYPE)
+        self.m_names = list(names)
+
+    def __len__(self):
+        return self.m_data.shape[0]
+
+    def __getitem__(self, col):
+        """
+        Column col, as a view on the data
+        """
+        return self.m_data[col]
+
+    def __str__(self):
+        return 'ASClimatology(%d points, %d spills)' % (len(self.m_names), len(self))
+
+    def getData(self):
+        return self.m_data
+
+    def getNames(self):
+        return self.m_names
+
+    def getPointNames(self):
+        """
+        Point name of each row
+        """
+        return np.array(self.m_names, dtype=object)[self.m_data['point']]
+
+    def getPoint(self, name):
+        """
+        Rows of the point name
+        """
+        return self.m_data[self.m_data['point'] == self.m_names.index(name)]
+
+    @staticmethod
+    def fromColumns(cols):
+        """
+        Build from cols, a list with, for each point, the tuple
+        (name, t, (ok, first, last, duration, peak)), t being the
+        spill starts as datetime64 and the others as returned by
+        OverflowPoint.doClimatology.
+        """
+        n = sum(int(c[2][0].sum()) for c in cols)
+        data = np.empty(n, dtype=CLIMATE_DTYPE)
+        i0 = 0
+        for ip, (name, t, (ok, first, last, duration, peak)) in enumerate(cols):
+            i1 = i0 + int(ok.sum())
+            rows = data[i0:i1]
+            rows['point']    = ip
+            rows['t']        = t[ok]
+            rows['first']    = first[ok]
+            rows['last']     = last[ok]
+            rows['duration'] = duration[ok]
+            rows['peak']     = peak[ok]
+            i0 = i1
+        return ASClimatology(data, [ c[0] for c in cols ])
+
+    def __iterPoints(self):
+        for ip, name in enumerate(self.m_names):
+            rows = self.m_data[self.m_data['point'] == ip]
+            yield name, rows, rows[rows['duration'] > 0.0]
+
+    def getExposureRates(self):
+        """
+        Returns the dict {name: proportion of the spills with exposure}
+        """
+        return { name: (hits.shape[0] / rows.shape[0] if rows.shape[0] else np.nan) for name, rows, hits in self.__iterPoints() }
+
+    def getPercentiles(self, col, q=PERCENTILES):
+        """
+        Returns the dict {name: percentiles q of column col}, NaN for
+        a point without exposure.
+        """
+        res = {}
+        for name, rows, hits in self.__iterPoints():
+            if hits.shape[0]:
+                res[name] = np.percentile(hits[col], q)
+            else:
+                res[name] = np.full(len(q), np.nan)
+        return res
+
+    def getHistogram(self, col, bins=None):
+        """
+        Returns the dict {name: (counts, edges)} of column col. bins
+        is passed to numpy.histogram. By default, the edges are shared
+        by all points: hourly for the delays and durations, 20 bins
+        for the dilution.
+        """
+        if bins is None:
+            hits = self.m_data[self.m_data['duration'] > 0.0][col]
+            vmax = float(hits.max()) if hits.shape[0] else 1.0
+            if col == 'peak':
+                bins = np.linspace(0.0, vmax, 21)
+            else:
+                bins = np.arange(0.0, vmax + 3600.0, 3600.0)
+        return { name: np.histogram(hits[col], bins=bins) for name, rows, hits in self.__iterPoints() }
+
+    def getStatistics(self, q=PERCENTILES):
+        """
+        Returns, for each point, the tuple
+            (name, spills, exposure rate, percentiles q of first, last, duration, peak)
+        """
+        rates = self.getExposureRates()
+        pcts  = [ self.getPercentiles(col, q) for col in CLIMATE_COLUMNS ]
+        res = []
+        for ip, name in enumerate(self.m_names):
+            nspl = int((self.m_data['point'] == ip).sum())
+            res.append( (name, nspl, rates[name]) + tuple(p[name].tolist() for p in pcts) )
+        return res
+
+    def saveStatistics(self, fname, q=PERCENTILES):
+        """
+        Write the statistics of getStatistics to the CSV file fname,
+        one line per point.
+        """
+        with open(fname, 'w', newline='', encoding='utf-8') as f:
+            w = csv.writer(f)
+            w.writerow( ['point', 'spills', 'rate'] + [ '%s_p%g' % (col, p) for col in CLIMATE_COLUMNS for p in q ] )
+            for name, nspl, rate, *pcts in self.getStatistics(q):
+                w.writerow( [name, nspl, rate] + [ v for p in pcts for v in p ] )
+
+    def save(self, fname):
+        """
+        Save to the .npz file fname. The array is written as is,
+        without conversion.
+        """
+        np.savez(fname, data=self.m_data, names=np.array(self.m_names, dtype=str))
+
+    @staticmethod
+    def load(fname):
+        """
+        Load from the .npz file fname, written by save().
+        """
+        with np.load(fname, allow_pickle=False) as f:
+            return ASClimatology(f['data'], f['names'].tolist())
+
+    def toDataFrame(self):
+        """
+        Returns a pandas DataFrame, the point column being a
+        categorical of the point names. Requires pandas.
+        """
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError('ASClimatology.toDataFrame requires pandas') from e
+        df = pd.DataFrame(self.m_data)
+        df['point'] = pd.Categorical.from_codes(self.m_data['point'], categories=self.m_names)
+        return df
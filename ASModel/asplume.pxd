@@ -17,10 +17,18 @@ cdef class ASPlume:
     cdef public double       dilution
     cdef public datetime.datetime injectionTime
     cdef public bint         isPlumeDirect
+    cdef public object       m_loader
+    cdef public object       m_plume
     cdef public str          parentName
-    cdef public object       plume
     cdef public long         plumeId
+    cdef public long         plumeLength
     cdef public str          stationName
     cdef public list         stationPolygon
     cdef public tuple        tide
-
+    #
+    cpdef object       load            (ASPlume self)
+    cpdef object       getPath         (ASPlume self, long level=*)
+    cpdef              unload          (ASPlume self)
+    cpdef bint         isLoaded        (ASPlume self)
+    @cython.locals (plume = object)
+    cpdef ASPlume      copy            (ASPlume self)
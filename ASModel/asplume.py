@@ -31,6 +31,9 @@ class ASPlume:
     """
     Structure to hold all information pertaining to a
     particle path (plume)
+
+    The path can be given directly, or loaded on first access
+    of plume with loader, a callable returning the path.
     """
     def __init__(self, 
                  dilution=-1.0, 
@@ -41,7 +44,9 @@ class ASPlume:
                  t0=datetime.now(),
                  tc=datetime.now(), 
                  isDirect=False, 
-                 plume=None):
+                 plume=None,
+                 loader=None,
+                 length=-1):
         global PLUME_CTR
         self.dilution       = dilution  # 
         self.stationName    = name      # string
@@ -51,10 +56,70 @@ class ASPlume:
         self.injectionTime  = t0        # datetime
         self.contactTime    = tc        # datetime
         self.isPlumeDirect  = isDirect  # Bool
-        self.plume          = plume
+        self.m_plume        = plume
+        self.m_loader       = loader    # callable returning the path
+        self.plumeLength    = len(plume) if plume is not None else length  # -1 if unknown
         self.plumeId        = PLUME_CTR
         PLUME_CTR += 1
 
+    @property
+    def plume(self):
+        """
+        The path, loaded on first access
+        """
+        return self.load()
+
+    @plume.setter
+    def plume(self, plume):
+        self.m_plume = plume
+        self.plumeLength = len(plume) if plume is not None else -1
+
+    def load(self):
+        """
+        Load the path if required, and returns it
+        """
+        if self.m_plume is None and self.m_loader is not None:
+            self.m_plume = self.m_loader()
+            if self.m_plume is not None: self.plumeLength = len(self.m_plume)
+        return self.m_plume
+
+    def getPath(self, level=0):
+        """
+        Returns the path at the level of detail level, 0 being the
+        full path. Without loader, the full path is returned.
+        """
+        if level <= 0 or self.m_loader is None:
+            return self.plume
+        return self.m_loader(level=level)
+
+    def unload(self):
+        """
+        Release the path, if it can be loaded again
+        """
+        if self.m_loader is not None:
+            self.m_plume = None
+
+    def isLoaded(self):
+        return self.m_plume is not None or self.m_loader is None
+
+    def copy(self):
+        """
+        Returns a copy, with a new id. A path that can be loaded
+        again is not copied, the copy shares the loader.
+        """
+        plume = self.m_plume if self.m_loader is None else None
+        return ASPlume(dilution = self.dilution,
+                       name     = self.stationName,
+                       parent   = self.parentName,
+                       poly     = self.stationPolygon,
+                       tide     = self.tide,
+                       t0       = self.injectionTime,
+                       tc       = self.contactTime,
+                       isDirect = self.isPlumeDirect,
+                       plume    = plume,
+                       loader   = self.m_loader,
+                       length   = self.plumeLength)
+
     def __lt__(self, other):
         """
         Opérateur d’ordonnancement
@@ -74,5 +139,5 @@ class ASPlume:
         s.append('t_inj=%s' % self.injectionTime)
         s.append('t_hit=%s' % self.contactTime)
         s.append('direct=%s' % self.isPlumeDirect)
-        s.append('plume=%d' % (len(self.plume) if self.plume else 0))
+        s.append('plume=%d' % max(self.plumeLength, 0))
         return ' '.join(s)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Local HTTP/JSON query service
+
+Exposes the static API over HTTP, on localhost:
+    GET  /api/<method>?param=value      simple queries
+    POST /api/<method>                  params as a JSON object
+    POST /batch                         [ {"method": m, "params": {}}, ... ]
+    GET  /status
+The response is a JSON object {"result": ...} or {"error": msg}, the
+batch response is the list of such objects.
+
+With format=columns, getOverflowData returns the exposure windows as
+columns (see ASWindows) instead of nested lists:
+    {"names": [], "items": [[point, ntransit], ...],
+     "columns": {"point": [], "overflow": [], "transit": [], "window": [],
+                 "t0": [], "t1": [], "dilution": []}}
+
+The datasets are loaded once in the server process, and inherited
+copy-on-write by a pool of pre-forked worker processes, that stay
+warm for the life of the server. A batch is split in chunks over the
+workers. With 0 workers, the requests are evaluated in the server
+process.
+
+Each request may select a dataset with the param "dataset", its
+directory or fingerprint, the first dataset being the default.
+
+Methods and params (times are iso strings, UTC if no time zone;
+overflows are [ {"name": n, "start": t, "end": t, "tides": []}, ... ]):
+    getDatasets
+    getInfo
+    getPointNames
+    getPointTideNames       name
+    getTideSignal           start, end, dt=900
+    getOverflowData         overflows, dt=900, merge=true, match_tides=false,
+                            format=nested
+    getOverflowDataBatch    scenarios (list of overflows), dt=900,
+                            merge=true, match_tides=false
+    getOverflowPlumes       overflows, dt=900, match_tides=false,
+                            paths=false, level=0
+"""
+
+import datetime
+import http.server
+import json
+import logging
+import multiprocessing
+import optparse
+import os
+import sys
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+try:
+    from .         import asapi
+    from .overflow import Overflow
+    from .asbatch  import toDatetime, toIso, plumeToDict, windowsToList
+except ImportError:
+    # ---  Run as a script, import from the package
+    selfDir = os.path.dirname( os.path.abspath(__file__) )
+    supPath = os.path.normpath( os.path.join(selfDir, '..') )
+    if os.path.isdir(supPath) and supPath not in sys.path: sys.path.append(supPath)
+    from ASModel          import asapi
+    from ASModel.overflow import Overflow
+    from ASModel.asbatch  import toDatetime, toIso, plumeToDict, windowsToList
+
+LOGGER = logging.getLogger("INRS.ASModel.server")
+
+# ---  Worker side
+def loadDatasets(dataDirs):
+    """
+    Load the datasets in the registry. Raises on a load error.
+    """
+    for dataDir in dataDirs:
+        t0 = time.time()
+        key = asapi.openDataset(dataDir)
+        asapi.getDataset(key).getFingerprint()
+        LOGGER.info('Process %d: %s loaded in %.3fs', os.getpid(), dataDir, time.time()-t0)
+
+def setDiskCaches(cache):
+    """
+    With cache '', each dataset of the registry uses the persistent
+    result cache of its directory. Each process has its own SQLite
+    connection, that can not be shared through fork.
+    """
+    if cache is None: return
+    for key in asapi.getDatasetKeys():
+        asapi.setDiskCache(cache, key)
+
+def initWorker(dataDirs, level, cache=None):
+    """
+    Initialize a worker process. The datasets are inherited from the
+    server process with fork, otherwise they are loaded. It must not
+    raise: multiprocessing.Pool respawns the workers whose initializer
+    fails. On error, the requests are answered with the error.
+    """
+    try:
+        if not hasattr(logging, 'TRACE'):
+            import addLogLevel
+            addLogLevel.addLoggingLevel('TRACE', logging.DEBUG - 5)
+        logging.getLogger("INRS").setLevel(level)
+        if not asapi.getDatasetKeys(): loadDatasets(dataDirs)
+        setDiskCaches(cache)
+    except Exception:
+        LOGGER.exception('Worker %d: initialization failed', os.getpid())
+
+def _getModel(params):
+    return asapi.getDataset( params.get('dataset') )
+
+def _toDelta(params):
+    return datetime.timedelta(seconds=float(params.get('dt', 900)))
+
+def _toOverflows(params):
+    return [ Overflow(o['name'], toDatetime(o['start']), toDatetime(o['end']), o.get('tides', [])) for o in params['overflows'] ]
+
+def _getDatasets(params):
+    res = []
+    for k in asapi.getDatasetKeys():
+        mdl = asapi.getDataset(k)
+        res.append( { 'dataDir': mdl.getDataDir(), 'fingerprint': mdl.getFingerprint() } )
+    return res
+
+def _getInfo(params):
+    return _getModel(params).getInfo()
+
+def _getPointNames(params):
+    return _getModel(params).getPointNames()
+
+def _getPointTideNames(params):
+    return _getModel(params).getPointTideNames(params['name'])
+
+def _getTideSignal(params):
+    sgnl = _getModel(params).getTideSignal(toDatetime(params['start']), toDatetime(params['end']), _toDelta(params))
+    return [ (toIso(t), wl) for t, wl in sgnl ]
+
+def _windowsToDict(wins):
+    dta = wins.getData()
+    cols = { c: dta[c].tolist() for c in ('point', 'overflow', 'transit', 'window', 'dilution') }
+    for c in ('t0', 't1'):
+        cols[c] = np.datetime_as_string(dta[c], unit='s', timezone='UTC').tolist()
+    return { 'names': wins.getNames(), 'items': wins.getItems(), 'columns': cols }
+
+def _getOverflowData(params):
+    fmt = params.get('format', 'nested')
+    if fmt == 'columns':
+        wins = _getModel(params).getOverflowWindows(_toDelta(params), _toOverflows(params), bool(params.get('merge', True)), bool(params.get('match_tides', False)))
+        return _windowsToDict(wins)
+    if fmt != 'nested':
+        raise ValueError('Unknown format: %s' % fmt)
+    dta = _getModel(params).getOverflowData(_toDelta(params), _toOverflows(params), bool(params.get('merge', True)), bool(params.get('match_tides', False)))
+    return [ (name, windowsToList(wins)) for name, wins in dta ]
+
+def _getOverflowDataBatch(params):
+    scns = [ _toOverflows({ 'overflows': ovs }) for ovs in params['scenarios'] ]
+    res  = _getModel(params).getOverflowDataBatch(_toDelta(params), scns, bool(params.get('merge', True)), bool(params.get('match_tides', False)))
+    return [ [ (name, windowsToList(wins)) for name, wins in dta ] for dta in res ]
+
+def _getOverflowPlumes(params):
+    pth = _getModel(params).getOverflowPlumes(_toDelta(params), _toOverflows(params), bool(params.get('match_tides', False)), lazy=True)
+    pth = [ p for p in pth if p.parentName ]    # skip the root, polygon only
+    res = [ plumeToDict(p) for p in pth ]
+    if params.get('paths', False):
+        level = int(params.get('level', 0))
+        asapi.loadPlumes(pth, level)
+        for r, p in zip(res, pth):
+            r['path'] = np.asarray(p.getPath(level)).tolist()
+            p.unload()
+    return res
+
+METHODS = {
+    'getDatasets'       : _getDatasets,
+    'getInfo'           : _getInfo,
+    'getPointNames'     : _getPointNames,
+    'getPointTideNames' : _getPointTideNames,
+    'getTideSignal'     : _getTideSignal,
+    'getOverflowData'   : _getOverflowData,
+    'getOverflowDataBatch': _getOverflowDataBatch,
+    'getOverflowPlumes' : _getOverflowPlumes,
+}
+
+def xeqRequest(method, params):
+    """
+    Evaluate one request.
+    Returns (http status, response)
+    """
+    try:
+        f = METHODS[method]
+    except KeyError:
+        return 404, { 'error': 'Unknown method: %s' % method }
+    try:
+        return 200, { 'result': f(params) }
+    except (KeyError, TypeError, ValueError) as e:
+        LOGGER.debug('%s: invalid params %s', method, str(e))
+        return 400, { 'error': 'Invalid params: %s' % str(e) }
+    except Exception as e:
+        LOGGER.exception(method)
+        return 500, { 'error': str(e) }
+
+def xeqBatch(reqs):
+    """
+    Evaluate a list of (method, params).
+    Returns the list of responses.
+    """
+    return [ xeqRequest(m, p)[1] for m, p in reqs ]
+
+# ---  Server side
+class ASRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True      # headers and body are written separately
+
+    def __reply(self, code, obj):
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type',   'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __readBody(self):
+        n = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(n).decode('utf-8')) if n > 0 else {}
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/status':
+            self.__reply(200, { 'result': self.server.getStatus() })
+        elif url.path.startswith('/api/'):
+            params = { k: v for k, v in urllib.parse.parse_qsl(url.query) }
+            self.__reply( *self.server.xeq(url.path[5:], params) )
+        else:
+            self.__reply(404, { 'error': 'Not found: %s' % url.path })
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        try:
+            body = self.__readBody()
+        except ValueError as e:
+            self.__reply(400, { 'error': 'Invalid JSON: %s' % str(e) })
+            return
+        if url.path == '/batch':
+            if not isinstance(body, list):
+                self.__reply(400, { 'error': 'A batch is a list of requests' })
+                return
+            reqs = [ (r.get('method', ''), r.get('params', {})) for r in body ]
+            self.__reply(200, self.server.xeqBatch(reqs))
+        elif url.path.startswith('/api/'):
+            self.__reply( *self.server.xeq(url.path[5:], body) )
+        else:
+            self.__reply(404, { 'error': 'Not found: %s' % url.path })
+
+    def log_message(self, format, *args):
+        LOGGER.debug('%s - %s', self.address_string(), format % args)
+
+class ASServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, dataDirs, address=('127.0.0.1', 0), nworkers=4, cache=None):
+        http.server.ThreadingHTTPServer.__init__(self, address, ASRequestHandler)
+        self.dataDirs = [dataDirs] if isinstance(dataDirs, str) else list(dataDirs)
+        self.nworkers = nworkers
+        self.nrequest = 0
+        self.lock     = threading.Lock()
+        self.pool     = None
+        # ---  Load in the server process, the workers inherit the
+        # ---  datasets copy-on-write with fork
+        try:
+            loadDatasets(self.dataDirs)
+        except Exception:
+            http.server.ThreadingHTTPServer.server_close(self)
+            raise
+        if nworkers > 0:
+            lvl = logging.getLogger("INRS").getEffectiveLevel()
+            ctx = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else multiprocessing.get_context()
+            self.pool = ctx.Pool(nworkers, initializer=initWorker, initargs=(self.dataDirs, lvl, cache))
+        else:
+            setDiskCaches(cache)
+
+    def __count(self, n):
+        with self.lock:
+            self.nrequest += n
+
+    def xeq(self, method, params):
+        self.__count(1)
+        if self.pool:
+            return self.pool.apply(xeqRequest, (method, params))
+        return xeqRequest(method, params)
+
+    def xeqBatch(self, reqs):
+        self.__count(len(reqs))
+        if not self.pool or len(reqs) <= 1:
+            return self.pool.apply(xeqBatch, (reqs,)) if self.pool else xeqBatch(reqs)
+        n = (len(reqs) + self.nworkers - 1) // self.nworkers
+        chunks = [ reqs[i:i+n] for i in range(0, len(reqs), n) ]
+        res = []
+        for r in self.pool.map(xeqBatch, chunks, chunksize=1):
+            res.extend(r)
+        return res
+
+    def getStatus(self):
+        return { 'dataDirs': self.dataDirs, 'workers': self.nworkers, 'requests': self.nrequest }
+
+    def server_close(self):
+        http.server.ThreadingHTTPServer.server_close(self)
+        if self.pool:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+def serve(dataDirs, port=0, nworkers=4, cache=None):
+    """
+    Start a server on localhost in a background thread, for the
+    dataset directory or list of directories dataDirs.
+    The datasets are loaded before returning, a load error is raised.
+    port=0 selects a free port, see server.server_address.
+    With cache '', the persistent result caches of the datasets are used.
+    Stop the server with server.shutdown() then server.server_close().
+    """
+    server = ASServer(dataDirs, ('127.0.0.1', port), nworkers, cache)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    LOGGER.info('Server on http://%s:%i, serving %s', server.server_address[0], server.server_address[1], ', '.join(server.dataDirs))
+    return server
+
+if __name__ == '__main__':
+    def main():
+        if not hasattr(logging, 'TRACE'):
+            import addLogLevel
+            addLogLevel.addLoggingLevel('TRACE', logging.DEBUG - 5)
+
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.INFO)
+
+        parser = optparse.OptionParser(usage='%prog [options] data_dir [data_dir ...]')
+        parser.add_option('-p', '--port', dest='port',     default=8010, type='int', help='port [%default]')
+        parser.add_option('-j', '--jobs', dest='nworkers', default=4,    type='int', help='worker processes, 0 for none [%default]')
+        parser.add_option('-C', '--cache', dest='cache',   default=None, action='store_const', const='', help='persistent result cache, in each dataset directory')
+        opts, args = parser.parse_args()
+        if len(args) < 1: parser.error('data_dir is required')
+
+        server = ASServer(args, ('127.0.0.1', opts.port), opts.nworkers, opts.cache)
+        LOGGER.info('Serving %s on http://127.0.0.1:%i', ', '.join(args), opts.port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    main()
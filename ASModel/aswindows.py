@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Columnar exposure windows
+
+The exposure windows of getOverflowData are nested lists:
+    point -> transit -> window -> (t0, t1, dilution)
+ASWindows holds the same information as a NumPy structured array,
+one row per time step of a window.
+"""
+
+import datetime
+import logging
+
+import numpy as np
+import pytz
+
+LOGGER = logging.getLogger("INRS.ASModel.windows")
+
+# ---  Times are UTC, without time zone
+WINDOWS_DTYPE = np.dtype([
+    ('point',    np.int32),         # index in names
+    ('overflow', np.int32),         # index in items
+    ('transit',  np.int16),         # transit index
+    ('window',   np.int32),         # window index, in the transit
+    ('t0',       'datetime64[us]'),
+    ('t1',       'datetime64[us]'),
+    ('dilution', np.float64),
+])
+
+SLOT_DELTA = np.timedelta64(900, 's')
+
+class ASWindows:
+    """
+    Exposure windows as a structured array of dtype WINDOWS_DTYPE.
+
+    names are the distinct point names, items are, for each overflow
+    in the order of the request, the pair (point index, number of
+    transits). The items keep the overflows and transits without any
+    window, required to get back the nested lists.
+    """
+    def __init__(self, data=None, names=(), items=()):
+        self.m_data  = data if data is not None else np.empty(0, dtype=WINDOWS_DTYPE)
+        self.m_names = list(names)
+        self.m_items = [ (int(i), int(n)) for i, n in items ]
+
+    def __len__(self):
+        return self.m_data.shape[0]
+
+    def __getitem__(self, col):
+        """
+        Column col, as a view on the data
+        """
+        return self.m_data[col]
+
+    def __str__(self):
+        return 'ASWindows(%d overflows, %d rows)' % (len(self.m_items), len(self))
+
+    def getData(self):
+        return self.m_data
+
+    def getNames(self):
+        return self.m_names
+
+    def getItems(self):
+        return self.m_items
+
+    def getPointNames(self):
+        """
+        Point name of each row
+        """
+        return np.array(self.m_names, dtype=object)[self.m_data['point']]
+
+    @staticmethod
+    def fromColumns(cols):
+        """
+        Build from cols, a list with, for each overflow, the tuple
+        (name, t_start, (ntransit, transit, window, slot, dilution))
+        as returned by OverflowPoint.doOverflowBatch(columnar=True).
+        """
+        names = {}
+        items = []
+        n = sum(c[2][1].shape[0] for c in cols)
+        data = np.empty(n, dtype=WINDOWS_DTYPE)
+        i0 = 0
+        for io, (name, t_start, (ntr, tr, wn, js, dl)) in enumerate(cols):
+            ip = names.setdefault(name, len(names))
+            items.append( (ip, ntr) )
+            i1 = i0 + tr.shape[0]
+            t  = np.datetime64(t_start.astimezone(pytz.utc).replace(tzinfo=None), 'us')
+            rows = data[i0:i1]
+            rows['point']    = ip
+            rows['overflow'] = io
+            rows['transit']  = tr
+            rows['window']   = wn
+            rows['t0']       = t + js*SLOT_DELTA
+            rows['t1']       = rows['t0'] + SLOT_DELTA
+            rows['dilution'] = dl
+            i0 = i1
+        return ASWindows(data, names.keys(), items)
+
+    @staticmethod
+    def fromOverflowData(dta):
+        """
+        Build from dta, the result of getOverflowData:
+            [ (name, [ [ [(t0, t1, dilution), ...], ...], ... ]), ... ]
+        """
+        names = {}
+        items = []
+        rows  = []
+        for io, (name, wins) in enumerate(dta):
+            ip = names.setdefault(name, len(names))
+            items.append( (ip, len(wins)) )
+            for it, ps in enumerate(wins):
+                for iw, p in enumerate(ps):
+                    for t0, t1, d in p:
+                        t0 = t0.astimezone(pytz.utc).replace(tzinfo=None)
+                        t1 = t1.astimezone(pytz.utc).replace(tzinfo=None)
+                        rows.append( (ip, io, it, iw, t0, t1, d) )
+        return ASWindows(np.array(rows, dtype=WINDOWS_DTYPE), names.keys(), items)
+
+    def toOverflowData(self):
+        """
+        Back to the nested lists of getOverflowData, with aware UTC
+        datetimes.
+        """
+        res = [ (self.m_names[ip], [ [] for _ in range(ntr) ]) for ip, ntr in self.m_items ]
+        t0s = self.m_data['t0'].astype(datetime.datetime)
+        t1s = self.m_data['t1'].astype(datetime.datetime)
+        lst = (-1, -1, -1)
+        p = None
+        for r, t0, t1 in zip(self.m_data.tolist(), t0s, t1s):
+            key = r[1:4]
+            if key != lst:
+                p = []
+                res[r[1]][1][r[2]].append(p)
+                lst = key
+            p.append( (t0.replace(tzinfo=pytz.utc), t1.replace(tzinfo=pytz.utc), r[6]) )
+        return res
+
+    def save(self, fname):
+        """
+        Save to the .npz file fname. The array is written as is,
+        without conversion.
+        """
+        items = np.array(self.m_items, dtype=np.int32).reshape(-1, 2)
+        np.savez(fname, data=self.m_data, names=np.array(self.m_names, dtype=str), items=items)
+
+    @staticmethod
+    def load(fname):
+        """
+        Load from the .npz file fname, written by save().
+        """
+        with np.load(fname, allow_pickle=False) as f:
+            return ASWindows(f['data'], f['names'].tolist(), f['items'].tolist())
+
+    def toDataFrame(self):
+        """
+        Returns a pandas DataFrame, the point column being a
+        categorical of the point names. Requires pandas.
+        """
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError('ASWindows.toDataFrame requires pandas') from e
+        df = pd.DataFrame(self.m_data)
+        df['point'] = pd.Categorical.from_codes(self.m_data['point'], categories=self.m_names)
+        return df
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Persistent result cache
+
+Results are stored as compressed JSON in a SQLite database, keyed by
+the dataset fingerprint and a key hash. The database is shared by
+threads and processes (WAL journal), and survives restarts.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+LOGGER = logging.getLogger("INRS.ASModel.diskcache")
+
+DISK_CACHE_NAME = 'asresults.sqlite'   # Default file name, in the dataset directory
+DISK_CACHE_SIZE = 1024*1024*1024       # Default budget [bytes]
+
+def getKeyHash(key):
+    """
+    Returns the hash of key, a JSON serializable value
+    """
+    return hashlib.md5( json.dumps(key, separators=(',', ':')).encode('utf-8') ).hexdigest()
+
+class DiskCache:
+    """
+    Thread and process safe persistent cache, bounded by the total
+    size in bytes of its compressed items. The least recently used
+    items are removed by trim(), called on put every TRIM_EVERY items.
+    """
+    TRIM_EVERY = 256
+
+    def __init__(self, fname, maxBytes=DISK_CACHE_SIZE):
+        self.m_fname = fname
+        self.m_max   = maxBytes
+        self.m_lock  = threading.Lock()
+        self.m_conn  = sqlite3.connect(fname, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self.m_hits  = 0
+        self.m_miss  = 0
+        self.m_nput  = 0
+        with self.m_lock:
+            self.m_conn.execute('PRAGMA journal_mode=WAL')
+            self.m_conn.execute('PRAGMA synchronous=NORMAL')
+            self.m_conn.execute('CREATE TABLE IF NOT EXISTS results ('
+                                'fingerprint TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+                                'nbytes INTEGER NOT NULL, atime REAL NOT NULL, '
+                                'PRIMARY KEY (fingerprint, key)) WITHOUT ROWID')
+            self.m_conn.execute('CREATE INDEX IF NOT EXISTS results_atime ON results (atime)')
+        LOGGER.debug('DiskCache: %s', fname)
+
+    def getFileName(self):
+        return self.m_fname
+
+    def get(self, fingerprint, key):
+        """
+        Returns the value for (fingerprint, key), None if absent
+        """
+        with self.m_lock:
+            row = self.m_conn.execute('SELECT value FROM results WHERE fingerprint=? AND key=?', (fingerprint, key)).fetchone()
+            if row is None:
+                self.m_miss += 1
+                return None
+            self.m_conn.execute('UPDATE results SET atime=? WHERE fingerprint=? AND key=?', (time.time(), fingerprint, key))
+            self.m_hits += 1
+        return json.loads( zlib.decompress(row[0]).decode('utf-8') )
+
+    def put(self, fingerprint, key, value):
+        """
+        Add or replace the JSON serializable value for (fingerprint, key)
+        """
+        blob = zlib.compress( json.dumps(value, separators=(',', ':')).encode('utf-8') )
+        with self.m_lock:
+            self.m_conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', (fingerprint, key, blob, len(blob), time.time()))
+            self.m_nput += 1
+            doTrim = self.m_nput % DiskCache.TRIM_EVERY == 0
+        if doTrim: self.trim()
+
+    def trim(self):
+        """
+        Remove the least recently used items to fit the budget
+        """
+        with self.m_lock:
+            nbytes = self.m_conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM results').fetchone()[0]
+            if nbytes <= self.m_max: return
+            self.m_conn.execute('BEGIN IMMEDIATE')
+            try:
+                cur = self.m_conn.execute('SELECT fingerprint, key, nbytes FROM results ORDER BY atime')
+                dels = []
+                for fp, k, n in cur:
+                    if nbytes <= self.m_max: break
+                    dels.append( (fp, k) )
+                    nbytes -= n
+                cur.close()
+                self.m_conn.executemany('DELETE FROM results WHERE fingerprint=? AND key=?', dels)
+                self.m_conn.execute('COMMIT')
+            except Exception:
+                self.m_conn.execute('ROLLBACK')
+                raise
+        LOGGER.debug('DiskCache.trim: %d items removed', len(dels))
+
+    def clear(self, fingerprint=None):
+        """
+        Remove the items of fingerprint, all of them if None
+        """
+        with self.m_lock:
+            if fingerprint is None:
+                self.m_conn.execute('DELETE FROM results')
+            else:
+                self.m_conn.execute('DELETE FROM results WHERE fingerprint=?', (fingerprint,))
+
+    def close(self):
+        with self.m_lock:
+            if self.m_conn: self.m_conn.close()
+            self.m_conn = None
+
+    def getStats(self):
+        """
+        Returns the cache statistics as a dict
+        """
+        with self.m_lock:
+            n, nbytes = self.m_conn.execute('SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results').fetchone()
+            return {
+                'hits'     : self.m_hits,
+                'misses'   : self.m_miss,
+                'items'    : n,
+                'bytes'    : nbytes,
+                'maxBytes' : self.m_max,
+                'file'     : self.m_fname,
+            }
+
+    def __str__(self):
+        s = self.getStats()
+        return 'DiskCache %s: %i items, %i/%i bytes, hits=%i, misses=%i' % \
+            (self.m_fname, s['items'], s['bytes'], s['maxBytes'], s['hits'], s['misses'])
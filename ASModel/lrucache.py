@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+LRU cache with a memory budget
+"""
+
+import collections
+import logging
+import threading
+
+LOGGER = logging.getLogger("INRS.ASModel.lrucache")
+
+class LRUCache:
+    """
+    Thread safe LRU cache, bounded by the total size in bytes of its
+    items. The size of an item is given by the function sizeof, or
+    explicitly on put. Items bigger than the budget are not kept.
+    """
+    def __init__(self, maxBytes, sizeof=None, name=''):
+        self.m_name  = name
+        self.m_max   = maxBytes
+        self.m_size  = sizeof if sizeof else lambda v: 0
+        self.m_lock  = threading.Lock()
+        self.m_items = collections.OrderedDict()    # key -> (value, nbytes)
+        self.m_bytes = 0
+        self.m_hits  = 0
+        self.m_miss  = 0
+        self.m_evict = 0
+
+    def __len__(self):
+        return len(self.m_items)
+
+    def __contains__(self, key):
+        return key in self.m_items
+
+    def __evict(self):
+        while self.m_bytes > self.m_max and self.m_items:
+            k, (v, n) = self.m_items.popitem(last=False)
+            self.m_bytes -= n
+            self.m_evict += 1
+
+    def get(self, key, default=None):
+        """
+        Returns the item for key, and mark it as most recently used.
+        Returns default if key is absent.
+        """
+        with self.m_lock:
+            try:
+                v, n = self.m_items[key]
+            except KeyError:
+                self.m_miss += 1
+                return default
+            self.m_items.move_to_end(key)
+            self.m_hits += 1
+            return v
+
+    def put(self, key, value, nbytes=None):
+        """
+        Add or replace the item for key. Least recently used items are
+        evicted to fit the budget.
+        """
+        n = self.m_size(value) if nbytes is None else nbytes
+        with self.m_lock:
+            try:
+                self.m_bytes -= self.m_items.pop(key)[1]
+            except KeyError:
+                pass
+            if n > self.m_max: return
+            self.m_items[key] = (value, n)
+            self.m_bytes += n
+            self.__evict()
+
+    def pop(self, key, default=None):
+        with self.m_lock:
+            try:
+                v, n = self.m_items.pop(key)
+            except KeyError:
+                return default
+            self.m_bytes -= n
+            return v
+
+    def clear(self):
+        with self.m_lock:
+            self.m_items.clear()
+            self.m_bytes = 0
+
+    def getMaxBytes(self):
+        return self.m_max
+
+    def setMaxBytes(self, maxBytes):
+        with self.m_lock:
+            self.m_max = maxBytes
+            self.__evict()
+
+    def getStats(self):
+        """
+        Returns the cache statistics as a dict
+        """
+        with self.m_lock:
+            return {
+                'hits'     : self.m_hits,
+                'misses'   : self.m_miss,
+                'evictions': self.m_evict,
+                'items'    : len(self.m_items),
+                'bytes'    : self.m_bytes,
+                'maxBytes' : self.m_max,
+            }
+
+    def resetStats(self):
+        with self.m_lock:
+            self.m_hits  = 0
+            self.m_miss  = 0
+            self.m_evict = 0
+
+    def __str__(self):
+        s = self.getStats()
+        return 'LRUCache %s: %i items, %i/%i bytes, hits=%i, misses=%i, evictions=%i' % \
+            (self.m_name, s['items'], s['bytes'], s['maxBytes'], s['hits'], s['misses'], s['evictions'])
@@ -0,0 +1,464 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Particle path store
+
+A particle path (plume) is a sequence of rows
+    (t, x, y, dilution, e1, e2, angle)
+originally stored as one pickle file path-<md5>.pkl per path, in the
+sub-directory of each overflow point.
+
+packPaths() packs all the paths of a dataset in one contiguous float32
+file, with an index md5 -> (offset, length). PathStore memory maps the
+packed file and returns zero-copy views. Paths not in the packed file
+are still read from the pickle files.
+
+Loaded paths are kept in PATH_CACHE, a process-wide LRU cache keyed
+by md5 and bounded in bytes.
+
+The path files are located with PathIndex, a md5 -> full path map built
+by scanning each directory once.
+
+For display, a path is also available at a few levels of detail (LOD),
+simplified with Douglas-Peucker at the tolerances LOD_TOLERANCES. Level 0
+is the full path, level k is simplified at LOD_TOLERANCES[k-1]. A level
+keeps a subset of the rows, with all their columns. The levels are
+precomputed by packPaths() in PACK_LOD, and computed on demand otherwise.
+
+Paths are always returned as contiguous float32 (n, PATH_NCOLS) arrays.
+Optionally, the paths read from the pickle files are kept in PATH_CACHE
+as QuantizedPath, with the coordinates on int16 relative to the
+project bounding box, and decoded on access.
+"""
+
+import logging
+import os
+import pickle
+import threading
+
+import numpy as np
+
+try:
+    from .lrucache import LRUCache
+except ImportError:
+    from lrucache import LRUCache
+
+LOGGER = logging.getLogger("INRS.ASModel.pathstore")
+
+PATH_NCOLS = 7                      # t, x, y, dilution, e1, e2, angle
+PACK_DATA  = 'paths.f32'            # Packed data file
+PACK_INDEX = 'paths.idx.npy'        # Packed index file
+PACK_LOD   = 'paths.lod.npz'        # Packed levels of detail
+LOD_TOLERANCES = (2.0, 10.0, 50.0)  # [m] Douglas-Peucker tolerance of LOD 1, 2, ...
+INDEX_DTYPE = np.dtype([('md5', 'S32'), ('offset', 'i8'), ('length', 'i8')])
+
+PATH_CACHE_SIZE = 256*1024*1024     # Default budget of PATH_CACHE [bytes]
+
+def getPathSize(pth):
+    """
+    Memory size of a path [bytes]. Paths as lists of rows are
+    estimated at 8 bytes per value plus the Python objects overhead.
+    """
+    try:
+        return pth.nbytes
+    except AttributeError:
+        return len(pth) * (PATH_NCOLS*32 + 64)
+
+# ---  Process-wide cache of the loaded paths
+PATH_CACHE = LRUCache(PATH_CACHE_SIZE, sizeof=getPathSize, name='paths')
+
+def normalizePath(pth):
+    """
+    Returns the path as a contiguous float32 (n, PATH_NCOLS) array.
+    Arrays already in this form are returned as is.
+    """
+    return np.ascontiguousarray(np.asarray(pth, dtype=np.float32).reshape(-1, PATH_NCOLS))
+
+class QuantizedPath:
+    """
+    Compact encoding of a path. The coordinates x, y and the ellipse
+    axes e1, e2 are stored on int16 relative to a bounding box, the
+    angle on int16 over [-pi, pi[. The time and dilution stay float32.
+    18 bytes per row, instead of 28 in float32.
+    """
+    QMAX = 32767
+
+    def __init__(self, pth, bbox):
+        """
+        pth is the path, bbox is (xmin, ymin, xmax, ymax). Raises
+        ValueError if the path does not fit in the bounding box.
+        """
+        pth = np.asarray(pth, dtype=np.float64).reshape(-1, PATH_NCOLS)
+        x0, y0, x1, y1 = bbox
+        self.m_org = np.array( [(x0+x1)*0.5, (y0+y1)*0.5] )
+        self.m_scl = max(x1-x0, y1-y0, 1.0) / (2*QuantizedPath.QMAX)
+        qxy = np.rint( (pth[:,1:3]-self.m_org) / self.m_scl )
+        qee = np.rint( pth[:,4:6] / self.m_scl )
+        if np.any(np.abs(qxy) > QuantizedPath.QMAX) or np.any(np.abs(qee) > QuantizedPath.QMAX):
+            raise ValueError('QuantizedPath: path outside of bounding box')
+        qag = np.rint( (np.remainder(pth[:,6]+np.pi, 2*np.pi)-np.pi) * (QuantizedPath.QMAX/np.pi) )
+        self.m_q = np.empty((pth.shape[0], 5), dtype=np.int16)   # x, y, e1, e2, angle
+        self.m_q[:,0:2] = qxy
+        self.m_q[:,2:4] = qee
+        self.m_q[:,4]   = np.clip(qag, -QuantizedPath.QMAX, QuantizedPath.QMAX)
+        self.m_f = pth[:,[0,3]].astype(np.float32)                # t, dilution
+
+    def __len__(self):
+        return self.m_q.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.m_q.nbytes + self.m_f.nbytes
+
+    def decode(self):
+        """
+        Returns the path as a float32 (n, PATH_NCOLS) array
+        """
+        pth = np.empty((self.m_q.shape[0], PATH_NCOLS), dtype=np.float32)
+        pth[:,0]   = self.m_f[:,0]
+        pth[:,1:3] = self.m_q[:,0:2]*self.m_scl + self.m_org
+        pth[:,3]   = self.m_f[:,1]
+        pth[:,4:6] = self.m_q[:,2:4]*self.m_scl
+        pth[:,6]   = self.m_q[:,4]*(np.pi/QuantizedPath.QMAX)
+        return pth
+
+def getPathFileName(md5):
+    return 'path-%s.pkl' % (md5)
+
+def readPathFile(fullPath):
+    """
+    Read a pickled path file
+    """
+    with open(fullPath, 'rb') as f:
+        return pickle.load(f, encoding='bytes')
+
+def findPath(md5, pathDirs):
+    """
+    Search the path file for md5 in the directories pathDirs.
+    Returns the full path or None.
+    See PathIndex for repeated searches.
+    """
+    fname = getPathFileName(md5)
+    for p in pathDirs:
+        fullPath = os.path.join(p, fname)
+        if os.path.isfile(fullPath):
+            return fullPath
+    return None
+
+def simplifyPath(xy, tol):
+    """
+    Douglas-Peucker simplification of the polyline xy (n, 2).
+    Returns the indices of the kept points, first and last included.
+    """
+    n = xy.shape[0]
+    if n <= 2: return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [ (0, n-1) ]
+    while stack:
+        i0, i1 = stack.pop()
+        if i1 - i0 < 2: continue
+        p0 = xy[i0]
+        dp = xy[i1] - p0
+        dv = xy[i0+1:i1] - p0
+        l  = np.hypot(dp[0], dp[1])
+        if l > 0.0:
+            d = np.abs(dp[0]*dv[:,1] - dp[1]*dv[:,0]) / l
+        else:
+            d = np.hypot(dv[:,0], dv[:,1])
+        k = int(np.argmax(d))
+        if d[k] > tol:
+            im = i0 + 1 + k
+            keep[im] = True
+            stack.append( (i0, im) )
+            stack.append( (im, i1) )
+    return np.nonzero(keep)[0]
+
+def getLevelForResolution(res):
+    """
+    Returns the coarsest level of detail with a tolerance below half
+    of the resolution res (typically the size of a pixel) [m].
+    """
+    lvl = 0
+    for i, tol in enumerate(LOD_TOLERANCES):
+        if tol <= 0.5*res: lvl = i+1
+    return lvl
+
+def packPaths(dataDir):
+    """
+    Pack all the path files found in the sub-directories of dataDir
+    in PACK_DATA, with the index in PACK_INDEX and the levels of detail
+    in PACK_LOD. Paths are written once, even if present in many
+    directories.
+    Returns the number of paths packed.
+    """
+    # ---  Collect the files, first one wins
+    files = {}
+    for d in sorted(os.scandir(dataDir), key=lambda e: e.name):
+        if not d.is_dir(): continue
+        for e in os.scandir(d.path):
+            if e.name.startswith('path-') and e.name.endswith('.pkl'):
+                files.setdefault(e.name[5:-4], e.path)
+    LOGGER.info('packPaths: %d paths found in %s', len(files), dataDir)
+
+    # ---  Write data, then levels of detail and index
+    index = np.empty(len(files), dtype=INDEX_DTYPE)
+    lodRows = [ [] for _ in LOD_TOLERANCES ]
+    lodOffs = [ np.zeros(len(files)+1, dtype=np.int64) for _ in LOD_TOLERANCES ]
+    fData = os.path.join(dataDir, PACK_DATA)
+    tmax  = 0.0
+    offset= 0
+    with open(fData+'.tmp', 'wb') as f:
+        for i, md5 in enumerate(sorted(files)):
+            pth = normalizePath( readPathFile(files[md5]) )
+            f.write( pth.tobytes() )
+            index[i] = (md5.encode('ascii'), offset, pth.shape[0])
+            offset += pth.shape[0]
+            if pth.shape[0] > 0: tmax = max(tmax, float(np.max(np.abs(pth[:,0]))))
+            xy = pth[:,1:3].astype(np.float64)
+            for k, tol in enumerate(LOD_TOLERANCES):
+                rows = simplifyPath(xy, tol).astype(np.int32)
+                lodRows[k].append(rows)
+                lodOffs[k][i+1] = lodOffs[k][i] + rows.shape[0]
+    if tmax > 2**24:
+        LOGGER.warning('packPaths: time values up to %.0f lose precision in float32', tmax)
+    os.replace(fData+'.tmp', fData)
+    fLod = os.path.join(dataDir, PACK_LOD)
+    lods = { 'tolerances': np.array(LOD_TOLERANCES) }
+    for k in range(len(LOD_TOLERANCES)):
+        lods['rows_%d' % k] = np.concatenate(lodRows[k]) if lodRows[k] else np.empty(0, dtype=np.int32)
+        lods['offsets_%d' % k] = lodOffs[k]
+    with open(fLod+'.tmp', 'wb') as f:
+        np.savez(f, **lods)
+    os.replace(fLod+'.tmp', fLod)
+    fIndex = os.path.join(dataDir, PACK_INDEX)
+    with open(fIndex+'.tmp', 'wb') as f:
+        np.save(f, index)
+    os.replace(fIndex+'.tmp', fIndex)
+    LOGGER.info('packPaths: %d paths, %d rows written to %s', index.shape[0], offset, fData)
+    return index.shape[0]
+
+class PathIndex:
+    """
+    Index of the path files, by directory: md5 -> full path.
+    A directory is scanned on first use. On a miss, only the
+    directories whose mtime has changed are scanned again.
+    """
+    def __init__(self):
+        self.m_lock  = threading.Lock()
+        self.m_dirs  = {}           # dir -> (mtime, {md5: full path})
+
+    def __scan(self, pathDir):
+        files = {}
+        try:
+            mtime = os.stat(pathDir).st_mtime_ns
+            with os.scandir(pathDir) as it:
+                for e in it:
+                    if e.name.startswith('path-') and e.name.endswith('.pkl'):
+                        files[e.name[5:-4]] = e.path
+        except FileNotFoundError:
+            mtime = -1
+        LOGGER.debug('PathIndex: %d path files in %s', len(files), pathDir)
+        self.m_dirs[pathDir] = (mtime, files)
+        return files
+
+    def __refresh(self, pathDirs):
+        """
+        Scan again the directories that have changed.
+        Returns True if any directory was scanned.
+        """
+        done = False
+        for p in pathDirs:
+            try:
+                mtime = os.stat(p).st_mtime_ns
+            except FileNotFoundError:
+                mtime = -1
+            if mtime != self.m_dirs[p][0]:
+                self.__scan(p)
+                done = True
+        return done
+
+    def __find(self, md5, pathDirs):
+        for p in pathDirs:
+            try:
+                files = self.m_dirs[p][1]
+            except KeyError:
+                files = self.__scan(p)
+            try:
+                return files[md5]
+            except KeyError:
+                pass
+        return None
+
+    def find(self, md5, pathDirs):
+        """
+        Search the path file for md5 in the directories pathDirs.
+        Returns the full path or None.
+        """
+        with self.m_lock:
+            fullPath = self.__find(md5, pathDirs)
+            if fullPath is None and self.__refresh(pathDirs):
+                fullPath = self.__find(md5, pathDirs)
+            return fullPath
+
+    def clear(self):
+        with self.m_lock:
+            self.m_dirs = {}
+
+class PathStore:
+    """
+    Access to the particle paths of a dataset.
+    Paths are read from the packed file if present, otherwise from
+    the pickle files.
+    """
+    def __init__(self, dataDir=''):
+        self.m_dataDir = dataDir
+        self.m_data    = None       # Memory mapped (n, PATH_NCOLS) float32 array
+        self.m_index   = {}         # md5 -> (offset, length, row in index)
+        self.m_lod     = []         # for each level, (rows, offsets)
+        self.m_files   = PathIndex()
+        self.m_qbbox   = None       # Bounding box for the quantization
+        if dataDir: self.open(dataDir)
+
+    def open(self, dataDir):
+        """
+        Memory map the packed file, if any
+        """
+        self.m_dataDir = dataDir
+        fData  = os.path.join(dataDir, PACK_DATA)
+        fIndex = os.path.join(dataDir, PACK_INDEX)
+        if not os.path.isfile(fData) or not os.path.isfile(fIndex):
+            return
+        index = np.load(fIndex)
+        if os.path.getsize(fData) > 0:
+            data = np.memmap(fData, dtype=np.float32, mode='r')
+            self.m_data = data.reshape(-1, PATH_NCOLS)
+        else:
+            self.m_data = np.empty((0, PATH_NCOLS), dtype=np.float32)
+        md5s = np.char.decode(index['md5'], 'ascii').tolist()
+        self.m_index = dict( zip(md5s, zip(index['offset'].tolist(), index['length'].tolist(), range(len(md5s)))) )
+        LOGGER.info('PathStore: %d packed paths in %s', len(self.m_index), fData)
+
+        # ---  Levels of detail, if computed with the same tolerances
+        self.m_lod = []
+        fLod = os.path.join(dataDir, PACK_LOD)
+        if os.path.isfile(fLod):
+            with np.load(fLod) as lods:
+                if tuple(lods['tolerances'].tolist()) == LOD_TOLERANCES:
+                    self.m_lod = [ (lods['rows_%d' % k], lods['offsets_%d' % k]) for k in range(len(LOD_TOLERANCES)) ]
+                else:
+                    LOGGER.warning('PathStore: %s built with other tolerances, ignored', fLod)
+
+    def isPacked(self):
+        return self.m_data is not None
+
+    def setQuantization(self, bbox=None):
+        """
+        Keep the paths read from the pickle files quantized relative to
+        bbox (xmin, ymin, xmax, ymax) in PATH_CACHE. None to disable.
+        The packed paths are memory mapped and never quantized.
+        """
+        self.m_qbbox = tuple(bbox) if bbox else None
+
+    def getQuantization(self):
+        return self.m_qbbox
+
+    def findPath(self, md5, pathDirs=[]):
+        """
+        Returns the full path of the path file for md5 in pathDirs,
+        or None.
+        """
+        return self.m_files.find(md5, pathDirs)
+
+    def getPathLength(self, md5):
+        """
+        Returns the number of rows of the path for md5, without loading
+        it. Only known for packed paths, -1 otherwise.
+        """
+        try:
+            return self.m_index[md5][1]
+        except KeyError:
+            return -1
+
+    def getPath(self, md5, pathDirs=[], level=0):
+        """
+        Returns the path for md5, from PATH_CACHE, as a zero-copy view
+        in the packed file, or as read from the pickle file in pathDirs.
+        With level > 0, returns the path simplified at that level of
+        detail, as an array.
+        Returns None if not found.
+        """
+        if level > 0:
+            return self.__getPathLOD(md5, pathDirs, min(level, len(LOD_TOLERANCES)))
+        pth = PATH_CACHE.get(md5)
+        if pth is not None:
+            return pth.decode() if isinstance(pth, QuantizedPath) else pth
+        try:
+            offset, length, i = self.m_index[md5]
+            pth = self.m_data[offset:offset+length]
+            PATH_CACHE.put(md5, pth)
+        except KeyError:
+            fullPath = self.m_files.find(md5, pathDirs)
+            if not fullPath: return None
+            pth = normalizePath( readPathFile(fullPath) )
+            PATH_CACHE.put(md5, self.__quantize(pth))
+        return pth
+
+    def __quantize(self, pth):
+        if not self.m_qbbox: return pth
+        try:
+            return QuantizedPath(pth, self.m_qbbox)
+        except ValueError:
+            return pth
+
+    def __getPathLOD(self, md5, pathDirs, level):
+        key = (md5, level)
+        pth = PATH_CACHE.get(key)
+        if pth is not None:
+            return pth
+        try:
+            offset, length, i = self.m_index[md5]
+            rows, offs = self.m_lod[level-1]
+            pth = self.m_data[offset + rows[offs[i]:offs[i+1]]]
+        except (KeyError, IndexError):
+            pth = self.getPath(md5, pathDirs)
+            if pth is None: return None
+            rows = simplifyPath(pth[:,1:3].astype(np.float64), LOD_TOLERANCES[level-1])
+            pth = pth[rows]
+        PATH_CACHE.put(key, pth)
+        return pth
+
+if __name__ == '__main__':
+    import sys
+    def main():
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.INFO)
+
+        if len(sys.argv) < 2:
+            print('Usage: pathstore.py data_dir ...')
+            print('   Pack the particle paths of each data_dir')
+            sys.exit(1)
+        for dataDir in sys.argv[1:]:
+            packPaths(dataDir)
+
+    main()
@@ -12,17 +12,25 @@ cimport tide
 
 cpdef long         nint            (double d)
 
+@cython.locals (dteff = datetime.timedelta, it = long, neff = long)
+cpdef list         getSpillTimes   (datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt)
+
+cpdef object       getPlumeExecutor()
+
+@cython.locals (todo = list)
+cpdef              loadPlumes      (list plumes, long level=*)
+
 cdef class Hit:
     cdef public double       a
-    cdef public bint         dd
     cdef public long         ix
     cdef public long         iy
-    cdef public str          md5
     cdef public object       pnt
     cdef public datetime.datetime t0
     cdef public datetime.datetime tc
 
 cdef class OverflowPointOneTide(object):
+    cdef public dict         m_cycleIdxs
+    cdef public long         m_cycleNo
     cdef public str          m_dataDir
     cdef public double       m_dh
     cdef public double       m_dilution
@@ -30,6 +38,7 @@ cdef class OverflowPointOneTide(object):
     cdef public double       m_dt
     cdef public list         m_pathDirs
     cdef public dict         m_pathDta
+    cdef public object       m_pathStore
     cdef public object       m_river
     cdef public dict         m_tideDta
     #
@@ -46,20 +55,30 @@ cdef class OverflowPointOneTide(object):
     cpdef tuple        __getSingleTideData(OverflowPointOneTide self, long ix, long iy)
     @cython.locals (dta = tuple)
     cpdef tuple        __getSinglePathData(OverflowPointOneTide self, long ix, long iy)
-    @cython.locals (a = double, dd = bint, dt_rvr = double, hits = list, ix = long, iy = long, iy_ = long, j_hit = long, jmax = long, md5 = str, t2bd = list, t2bds = list, t_hit = datetime.datetime, t_rvr = object)
-    cpdef object       __getHitsForOneSpill(OverflowPointOneTide self, datetime.datetime t_actu, datetime.datetime t_start, tide.TideTable tide_tbl)
+    @cython.locals (res = list, row = dict, rows = dict)
+    cpdef list         getPathData     (OverflowPointOneTide self, object ixys)
+    @cython.locals (a = double, dt_rvr = double, hits = list, ix = long, iy = long, j_hit = long, jmax = long, t2bd = list, t2bds = list, t_hit = datetime.datetime, t_rvr = object)
+    cpdef object       __getHitsForOneSpill(OverflowPointOneTide self, datetime.datetime t_actu, datetime.datetime t_start, tide.TideStation tide_tbl, long cycle_index=*)
     @cython.locals (j = long, ov = list, rv = list)
     cpdef object       __reduceHits    (OverflowPointOneTide self, list t2bdg, list t2bds)
-    @cython.locals (dteff = datetime.timedelta, it = long, neff = long, t = object, t2bdg = list, t2bds = list, t2bds_tmp = list, t_actu = datetime.datetime)
-    cpdef object       getHitsForSpillWindow(OverflowPointOneTide self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideTable tide_tbl, bint merge_transit_times=*)
-    @cython.locals (dd = bint, fname = str, fullPath = str, md5 = str, p = str, pth = object)
-    cpdef object       getPath         (OverflowPointOneTide self, long ix, long iy)
+    @cython.locals (t2bdg = list, t2bdg_ = list)
+    cpdef object       getHitsForSpillWindow(OverflowPointOneTide self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, bint merge_transit_times=*, long cycle_index=*)
+    @cython.locals (t2bdg_ = list, t2bdm = list)
+    cpdef tuple        getHitsForSpillWindows(OverflowPointOneTide self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, bint merge_transit_times=*, long cycle_index=*)
+    @cython.locals (dteff = datetime.timedelta, it = long, neff = long, t = object, t2bdg = list, t2bdm = list, t2bds = list, t2bds_tmp = list, t_actu = datetime.datetime)
+    cpdef tuple        __getHitsForSpillWindows(OverflowPointOneTide self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, long cycle_index, bint do_split, bint do_merge)
+    @cython.locals (act = object, amp = object, bad = object, cnt = object, cycs = object, dt_rvr = double, dys = object, hits = list, idx = object, inv = object, ix = long, ixs = object, ixu = object, lens = object, nspl = long, off = object, res = list, rus = object, t_rvrs = list, ts = object, u = object, uact = object, us = object)
+    cpdef list         getHitTable     (OverflowPointOneTide self, list spills, tide.TideStation tide_tbl, long cycle_index=*, object active=*, dict nrmCache=*)
+    @cython.locals (dd = bint, md5 = str, p = str, pth = object)
+    cpdef object       getPath         (OverflowPointOneTide self, long ix, long iy, long level=*)
+    @cython.locals (dd = bint, md5 = str)
+    cpdef long         getPathLength   (OverflowPointOneTide self, long ix, long iy)
     cpdef object       dump            (OverflowPointOneTide self)
     @cython.locals (a = double, i = long, j = long)
     cpdef              loadTide        (OverflowPointOneTide self, double dt, double dh, list data, str dataDir, double dilution)
     @cython.locals (dd = long, i = long, j = long, md5 = str)
     cpdef              loadPath        (OverflowPointOneTide self, double dt, double dh, list data, str pathDir, double dilution)
-    @cython.locals (dd = bint, dta = list, fname = str, found = bint, fullPath = str, ix = long, iy = long, md5 = str, p = str)
+    @cython.locals (dd = bint, dta = list, ix = long, iy = long, md5 = str, p = str)
     cpdef              checkPathFiles  (OverflowPointOneTide self)
     @cython.locals (a = object, ix = object, iy = object, missing = bint, oitem = object, ovals = object, svals = object)
     cpdef              checkInclusion  (OverflowPointOneTide self, OverflowPointOneTide other)
@@ -76,11 +95,45 @@ cdef class OverflowPoint:
     @cython.locals (j = long, ov = list, rv = list)
     cpdef object       __reduceHits    (OverflowPoint self, list t2bdg, list t2bds)
     @cython.locals (cycles = list, t2bdg = list, t2bds = list, tideRsp = OverflowPointOneTide)
-    cpdef list         getHitsForSpillWindow(OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideTable tide_tbl, list tide_cycles=*, bint merge_transit_times=*)
-    @cython.locals (hit = Hit, hits = list, hitss = list, kwargs = dict, md5s = list, ptd = OverflowPointOneTide, ptdTideData = tuple, res = list)
-    cpdef list         doPlumes        (OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideTable tide_tbl, list tide_cycles=*)
-    @cython.locals (cycles = list, d = double, hits = list, hitss = list, i = long, id = str, ihit = long, lhits = long, lr = long, p = list, ps = list, r = list, res = list, res_new = list, t0 = datetime.datetime, t1 = datetime.datetime, t2bds = list, tideRsp = OverflowPointOneTide)
-    cpdef list         doOverflow      (OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideTable tide_tbl, list tide_cycles=*, bint merge_transit_times=*)
+    cpdef list         getHitsForSpillWindow(OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, list tide_cycles=*, bint merge_transit_times=*, long cycle_index=*)
+    @cython.locals (clean = bint, cycles = list, t2bdg = list, t2bdm = list, t2bdn = list, t2bds = list, tideRsp = OverflowPointOneTide)
+    cpdef tuple        getHitsForSpillWindows(OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, list tide_cycles=*, bint merge_transit_times=*, long cycle_index=*)
+    @cython.locals (cycles = list)
+    cpdef list         __getCycles     (OverflowPoint self, list tide_cycles)
+    @cython.locals (hitss = list, res = list)
+    cpdef list         doPlumes        (OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, list tide_cycles=*, long cycle_index=*, bint lazy=*)
+    @cython.locals (i = long, plms = dict, plume = object)
+    cpdef list         __hitsToPlumes  (OverflowPoint self, list hitss, bint lazy)
+    @cython.locals (kwargs = dict, ptdTideData = tuple)
+    cpdef dict         __getPlumeArgs  (OverflowPoint self, Hit hit, bint dd)
+    @cython.locals (ix = long, iy = long, pnt = OverflowPointOneTide)
+    cpdef dict         dumpPlume       (OverflowPoint self, object plume, datetime.datetime t_ref)
+    @cython.locals (pnt = OverflowPointOneTide)
+    cpdef object       loadPlume       (OverflowPoint self, dict data, datetime.datetime t_ref)
+    @cython.locals (hitss = list, res_new = list)
+    cpdef list         doOverflow      (OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, list tide_cycles=*, bint merge_transit_times=*, long cycle_index=*)
+    @cython.locals (ampss = list, clean = bint, hit = Hit, hits = list, hitsm = list, hitss = list, plms = list, t_min = datetime.datetime, wins = list)
+    cpdef tuple        doOverflowAndPlumes(OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, list tide_cycles=*, bint merge_transit_times=*, long cycle_index=*, bint lazy=*)
+    @cython.locals (amps = list, ampss = list, clean = bint, key = tuple, keys = list, reqs = list, res = dict, ukeys = list, wins = list)
+    cpdef list         doOverflowBatch (OverflowPoint self, list overflows, datetime.timedelta dt, tide.TideStation tide_tbl, bint merge_transit_times=*, long cycle_index=*, bint columnar=*)
+    @cython.locals (ampss = list, clean = bint, req = tuple, wins = list)
+    cpdef tuple        doOverflowAmplitudes(OverflowPoint self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, list tide_cycles=*, bint merge_transit_times=*, long cycle_index=*)
+    @cython.locals (clean = bint, req = tuple, spills = list)
+    cpdef object       extendOverflow  (OverflowPoint self, list ampss, datetime.datetime t_start, datetime.datetime t_end_old, datetime.datetime t_end, datetime.timedelta dt, tide.TideStation tide_tbl, list tide_cycles=*, bint merge_transit_times=*, long cycle_index=*)
+    @cython.locals (a = object, amps = list, bad = object, cycs = object, first = object, hit = object, hole = object, ixs = object, j = object, jmax = object, jmin = object, js = list, last = object, m = long, nrmCache = dict, nslot = object, nspl = long, ok = object, peak = object, rus = object, sj = object, su = object, sus = object, tideRsp = OverflowPointOneTide, ts = object, u = object, uj = object, us = list, vmax = object)
+    cpdef tuple        doClimatology   (OverflowPoint self, list spills, tide.TideStation tide_tbl, list tide_cycles=*, long cycle_index=*)
+    @cython.locals (active = object, ampss = list, clean = bint, contig = bint, cycs = list, d0 = long, early = bint, i0 = long, i1 = long, jas = list, nrmCache = dict, res = list, rs = list, sel = object, spills = list, spls = list, tables = dict, tbl = list, uidx = dict, us = object, uspl = list)
+    cpdef list         __getAmplitudes (OverflowPoint self, list reqs, tide.TideStation tide_tbl, bint merge_transit_times, long cycle_index)
+    @cython.locals (ai = object, h = object, i = long, n = long, res = list, v = object, vi = double)
+    cpdef list         __reduceAmplitudes(OverflowPoint self, list amps, object j, object a)
+    cpdef list         __hitsToWindows (OverflowPoint self, list hitss, datetime.datetime t_start)
+    @cython.locals (d = double, hits = list, ihit = long, lhits = long, p = list, ps = list, res_new = list, t0 = datetime.datetime, t1 = datetime.datetime)
+    cpdef list         __ampsToWindows (OverflowPoint self, list ampss, datetime.datetime t_start)
+    @cython.locals (dls = list, f = object, h = object, hits = list, ih = object, it = long, js = object, jss = list, n = long, starts = object, trs = list, v = object, w = object, wns = list)
+    cpdef tuple        __ampsToColumns (OverflowPoint self, list ampss)
+    @cython.locals (dls = list, it = long, iw = long, jss = list, p = list, ps = list, trs = list, wns = list)
+    cpdef tuple        __windowsToColumns(OverflowPoint self, list wins, datetime.datetime t_start)
+    cpdef tuple        __joinColumns   (OverflowPoint self, long ntr, list trs, list wns, list jss, list dls)
     cpdef str          dump            (OverflowPoint self)
     @cython.locals (tks = list)
     cpdef              __decodeRiver   (OverflowPoint self, str data, river.Rivers rivers)
@@ -106,13 +159,16 @@ cdef class OverflowPoint:
     cpdef list         getTides        (OverflowPoint self)
 
 cdef class OverflowPoints:
+    cdef public list         m_cycles
+    cdef public str          m_station
     cdef public str          m_dataDir
     cdef public double       m_dilution
+    cdef public object       m_pathStore
     cdef public dict         m_pnts
     cdef public object       m_root
     cdef public dict         m_tbl
     #
-    @cython.locals (diltgt = double, f = object, fname = str, k = str, l = str, msg = list, p = OverflowPoint, points = dict, root = object, st = str, target = list, tk_dl = str, v = list)
+    @cython.locals (cycles = set, diltgt = double, station = str, store = object, f = object, fname = str, k = str, l = str, m = OverflowPointOneTide, msg = list, p = OverflowPoint, points = dict, root = object, st = str, target = list, tk_dl = str, v = list)
     cpdef              load            (OverflowPoints self, str dataDir, river.Rivers rivers)
     @cython.locals (oitem = OverflowPoint, sitem = OverflowPoint, sta = str)
     cpdef              checkInclusion  (OverflowPoints self, OverflowPoints other)
@@ -121,6 +177,11 @@ cdef class OverflowPoints:
     @cython.locals (f = object, fname = str, info = list, l = str)
     cpdef list         getInfo         (OverflowPoints self)
     cpdef list         getNames        (OverflowPoints self)
+    cpdef str          getStation      (OverflowPoints self)
+    cpdef list         getCycles       (OverflowPoints self)
+    @cython.locals (cycleIdx = long, idxs = dict, key = tuple, m = OverflowPointOneTide, nos = list, p = OverflowPoint)
+    cpdef long         buildCycleIndex (OverflowPoints self, tide.TideStation tide_tbl)
+    cpdef object       getPathStore    (OverflowPoints self)
 
 @cython.locals (tbl = object)
 cpdef object       loadTides       (str path)
@@ -23,34 +23,78 @@ Overflow points
 """
 
 import codecs
+import concurrent.futures
 import datetime
+import functools
 import logging
+import operator
 import os
-import pickle
+import threading
+
+import numpy as np
 
 try:
-    from .asplume import ASPlume
+    from .asplume   import ASPlume
+    from .pathstore import PathStore
 except ModuleNotFoundError:
-    from asplume import ASPlume
+    from asplume   import ASPlume
+    from pathstore import PathStore
 
 LOGGER = logging.getLogger("INRS.ASModel.station")
 
 DTA_DELTAS = 900
 DTA_DELTAT = datetime.timedelta(seconds=DTA_DELTAS)
 
+PLUME_WORKERS = min(8, (os.cpu_count() or 1) + 4)   # Threads loading the paths
+
+s_plumePool = None
+s_plumeLock = threading.Lock()
+
 def nint(d):
     return int(d + 0.5)
 
+def getSpillTimes(t_start, t_end, dt):
+    """
+    Spill times of the overflow [t_start, t_end], with a time step
+    close to dt that fits the duration.
+    """
+    neff = max(nint( (t_end-t_start).total_seconds() / dt.total_seconds() ), 1)
+    dteff = (t_end-t_start) / neff
+    return [ t_start + it*dteff for it in range(neff+1) ]
+
+def getPlumeExecutor():
+    """
+    Returns the thread pool, shared by all points, used to load the
+    particle paths.
+    """
+    global s_plumePool
+    with s_plumeLock:
+        if s_plumePool is None:
+            s_plumePool = concurrent.futures.ThreadPoolExecutor(max_workers=PLUME_WORKERS, thread_name_prefix='ASPlume')
+        return s_plumePool
+
+def loadPlumes(plumes, level=0):
+    """
+    Load concurrently the paths of the lazy plumes. With level > 0,
+    the paths are loaded at that level of detail, in the path cache.
+    """
+    if level > 0:
+        for _ in getPlumeExecutor().map(functools.partial(ASPlume.getPath, level=level), plumes): pass
+        return
+    todo = [ p for p in plumes if not p.isLoaded() ]
+    if len(todo) > 1:
+        for _ in getPlumeExecutor().map(ASPlume.load, todo): pass
+    elif todo:
+        todo[0].load()
+
 class Hit:
-    def __init__(self, t0=-1.0, tc=-1.0, ix=-1, iy=-1, a=-1.0, md5='', dd=False, pnt=None):
+    def __init__(self, t0=-1.0, tc=-1.0, ix=-1, iy=-1, a=-1.0, pnt=None):
         self.t0 = t0    # Injection time
         self.tc = tc    # Contact time
         self.ix = ix    # Normalized tide injection index
         self.iy = iy    # Normalized tide contact index
         self.a  = a     # Amplitude
-        self.md5= md5   # MD5 of plume
-        self.dd = dd    # Direct or inverted plume
-        self.pnt= pnt
+        self.pnt= pnt   # Tide cycle of the hit, resolves the path data
         assert pnt is None or isinstance(pnt, OverflowPointOneTide)
 
     def __lt__(self, other):
@@ -86,6 +130,9 @@ class OverflowPointOneTide(object):
         self.m_tideDta  = {}      # Dic of { ix : (iy, a) }
         self.m_pathDta  = {}      # Dic of { ix : (iy, md5, dd) }
         self.m_dilution = -1.0    # Target dilution
+        self.m_cycleNo  = -1      # Index in the cycles of the dataset
+        self.m_cycleIdxs= {}      # Cycle index of the dataset -> cycle index on the cycles of the point
+        self.m_pathStore= None    # PathStore of the dataset
 
     def __lt__(self, other):
         """
@@ -141,7 +188,7 @@ class OverflowPointOneTide(object):
                     else:
                         sDta.append( (iy, a) )
                 # ---  Keep things sorted on iy
-                sDta.sort(key=lambda x: x[0])
+                sDta.sort(key=operator.itemgetter(0))
             except KeyError:
                 self.m_tideDta[ix] = other.m_tideDta[ix]
 
@@ -171,7 +218,7 @@ class OverflowPointOneTide(object):
                         sDta.append( (iy, md5, dd) )
                         modif = True
                 # ---  Keep things sorted on iy
-                sDta.sort(key=lambda x: x[0])
+                sDta.sort(key=operator.itemgetter(0))
             except KeyError:
                 self.m_pathDta[ix] = other.m_pathDta[ix]
                 modif = True
@@ -220,7 +267,24 @@ class OverflowPointOneTide(object):
                 return dta
         raise KeyError
 
-    def __getHitsForOneSpill(self, t_actu, t_start, tide_tbl):
+    def getPathData(self, ixys):
+        """
+        For the sequence of normalized time indexes [(ix, iy), ...]
+        returns the path data [(md5, dd), ...] in the same order.
+        The path data of each ix is scanned only once.
+        """
+        rows = {}
+        res  = []
+        for ix, iy in ixys:
+            try:
+                row = rows[ix]
+            except KeyError:
+                row = { dta[0]: (dta[1], dta[2]) for dta in self.m_pathDta[ix] }
+                rows[ix] = row
+            res.append(row[iy])
+        return res
+
+    def __getHitsForOneSpill(self, t_actu, t_start, tide_tbl, cycle_index=-1):
         """
         Returns a list for each river transit time:
             [ l1, ...]
@@ -232,7 +296,12 @@ class OverflowPointOneTide(object):
             j in [0,...[
             d is dilution
         Time slots with NO hits a marked with d=-1
+        If cycle_index is a valid cycle index of tide_tbl, only the
+        transit times for which the real tide matches self are computed,
+        the others are empty. The real tide is matched to the nearest
+        cycle of the point, see OverflowPoints.buildCycleIndex.
         """
+        if cycle_index >= 0: cycle_index = self.m_cycleIdxs.get(cycle_index, cycle_index)
         t2bds = []      # list of list
 
         # --- For each transit time in river
@@ -243,6 +312,11 @@ class OverflowPointOneTide(object):
             # --- Effective time
             t_rvr = t_actu + datetime.timedelta(seconds=dt_rvr)
 
+            # --- Skip if the real tide doesn't match the cycle
+            if cycle_index >= 0 and tide_tbl.getCycleIndex(cycle_index, t_rvr) != self.m_cycleNo:
+                t2bds.append([])
+                continue
+
             # --- Normalized tide time index of hits + associated dilution
             ix = tide_tbl.getNormalizedTimeIndex(t_rvr)
             hits = self.__getTimeToBeach(ix)
@@ -255,8 +329,7 @@ class OverflowPointOneTide(object):
                 j_hit = nint( (t_hit-t_start).total_seconds() / DTA_DELTAS )
                 if j_hit >= len(t2bd): t2bd.extend( [None]*(j_hit-len(t2bd)+1) )
                 jmax = max(j_hit, jmax)
-                iy_, md5, dd = self.__getSinglePathData(ix, iy)
-                t2bd[j_hit] = Hit(t_actu, t_hit, ix, iy, a, md5, dd, self)
+                t2bd[j_hit] = Hit(t_actu, t_hit, ix, iy, a, self)
 
             t2bds.append(t2bd[:jmax+1])
         return t2bds
@@ -280,17 +353,47 @@ class OverflowPointOneTide(object):
 
         return t2bdg
 
-    def getHitsForSpillWindow(self, t_start, t_end, dt, tide_tbl, merge_transit_times = False):
+    def getHitsForSpillWindow(self, t_start, t_end, dt, tide_tbl, merge_transit_times = False, cycle_index = -1):
         """
         For t in [t_start, t_end] with step dt, compute the
         hits on the beach. Times are UTC
+        With a valid cycle_index, only the spills in a real tide
+        matching the cycle are computed.
         Returns:
             [    # for each river transit time
                 [a0, ..., ai] dilution for timedelta i, in DTA_DELTAS slots
             ]
         """
         LOGGER.trace('OverflowPointOneTide.getHitsForSpillWindow: from %s to %s', t_start, t_end)
+        if merge_transit_times:
+            t2bdg_, t2bdg = self.__getHitsForSpillWindows(t_start, t_end, dt, tide_tbl, cycle_index, False, True)
+        else:
+            t2bdg, t2bdg_ = self.__getHitsForSpillWindows(t_start, t_end, dt, tide_tbl, cycle_index, True, False)
 
+        LOGGER.trace('OverflowPointOneTide.getHitsForSpillWindow: reduced data')
+        LOGGER.trace('    %s' % [ 1 if h else 0 for h in t2bdg[0] ] if t2bdg else [])
+        return t2bdg
+
+    def getHitsForSpillWindows(self, t_start, t_end, dt, tide_tbl, merge_transit_times = False, cycle_index = -1):
+        """
+        Same as getHitsForSpillWindow, but computes in one pass the hits
+        with merge_transit_times as requested, and the hits with all
+        transit times merged.
+        Returns:
+            (hits, merged_hits)
+        """
+        LOGGER.trace('OverflowPointOneTide.getHitsForSpillWindows: from %s to %s', t_start, t_end)
+        if merge_transit_times:
+            t2bdg_, t2bdm = self.__getHitsForSpillWindows(t_start, t_end, dt, tide_tbl, cycle_index, False, True)
+            return t2bdm, t2bdm
+        return self.__getHitsForSpillWindows(t_start, t_end, dt, tide_tbl, cycle_index, True, True)
+
+    def __getHitsForSpillWindows(self, t_start, t_end, dt, tide_tbl, cycle_index, do_split, do_merge):
+        """
+        Loop on the spills. Returns the hits reduced by transit time
+        if do_split, and the hits with the transit times merged if
+        do_merge; [] otherwise.
+        """
         # ---  Effective dt
         neff = nint( (t_end-t_start).total_seconds() / dt.total_seconds() )
         neff = max(neff, 1)
@@ -298,35 +401,100 @@ class OverflowPointOneTide(object):
 
         # ---  Loop on time steps
         t2bdg = []
+        t2bdm = []
         t_actu = t_start
         for it in range(neff+1):
-            t2bds = self.__getHitsForOneSpill(t_actu, t_start, tide_tbl)
-            if merge_transit_times:
+            t2bds = self.__getHitsForOneSpill(t_actu, t_start, tide_tbl, cycle_index)
+            if do_merge:
                 t2bds_tmp = []
                 for t in t2bds:
                     t2bds_tmp = self.__reduceHits(t2bds_tmp, [t])
-                t2bds = t2bds_tmp
-            t2bdg = self.__reduceHits(t2bdg, t2bds)
+                t2bdm = self.__reduceHits(t2bdm, t2bds_tmp)
+            if do_split:
+                t2bdg = self.__reduceHits(t2bdg, t2bds)
             t_actu += dteff
+        return t2bdg, t2bdm
 
-        LOGGER.trace('OverflowPointOneTide.getHitsForSpillWindow: reduced data')
-        LOGGER.trace('    %s' % [ 1 if h else 0 for h in t2bdg[0] ] if t2bdg else [])
-        return t2bdg
+    def getHitTable(self, spills, tide_tbl, cycle_index=-1, active=None, nrmCache=None):
+        """
+        Vectorized hits for the batch evaluation of many spill windows.
+        spills is the sorted list of the distinct spill times, active an
+        optional boolean array selecting the spills to compute.
+        nrmCache is shared by the cycles of a point: the normalized
+        time indexes only depend on the river transit time.
+        Returns for each river transit time a tuple (bad, u, us, a):
+            bad: boolean array on spills, True if the spill is outside
+                 of the tide table
+            u:   spill index of the hits, sorted
+            us:  time of the hits, in microseconds from spills[0]
+            a:   amplitude of the hits
+        """
+        if nrmCache is None: nrmCache = {}
+        if cycle_index >= 0: cycle_index = self.m_cycleIdxs.get(cycle_index, cycle_index)
+        nspl = len(spills)
+        res = []
+        for dt_rvr in self.__getRiverTransitTime():
+            # ---  Normalized time indexes, shared between cycles
+            try:
+                rus, ixs, cycs = nrmCache[(dt_rvr, cycle_index)]
+            except KeyError:
+                t_rvrs = [ t + datetime.timedelta(seconds=dt_rvr) for t in spills ]
+                rus  = np.array([ (t - spills[0]) // datetime.timedelta(microseconds=1) for t in t_rvrs ], dtype=np.int64)
+                ts   = np.array([ t.timestamp() for t in t_rvrs ], dtype=np.float64)
+                ixs  = tide_tbl.getNormalizedTimeIndexes(ts)
+                cycs = tide_tbl.getCycleIndexes(cycle_index, ts) if cycle_index >= 0 else None
+                nrmCache[(dt_rvr, cycle_index)] = (rus, ixs, cycs)
+
+            # ---  Spills to compute, skipping the mismatched cycles
+            act = np.ones(nspl, dtype=bool) if active is None else active.copy()
+            if cycs is not None: act &= (cycs == self.m_cycleNo)
+            bad = act & (ixs < 0)
+            act &= (ixs >= 0)
+
+            # ---  Hits of the distinct ix, as ragged arrays
+            uact = np.nonzero(act)[0]
+            ixu, inv = np.unique(ixs[uact], return_inverse=True)
+            dys, amp, cnt = [], [], []
+            for ix in ixu.tolist():
+                hits = self.__getTimeToBeach(ix)
+                dys.extend( [ iy-ix for iy, a in hits ] )
+                amp.extend( [ a for iy, a in hits ] )
+                cnt.append( len(hits) )
+            dys = np.array(dys, dtype=np.int64)
+            amp = np.array(amp, dtype=np.float64)
+            cnt = np.array(cnt, dtype=np.int64)
+            off = np.cumsum(cnt) - cnt
+
+            # ---  Expand to the spills
+            lens = cnt[inv]
+            u    = np.repeat(uact, lens)
+            idx  = np.arange(u.shape[0]) - np.repeat(np.cumsum(lens)-lens, lens) + np.repeat(off[inv], lens)
+            us   = rus[u] + dys[idx]*(DTA_DELTAS*1000000)
+            res.append( (bad, u, us, amp[idx]) )
+        return res
 
-    def getPath(self, ix, iy):
+    def getPath(self, ix, iy, level=0):
+        """
+        Returns the path, at the level of detail level.
+        """
         iy, md5, dd = self.__getSinglePathData(ix, iy)
-        fname = 'path-%s.pkl' % (md5)
-        pth = None
-        for p in self.m_pathDirs:
-            fullPath = os.path.join(p, fname)
-            if os.path.isfile(fullPath):
-                with open(fullPath, 'rb') as f: pth = pickle.load(f, encoding='bytes')
-        if not pth:
-            LOGGER.warning('Path file "%s" not found in:', fname)
+        if not self.m_pathStore: self.m_pathStore = PathStore()
+        pth = self.m_pathStore.getPath(md5, self.m_pathDirs, level)
+        if pth is None:
+            LOGGER.warning('Path file "path-%s.pkl" not found in:', md5)
             for p in self.m_pathDirs:
                 LOGGER.warning('   %s', p)
         return pth
 
+    def getPathLength(self, ix, iy):
+        """
+        Returns the number of rows of the path, without loading it,
+        or -1 if unknown.
+        """
+        iy, md5, dd = self.__getSinglePathData(ix, iy)
+        if not self.m_pathStore: self.m_pathStore = PathStore()
+        return self.m_pathStore.getPathLength(md5)
+
     def dump(self):
         if self.m_river:
             return '(%s, %f); (%f; %f)' % (self.m_river.name, self.m_dist2SL, self.m_dh, self.m_dt)
@@ -360,16 +528,11 @@ class OverflowPointOneTide(object):
         Debug code:
         Check that all the path files exist
         """
+        if not self.m_pathStore: self.m_pathStore = PathStore()
         for ix,dta in self.m_pathDta.items():
             for iy,md5,dd in dta:
-                fname = 'path-%s.pkl' % (md5)
-                found = False
-                for p in self.m_pathDirs:
-                    fullPath = os.path.join(p, fname)
-                    if os.path.isfile(fullPath):
-                        found = True
-                if not found:
-                    LOGGER.warning('Path file "%s" not found in:', fname)
+                if self.m_pathStore.findPath(md5, self.m_pathDirs) is None:
+                    LOGGER.warning('Path file "path-%s.pkl" not found in:', md5)
                     for p in self.m_pathDirs:
                         LOGGER.warning('   %s', p)
 
@@ -453,9 +616,11 @@ class OverflowPoint:
                     rv[j] = ov[j]
         return t2bdg
 
-    def getHitsForSpillWindow(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False):
+    def getHitsForSpillWindow(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False, cycle_index=-1):
         """
         For t in [t_start, t_end] with step dt, compute the hits for all required tide cycles id.
+        With a valid cycle_index of tide_tbl (see TideTable.buildCycleIndex),
+        each spill is computed only with the cycle matching the real tide.
         Times are UTC
         Returns:
             [    # for each river transit time
@@ -467,23 +632,14 @@ class OverflowPoint:
         LOGGER.trace('OverflowPoint.getHitsForSpillWindow')
         LOGGER.trace('   from %s', str(t_start))
         LOGGER.trace('   to   %s', str(t_end))
-        if not tide_cycles:
-            cycles = self.m_tideRsp
-        else:
-            # Cython chokes at a single expression
-            # Rewrite as 2 expressions
-            cycles = [ self.getTideResponse(ii) for ii in tide_cycles ]
-            cycles = [ r for r in cycles if r ]
-        LOGGER.trace('OverFlowPoint.getHitsForSpillWindow(): cycles[%d]', len(cycles))
-        for tideRsp in cycles:
-            LOGGER.trace('   %s', tideRsp)
+        cycles = self.__getCycles(tide_cycles)
 
         # ---  Loop on OverflowTideResponses - result in normalized timedelta
         t2bdg = []
         for tideRsp in cycles:
             if tideRsp:
                 try:
-                    t2bds = tideRsp.getHitsForSpillWindow(t_start, t_end, dt, tide_tbl, merge_transit_times)
+                    t2bds = tideRsp.getHitsForSpillWindow(t_start, t_end, dt, tide_tbl, merge_transit_times, cycle_index)
                     t2bdg = self.__reduceHits(t2bdg, t2bds)
                 except Exception as e:
                     LOGGER.exception(e)
@@ -495,10 +651,60 @@ class OverflowPoint:
 
         return t2bdg
 
-    def doPlumes(self, t_start, t_end, dt, tide_tbl, tide_cycles=[]):
+    def getHitsForSpillWindows(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False, cycle_index=-1):
+        """
+        Same as getHitsForSpillWindow, but computes in one pass the hits
+        with merge_transit_times as requested, and the hits with all
+        transit times merged, as required by doPlumes.
+        clean is False if a tide cycle had to be skipped.
+        Returns:
+            (hits, merged_hits, clean)
+        """
+        LOGGER.trace('OverflowPoint.getHitsForSpillWindows')
+        cycles = self.__getCycles(tide_cycles)
+
+        t2bdg = []
+        t2bdm = []
+        clean = True
+        for tideRsp in cycles:
+            if tideRsp:
+                try:
+                    t2bds, t2bdn = tideRsp.getHitsForSpillWindows(t_start, t_end, dt, tide_tbl, merge_transit_times, cycle_index)
+                    t2bdg = self.__reduceHits(t2bdg, t2bds)
+                    if not merge_transit_times:
+                        t2bdm = self.__reduceHits(t2bdm, t2bdn)
+                except Exception as e:
+                    LOGGER.exception(e)
+                    LOGGER.warning('OverflowPoint.getHitsForSpillWindows: Skipping cycle %s', tideRsp)
+                    clean = False
+            else:
+                LOGGER.warning('OverflowPoint.getHitsForSpillWindows: Skipping cycle %s', tideRsp)
+                clean = False
+        if merge_transit_times: t2bdm = t2bdg
+        return t2bdg, t2bdm, clean
+
+    def __getCycles(self, tide_cycles):
+        """
+        Returns the tide responses for the tide cycles id,
+        all of them if tide_cycles is empty.
+        """
+        if not tide_cycles:
+            cycles = self.m_tideRsp
+        else:
+            # Cython chokes at a single expression
+            # Rewrite as 2 expressions
+            cycles = [ self.getTideResponse(ii) for ii in tide_cycles ]
+            cycles = [ r for r in cycles if r ]
+        LOGGER.trace('OverFlowPoint.getHitsForSpillWindow(): cycles[%d]', len(cycles))
+        for tideRsp in cycles:
+            LOGGER.trace('   %s', tideRsp)
+        return cycles
+
+    def doPlumes(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], cycle_index=-1, lazy=False):
         """
         For t in [t_start, t_end] with step dt, returns the particule paths
         as a list of Plume objects.
+        With lazy, the paths are only loaded on first access.
         .
         Times are UTC
         Returns:
@@ -507,39 +713,148 @@ class OverflowPoint:
             ]
         """
         LOGGER.trace('OverflowPoint.doPlumes from %s to %s', t_start, t_end)
-        hitss = self.getHitsForSpillWindow(t_start, t_end, dt, tide_tbl, tide_cycles, merge_transit_times=True)
+        hitss = self.getHitsForSpillWindow(t_start, t_end, dt, tide_tbl, tide_cycles, merge_transit_times=True, cycle_index=cycle_index)
+        res = self.__hitsToPlumes(hitss, lazy)
+        LOGGER.trace('OverflowPoint.doPlumes done')
+        return res
+
+    def __hitsToPlumes(self, hitss, lazy):
+        plms = {}
+        for i, plume in self.__iterPlumes(hitss, lazy):
+            plms[i] = plume
+        return [ plms[i] for i in sorted(plms) ]
+
+    def iterPlumes(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], cycle_index=-1, lazy=False):
+        """
+        Generator version of doPlumes. The plumes are yielded as their
+        paths are loaded, not in the order of the hits.
+        """
+        hitss = self.getHitsForSpillWindow(t_start, t_end, dt, tide_tbl, tide_cycles, merge_transit_times=True, cycle_index=cycle_index)
+        for i, plume in self.__iterPlumes(hitss, lazy):
+            yield plume
+
+    def __getPlumeArgs(self, hit, dd):
+        """
+        Returns the ASPlume arguments for hit, with the path loader
+        but without the path. dd is the direct flag of the path.
+        """
+        ptdTideData = hit.pnt.getTideData()
+        kwargs = {}
+        kwargs['dilution'] = ptdTideData[-1]
+        kwargs['name']   = self.m_name
+        kwargs['parent'] = self.m_parent.m_name if self.m_parent else self.m_name
+        kwargs['poly']   = self.m_parent.m_poly if self.m_parent else self.m_poly
+        kwargs['tide']   = ptdTideData[:2]
+        kwargs['t0']     = hit.t0
+        kwargs['tc']     = hit.tc
+        #kwargs['dt']   = -1.0
+        kwargs['isDirect']= dd
+        kwargs['loader']  = functools.partial(hit.pnt.getPath, hit.ix, hit.iy)
+        return kwargs
+
+    def dumpPlume(self, plume, t_ref):
+        """
+        Returns the plume as a dict of JSON values, without the path
+        but with the tide cycle and indexes to load it. The times are
+        in microseconds from t_ref.
+        """
+        if plume.m_loader is None:
+            return { 'name': plume.stationName }    # root, polygon only
+        pnt = plume.m_loader.func.__self__
+        ix, iy = plume.m_loader.args
+        return {
+            'dilution': plume.dilution,
+            'tide'    : list(plume.tide),
+            't0'      : (plume.injectionTime - t_ref) // datetime.timedelta(microseconds=1),
+            'tc'      : (plume.contactTime   - t_ref) // datetime.timedelta(microseconds=1),
+            'isDirect': bool(plume.isPlumeDirect),
+            'length'  : plume.plumeLength,
+            'cycle'   : pnt.getId(),
+            'ix'      : ix,
+            'iy'      : iy,
+            }
+
+    def loadPlume(self, data, t_ref):
+        """
+        Returns the lazy plume for data, as returned by dumpPlume.
+        Returns None if the tide cycle is not found.
+        """
+        if 'cycle' not in data:
+            return ASPlume(name=self.m_root.m_name, poly=self.m_root.m_poly)
+        pnt = self.getTideResponse(data['cycle'])
+        if pnt is None: return None
+        return ASPlume(dilution = data['dilution'],
+                       name     = self.m_name,
+                       parent   = self.m_parent.m_name if self.m_parent else self.m_name,
+                       poly     = self.m_parent.m_poly if self.m_parent else self.m_poly,
+                       tide     = tuple(data['tide']),
+                       t0       = t_ref + datetime.timedelta(microseconds=data['t0']),
+                       tc       = t_ref + datetime.timedelta(microseconds=data['tc']),
+                       isDirect = data['isDirect'],
+                       loader   = functools.partial(pnt.getPath, data['ix'], data['iy']),
+                       length   = data['length'])
+
+    def __iterPlumes(self, hitss, lazy):
+        """
+        Yields (i, plume) with i the index of the plume in the hits order.
+        hitss are the hits with the transit times merged.
+        The required paths are first collected from the hits, then
+        loaded concurrently, each plume being yielded as its path
+        is loaded. With lazy, the plumes are yielded in order, with
+        a loader in place of the path.
+        """
         assert len(hitss) in [0, 1]
 
-        # ---
-        md5s = []
-        res  = []
         try:
-            res.append( ASPlume(name=self.m_root.m_name, poly=self.m_root.m_poly) )
+            yield 0, ASPlume(name=self.m_root.m_name, poly=self.m_root.m_poly)
         except Exception as e:
             pass
-        for hits in hitss:
-            for hit in hits:
-                if hit and hit.md5 not in md5s:
-                    md5s.append(hit.md5)
-                    ptd = hit.pnt
-                    ptdTideData = ptd.getTideData()
-                    kwargs = {}
-                    kwargs['dilution'] = ptdTideData[-1]
-                    kwargs['name']   = self.m_name
-                    kwargs['parent'] = self.m_parent.m_name if self.m_parent else self.m_name
-                    kwargs['poly']   = self.m_parent.m_poly if self.m_parent else self.m_poly
-                    kwargs['tide']   = ptdTideData[:2]
-                    kwargs['t0']     = hit.t0
-                    kwargs['tc']     = hit.tc
-                    #kwargs['dt']   = -1.0
-                    kwargs['isDirect']= hit.dd
-                    kwargs['plume']   = ptd.getPath(hit.ix, hit.iy)
-                    res.append( ASPlume(**kwargs) )
 
-        LOGGER.trace('OverflowPoint.doPlumes done')
-        return res
+        # ---  Path data, resolved in bulk for each tide cycle
+        alls = [ hit for hits in hitss for hit in hits if hit ]
+        pnts = {}
+        for i, hit in enumerate(alls):
+            pnts.setdefault(id(hit.pnt), []).append(i)
+        pdta = [None]*len(alls)
+        for idxs in pnts.values():
+            pnt = alls[idxs[0]].pnt
+            for i, d in zip(idxs, pnt.getPathData([ (alls[i].ix, alls[i].iy) for i in idxs ])):
+                pdta[i] = d
+
+        # ---  Unique hits, in order
+        md5s = set()
+        todo = []
+        dds  = []
+        for hit, (md5, dd) in zip(alls, pdta):
+            if md5 not in md5s:
+                md5s.add(md5)
+                todo.append(hit)
+                dds.append(dd)
+        if not todo: return
+
+        # ---  Lazy plumes
+        if lazy:
+            for i, hit in enumerate(todo):
+                kwargs = self.__getPlumeArgs(hit, dds[i])
+                kwargs['length'] = hit.pnt.getPathLength(hit.ix, hit.iy)
+                yield i+1, ASPlume(**kwargs)
+            return
+
+        # ---  Load the paths
+        if len(todo) == 1:
+            hit = todo[0]
+            yield 1, ASPlume(plume=hit.pnt.getPath(hit.ix, hit.iy), **self.__getPlumeArgs(hit, dds[0]))
+            return
+        pool = getPlumeExecutor()
+        futs = { pool.submit(hit.pnt.getPath, hit.ix, hit.iy): i for i, hit in enumerate(todo) }
+        try:
+            for fut in concurrent.futures.as_completed(futs):
+                i = futs[fut]
+                yield i+1, ASPlume(plume=fut.result(), **self.__getPlumeArgs(todo[i], dds[i]))
+        finally:
+            for fut in futs: fut.cancel()
 
-    def doOverflow(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False):
+    def doOverflow(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False, cycle_index=-1):
         """
         For t in [t_start, t_end] with step dt, compute the
         exposure time window to overflow for all required tide cycles id.
@@ -552,29 +867,322 @@ class OverflowPoint:
             ]
         """
         LOGGER.trace('OverflowPoint.doOverflow from %s to %s', t_start, t_end)
-        hitss = self.getHitsForSpillWindow(t_start, t_end, dt, tide_tbl, tide_cycles, merge_transit_times)
+        hitss = self.getHitsForSpillWindow(t_start, t_end, dt, tide_tbl, tide_cycles, merge_transit_times, cycle_index)
+        res_new = self.__hitsToWindows(hitss, t_start)
+        LOGGER.trace('OverflowPoint.doOverflow done')
+        return res_new
 
-        # ---  Compact - back to time
-        res_new = []
+    def doOverflowAndPlumes(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False, cycle_index=-1, lazy=False):
+        """
+        Combination of doOverflowAmplitudes and doPlumes. The hits are
+        computed once, and both results derived from them.
+        Returns:
+            (ampss, windows, plumes)
+        with ampss the hit amplitudes of the windows, as for
+        doOverflowAmplitudes, None if they can not be extended.
+        """
+        LOGGER.trace('OverflowPoint.doOverflowAndPlumes from %s to %s', t_start, t_end)
+        hitss, hitsm, clean = self.getHitsForSpillWindows(t_start, t_end, dt, tide_tbl, tide_cycles, merge_transit_times, cycle_index)
+        ampss = [ [ hit.a if hit else None for hit in hits ] for hits in hitss ]
+        wins = self.__ampsToWindows(ampss, t_start)
+        plms = self.__hitsToPlumes(hitsm, lazy)
+        # ---  Hits before t_start are not in the time slots
+        t_min = t_start - DTA_DELTAT / 2
         for hits in hitss:
+            for hit in hits:
+                if hit and hit.tc < t_min: clean = False
+        LOGGER.trace('OverflowPoint.doOverflowAndPlumes done')
+        return (ampss if clean else None), wins, plms
+
+    def doOverflowBatch(self, overflows, dt, tide_tbl, merge_transit_times=False, cycle_index=-1, columnar=False):
+        """
+        Batch version of doOverflow, for overflows a list of
+        (t_start, t_end, tide_cycles). The distinct spill times of all
+        the overflows are evaluated once for each tide cycle, with the
+        normalized time indexes shared between the cycles, and the hits
+        are then reduced for each overflow.
+        Returns the list of the doOverflow results, in order.
+        With columnar, the windows are returned as columns, see
+        __ampsToColumns, without building the nested lists.
+        """
+        LOGGER.trace('OverflowPoint.doOverflowBatch: %d overflows', len(overflows))
+        # ---  Distinct overflows
+        keys = [ (t0, t1, tuple(c)) for t0, t1, c in overflows ]
+        ukeys = list( dict.fromkeys(keys) )
+        reqs  = [ (t_start, getSpillTimes(t_start, t_end, dt), self.__getCycles(list(c)), None) for t_start, t_end, c in ukeys ]
+        amps  = self.__getAmplitudes(reqs, tide_tbl, merge_transit_times, cycle_index)
+
+        res = {}
+        for key, (ampss, clean) in zip(ukeys, amps):
+            t_start = key[0]
+            if ampss is None:
+                # ---  Hits before t_start, use the reference implementation
+                wins = self.doOverflow(key[0], key[1], dt, tide_tbl, list(key[2]), merge_transit_times, cycle_index)
+                res[key] = self.__windowsToColumns(wins, t_start) if columnar else wins
+            elif columnar:
+                res[key] = self.__ampsToColumns(ampss)
+            else:
+                res[key] = self.__ampsToWindows(ampss, t_start)
+        if columnar:
+            return [ res[k] for k in keys ]
+        return [ [ [ list(p) for p in ps ] for ps in res[k] ] for k in keys ]
+
+    def doOverflowAmplitudes(self, t_start, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False, cycle_index=-1):
+        """
+        doOverflow, with the hit amplitudes the windows are built from.
+        Returns (ampss, windows), ampss being the list by transit of
+        the amplitude, or None, for each time slot of DTA_DELTAT from
+        t_start. ampss is None if the windows can not be extended
+        with extendOverflow.
+        """
+        req = (t_start, getSpillTimes(t_start, t_end, dt), self.__getCycles(tide_cycles), None)
+        ampss, clean = self.__getAmplitudes([req], tide_tbl, merge_transit_times, cycle_index)[0]
+        if ampss is None:
+            return None, self.doOverflow(t_start, t_end, dt, tide_tbl, tide_cycles, merge_transit_times, cycle_index)
+        wins = self.__ampsToWindows(ampss, t_start)
+        return (ampss if clean else None), wins
+
+    def extendOverflow(self, ampss, t_start, t_end_old, t_end, dt, tide_tbl, tide_cycles=[], merge_transit_times=False, cycle_index=-1):
+        """
+        Extend to t_end the overflow [t_start, t_end_old] of hit
+        amplitudes ampss, as returned by doOverflowAmplitudes. Only
+        the spills after t_end_old are evaluated and reduced in ampss.
+        This requires the spill times of both overflows to be on the
+        same grid, i.e. their durations to be multiples of dt.
+        Returns (ampss, windows) as doOverflowAmplitudes, or None if
+        the overflow can not be extended.
+        """
+        if t_end <= t_end_old or t_end_old - t_start < dt: return None
+        if (t_end_old - t_start) % dt or (t_end - t_start) % dt: return None
+        spills = getSpillTimes(t_end_old, t_end, dt)[1:]
+        req = (t_start, spills, self.__getCycles(tide_cycles), [ list(amps) for amps in ampss ])
+        ampss, clean = self.__getAmplitudes([req], tide_tbl, merge_transit_times, cycle_index)[0]
+        if ampss is None or not clean: return None
+        return ampss, self.__ampsToWindows(ampss, t_start)
+
+    def doClimatology(self, spills, tide_tbl, tide_cycles=[], cycle_index=-1):
+        """
+        Exposure statistics of the instantaneous spills at times spills,
+        a sorted list of distinct times, all evaluated in one vectorized
+        pass per tide cycle. The exposure is the union of the hits of all
+        the river transit times and tide cycles, with the simple holes
+        filled, as for doOverflow with merge_transit_times.
+        Returns the tuple of arrays on spills (ok, first, last, duration, peak):
+            ok:       False if the spill is outside of the tide table
+            first:    delay from spill to start of exposure [s]
+            last:     delay from spill to end of exposure [s]
+            duration: exposure duration [s]
+            peak:     peak dilution
+        Without hit, the duration is 0 and the other values are NaN.
+        """
+        nspl = len(spills)
+        sus  = np.array([ (t - spills[0]) // datetime.timedelta(microseconds=1) for t in spills ], dtype=np.int64)
+        us, js, amps = [], [], []
+        nrmCache = {}
+        for tideRsp in self.__getCycles(tide_cycles):
+            for bad, u, ts, a in tideRsp.getHitTable(spills, tide_tbl, cycle_index, None, nrmCache):
+                # ---  Same rounding as nint((t_hit-t_spill).total_seconds() / DTA_DELTAS)
+                j = np.trunc( (ts - sus[u]) / 1000000 / DTA_DELTAS + 0.5 ).astype(np.int64)
+                us.append(u)
+                js.append(j)
+                amps.append(a)
+
+        # ---  Spills outside of the tide table, for any transit time
+        ok = np.ones(nspl, dtype=bool)
+        for rus, ixs, cycs in nrmCache.values():
+            ok &= (ixs >= 0)
+
+        first = np.full(nspl, np.nan)
+        last  = np.full(nspl, np.nan)
+        peak  = np.full(nspl, np.nan)
+        nslot = np.zeros(nspl, dtype=np.int64)
+        if us:
+            u = np.concatenate(us)
+            j = np.concatenate(js)
+            a = np.concatenate(amps)
+            # ---  Distinct time slots of each spill, sorted by spill and slot
+            m  = int(j.max()) + 1 if j.shape[0] > 0 else 1
+            uj = np.unique(u*m + j)
+            su = uj // m
+            sj = uj %  m
+            hit = np.zeros(nspl, dtype=bool)
+            hit[su] = True
+            jmin = np.full(nspl, np.iinfo(np.int64).max)
+            jmax = np.full(nspl, -1, dtype=np.int64)
+            np.minimum.at(jmin, su, sj)
+            np.maximum.at(jmax, su, sj)
+            vmax = np.full(nspl, -np.inf)
+            np.maximum.at(vmax, u, a)
+            # ---  Slots, and simple holes filled
+            hole = (su[1:] == su[:-1]) & (sj[1:] - sj[:-1] == 2)
+            nslot = np.bincount(su, minlength=nspl) + np.bincount(su[1:][hole], minlength=nspl)
+            first[hit] = jmin[hit] * DTA_DELTAS
+            last [hit] = (jmax[hit] + 1) * DTA_DELTAS
+            peak [hit] = vmax[hit]
+        return ok, first, last, (nslot * DTA_DELTAS).astype(np.float64), peak
+
+    def __getAmplitudes(self, reqs, tide_tbl, merge_transit_times, cycle_index):
+        """
+        For reqs a list of (t_ref, spill times, tide responses, ampss),
+        returns for each request (ampss, clean). ampss are the hit
+        amplitudes by transit and time slot of DTA_DELTAT from t_ref,
+        reduced (max) in the ampss of the request if not None; ampss is
+        None for hits before t_ref. clean is False if a tide cycle had
+        to be skipped.
+        The distinct spill times of all the requests are evaluated once
+        for each tide cycle, with the normalized time indexes shared
+        between the cycles.
+        """
+        # ---  Spill times, union on all requests
+        spills = sorted( set([ t for r in reqs for t in r[1] ]) )
+        uidx = { t: i for i, t in enumerate(spills) }
+        uspl = [ np.array([ uidx[t] for t in r[1] ], dtype=np.int64) for r in reqs ]
+        cycs = [ r[2] for r in reqs ]
+
+        # ---  Hit tables for each cycle, on the spills of its requests
+        nrmCache = {}
+        tables = {}
+        for rs in cycs:
+            for tideRsp in rs:
+                if not tideRsp or id(tideRsp) in tables: continue
+                active = np.zeros(len(spills), dtype=bool)
+                for rs_, us in zip(cycs, uspl):
+                    for r in rs_:
+                        if r is tideRsp:
+                            active[us] = True
+                            break
+                tables[id(tideRsp)] = tideRsp.getHitTable(spills, tide_tbl, cycle_index, active, nrmCache)
+
+        # ---  Reduce for each request
+        res = []
+        for (t_ref, spls, rs, ampss), us in zip(reqs, uspl):
+            d0 = (t_ref - spills[0]) // datetime.timedelta(microseconds=1)
+            contig = us[-1]-us[0]+1 == us.shape[0]
+            clean = True
+            early = False
+            for tideRsp in rs:
+                tbl = tables.get(id(tideRsp)) if tideRsp else None
+                if not tbl or any([ bad[us].any() for bad, u, ts, a in tbl ]):
+                    LOGGER.warning('OverflowPoint.doOverflowBatch: Skipping cycle %s', tideRsp)
+                    clean = False
+                    continue
+                jas = []
+                for bad, u, ts, a in tbl:
+                    if contig:
+                        i0 = np.searchsorted(u, us[0],  side='left')
+                        i1 = np.searchsorted(u, us[-1], side='right')
+                        ts, a = ts[i0:i1], a[i0:i1]
+                    else:
+                        sel = np.isin(u, us)
+                        ts, a = ts[sel], a[sel]
+                    # ---  Same rounding as nint((t_hit-t_start).total_seconds() / DTA_DELTAS)
+                    j = np.trunc( (ts - d0) / 1000000 / DTA_DELTAS + 0.5 ).astype(np.int64)
+                    jas.append( (j, a) )
+                early = any([ (j < 0).any() for j, a in jas ])
+                if early: break
+                if merge_transit_times:
+                    jas = [ (np.concatenate([j for j, a in jas]), np.concatenate([a for j, a in jas])) ]
+                if ampss is None: ampss = [ [] for _ in jas ]
+                if len(ampss) != len(jas):
+                    LOGGER.warning('OverflowPoint.doOverflowBatch: Skipping cycle %s', tideRsp)
+                    clean = False
+                    continue
+                ampss = [ self.__reduceAmplitudes(amps, j, a) for amps, (j, a) in zip(ampss, jas) ]
+            res.append( (None, False) if early else (ampss or [], clean) )
+        return res
+
+    def __reduceAmplitudes(self, amps, j, a):
+        """
+        Reduce (max) the hits of amplitude a at time slots j in amps,
+        a list of amplitude or None for each time slot.
+        """
+        if j.shape[0] == 0: return amps
+        n = max(len(amps), int(j.max())+1)
+        v = np.full(n, -np.inf)
+        np.maximum.at(v, j, a)
+        h = np.zeros(n, dtype=bool)
+        h[j] = True
+        res = []
+        for i in range(n):
+            ai = amps[i] if i < len(amps) else None
+            if h[i]:
+                vi = float(v[i])
+                ai = vi if ai is None or vi > ai else ai
+            res.append(ai)
+        return res
+
+    def __hitsToWindows(self, hitss, t_start):
+        """
+        Compact the hits to exposure windows - back to time
+        """
+        return self.__ampsToWindows([ [ hit.a if hit else None for hit in hits ] for hits in hitss ], t_start)
+
+    def __ampsToWindows(self, ampss, t_start):
+        """
+        Compact the amplitudes, None for no hit, to exposure windows
+        """
+        res_new = []
+        for hits in ampss:
             ihit = 0
             lhits = len(hits)
             ps = []
             while ihit < lhits:
-                while ihit < lhits and not hits[ihit]: ihit += 1     # get first Hit
+                while ihit < lhits and hits[ihit] is None: ihit += 1     # get first Hit
                 p = []
-                while ihit < lhits and (hits[ihit] or (ihit+1 < lhits and hits[ihit+1])):    # interpolate simple hole
-                    d = hits[ihit].a if hits[ihit] else (hits[ihit+1].a+hits[ihit-1].a)/2.0
+                while ihit < lhits and (hits[ihit] is not None or (ihit+1 < lhits and hits[ihit+1] is not None)):    # interpolate simple hole
+                    d = hits[ihit] if hits[ihit] is not None else (hits[ihit+1]+hits[ihit-1])/2.0
                     t0 = t_start + ihit*DTA_DELTAT
                     t1 = t0 + DTA_DELTAT
                     p.append( (t0, t1, d) )
                     ihit += 1
                 if p: ps.append(p)
             res_new.append(ps)
-
-        LOGGER.trace('OverflowPoint.doOverflow done')
         return res_new
 
+    def __ampsToColumns(self, ampss):
+        """
+        Columnar version of __ampsToWindows. Returns the tuple
+        (ntransit, transit, window, slot, dilution), the last 4 being
+        arrays with one entry per time slot of the windows. The slot
+        is the index of the time slot of DTA_DELTAT from t_start.
+        """
+        trs, wns, jss, dls = [], [], [], []
+        for it, hits in enumerate(ampss):
+            n = len(hits)
+            h = np.array([ a is not None for a in hits ], dtype=bool)
+            v = np.array([ a if a is not None else np.nan for a in hits ], dtype=np.float64)
+            # ---  Interpolate simple hole
+            f = np.zeros(n, dtype=bool)
+            if n > 2: f[1:-1] = ~h[1:-1] & h[:-2] & h[2:]
+            ih = np.nonzero(f)[0]
+            v[ih] = (v[ih+1] + v[ih-1]) / 2.0
+            w = h | f
+            js = np.nonzero(w)[0]
+            starts = w & ~np.concatenate(([False], w[:-1]))
+            trs.append( np.full(js.shape[0], it, dtype=np.int16) )
+            wns.append( (np.cumsum(starts) - 1)[js].astype(np.int32) )
+            jss.append( js.astype(np.int64) )
+            dls.append( v[js] )
+        return self.__joinColumns(len(ampss), trs, wns, jss, dls)
+
+    def __windowsToColumns(self, wins, t_start):
+        """
+        Columnar version of the exposure windows wins
+        """
+        trs, wns, jss, dls = [], [], [], []
+        for it, ps in enumerate(wins):
+            for iw, p in enumerate(ps):
+                trs.append( np.full(len(p), it, dtype=np.int16) )
+                wns.append( np.full(len(p), iw, dtype=np.int32) )
+                jss.append( np.array([ (t0-t_start) // DTA_DELTAT for t0, t1, d in p ], dtype=np.int64) )
+                dls.append( np.array([ d for t0, t1, d in p ], dtype=np.float64) )
+        return self.__joinColumns(len(wins), trs, wns, jss, dls)
+
+    def __joinColumns(self, ntr, trs, wns, jss, dls):
+        if not trs:
+            return (ntr, np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        return (ntr, np.concatenate(trs), np.concatenate(wns), np.concatenate(jss), np.concatenate(dls))
+
     def dump(self):
         if self.m_river:
             return '%s; %s; %f' % (self.m_name, self.m_river.name, self.m_dist2SL)
@@ -727,6 +1335,9 @@ class OverflowPoints:
         self.m_dilution = -1.0
         self.m_root = None
         self.m_pnts = {}
+        self.m_cycles = []      # List of (dt, dh) of all the tide cycles
+        self.m_station= ''      # Tide station id, '' for default
+        self.m_pathStore = None # PathStore, shared by all points
 
     def load(self, dataDir, rivers):
         """
@@ -734,6 +1345,7 @@ class OverflowPoints:
         """
         points = {}
         diltgt = -1.0
+        station= ''
 
         # ---  Read river and link data
         fname = os.path.join(dataDir, 'overflow.river.txt')
@@ -763,6 +1375,8 @@ class OverflowPoints:
                 if l.find('Dilution threshold is') > 0:
                     tk_dl = l[1:].split()[-1]
                     diltgt = float(tk_dl)
+                if l.find('Tide station is') > 0:
+                    station = l[1:].split()[-1]
             else:
                 try:
                     st = l.split(';')[0]
@@ -844,10 +1458,26 @@ class OverflowPoints:
         for p in self.m_pnts.values():
             p.resolveLinks(self)
 
+        # ---  Number the tide cycles
+        cycles = set()
+        for p in self.m_pnts.values():
+            for m in p.m_tideRsp:
+                cycles.add( (m.m_dt, m.m_dh) )
+        self.m_cycles = sorted(cycles)
+
+        # ---  Path store, shared by all points
+        store = PathStore(dataDir)
+        for p in self.m_pnts.values():
+            for m in p.m_tideRsp:
+                m.m_cycleNo = self.m_cycles.index( (m.m_dt, m.m_dh) )
+                m.m_pathStore = store
+
         # ---  Keep the data
         self.m_dataDir  = dataDir
         self.m_dilution = diltgt
+        self.m_station  = station
         self.m_root     = root
+        self.m_pathStore= store
 
     def checkInclusion(self, other):
         """
@@ -891,6 +1521,44 @@ class OverflowPoints:
         """
         return sorted( self.m_pnts.keys() )
 
+    def getStation(self):
+        """
+        Returns the tide station id, '' for the default station
+        """
+        return self.m_station
+
+    def getCycles(self):
+        """
+        Returns the list of all tide cycles as (dt, dh)
+        """
+        return self.m_cycles
+
+    def buildCycleIndex(self, tide_tbl):
+        """
+        Build in tide_tbl the cycle index on all the tide cycles and,
+        for the points with only some of them, the cycle index on their
+        own cycles, so that a real tide is matched to the nearest cycle
+        of the point.
+        Returns the cycle index id on all the tide cycles.
+        """
+        cycleIdx = tide_tbl.buildCycleIndex(self.m_cycles)
+        idxs = {}
+        for p in self.m_pnts.values():
+            nos = sorted( set([ m.m_cycleNo for m in p.m_tideRsp ]) )
+            if not nos or len(nos) == len(self.m_cycles): continue
+            key = tuple(nos)
+            if key not in idxs:
+                idxs[key] = tide_tbl.buildCycleIndex(self.m_cycles, nos)
+            for m in p.m_tideRsp:
+                m.m_cycleIdxs[cycleIdx] = idxs[key]
+        return cycleIdx
+
+    def getPathStore(self):
+        """
+        Returns the PathStore of the dataset
+        """
+        return self.m_pathStore
+
     def __getitem__(self, name):
         return self.m_pnts[name]
 
@@ -911,7 +1579,7 @@ if __name__ == '__main__':
     def loadTides(path):
         tbl = tide.TideTable()
         tbl.load(path)
-        return tbl
+        return tbl.getStation()
     def loadRivers(path):
         tbl = river.Rivers()
         tbl.load(path)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Local stand-in for the MPO tide table server.
+Replays the pages recorded in a directory, typically the cache
+directory of tide-data-update.py, where a page is stored under its
+URL path. Conditional requests (If-None-Match, If-Modified-Since)
+are answered with 304.
+
+Allows to test and benchmark the download pipeline offline.
+"""
+
+import email.utils
+import hashlib
+import http.server
+import logging
+import optparse
+import os
+import threading
+
+LOGGER = logging.getLogger("INRS.ASModel.tide.server")
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serve the file root/path for GET path
+    """
+    protocol_version = 'HTTP/1.1'
+    chunkSize = 4*1024
+
+    def __getFile(self):
+        pth = self.path.split('?')[0].strip('/')
+        tks = [ t for t in pth.split('/') if t not in ('', '.', '..') ]
+        fname = os.path.join(self.server.root, *tks)
+        return fname if os.path.isfile(fname) else None
+
+    def do_GET(self):
+        fname = self.__getFile()
+        if not fname:
+            self.send_error(404)
+            return
+
+        with open(fname, 'rb') as f:
+            body = f.read()
+        etag  = '"%s"' % hashlib.md5(body).hexdigest()
+        mtime = email.utils.formatdate(os.path.getmtime(fname), usegmt=True)
+
+        if self.headers.get('If-None-Match') == etag or \
+           (not self.headers.get('If-None-Match') and self.headers.get('If-Modified-Since') == mtime):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type',   'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag',           etag)
+        self.send_header('Last-Modified',  mtime)
+        self.end_headers()
+        # ---  Send in chunks, with delay, to simulate streaming
+        for i in range(0, len(body), self.chunkSize):
+            self.wfile.write(body[i:i+self.chunkSize])
+            if self.server.delay: self.server.event.wait(self.server.delay)
+
+    def log_message(self, format, *args):
+        LOGGER.debug('%s - %s', self.address_string(), format % args)
+
+class FixtureServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, address=('127.0.0.1', 0), delay=0.0):
+        http.server.ThreadingHTTPServer.__init__(self, address, FixtureHandler)
+        self.root  = root
+        self.delay = delay      # [s] Delay between chunks
+        self.event = threading.Event()
+
+def serve(root, port=0, delay=0.0):
+    """
+    Start a fixture server on localhost in a background thread.
+    port=0 selects a free port, see server.server_address.
+    Stop the server with server.shutdown().
+    """
+    server = FixtureServer(root, ('127.0.0.1', port), delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    LOGGER.info('Fixture server on http://%s:%i, serving %s', server.server_address[0], server.server_address[1], root)
+    return server
+
+if __name__ == '__main__':
+    def main():
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.INFO)
+
+        parser = optparse.OptionParser(usage='%prog [options] root_dir')
+        parser.add_option('-p', '--port',  dest='port',  default=8000, type='int',   help='port [%default]')
+        parser.add_option('-d', '--delay', dest='delay', default=0.0,  type='float', help='delay between chunks [s] [%default]')
+        opts, args = parser.parse_args()
+        if len(args) != 1: parser.error('root_dir is required')
+
+        server = FixtureServer(args[0], ('127.0.0.1', opts.port), opts.delay)
+        LOGGER.info('Serving %s on http://127.0.0.1:%i', args[0], opts.port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+    main()
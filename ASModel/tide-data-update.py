@@ -25,16 +25,22 @@ Utilitaries allow to download the data from MPO site
 """
 
 import codecs
+import concurrent.futures
 import contextlib
 import datetime
 import dateutil
 import glob
+import html.parser
+import json
 import logging
+import optparse
 import traceback
 import os
+import threading
 import time
 import warnings
 import requests
+import requests.adapters
 import pytz
 import dateutil.parser
 
@@ -46,29 +52,134 @@ warnings.filterwarnings("ignore", category=UnicodeWarning)
 
 LOGGER = logging.getLogger("INRS.ASModel.tide")
 
+MPO_URL = 'http://www.waterlevels.gc.ca'
+
 def nint(d):
     return int(d + 0.5)
 
+class PageParserMPO(html.parser.HTMLParser):
+    """
+    Incremental parser for MPO tide table pages.
+    Data is fed as it comes, the records are decoded
+    as soon as a table row is complete.
+
+    Each month is a <table class="width-100"> with a <caption>,
+    each record a row of 3 cells (day, time, water level).
+    """
+    def __init__(self, decodeRecord):
+        html.parser.HTMLParser.__init__(self, convert_charrefs=True)
+        self.decodeRecord = decodeRecord
+        self.records = []
+        self.m       = 0        # Month index
+        self.inTable = False
+        self.inBody  = False
+        self.cells   = None
+        self.cell    = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if ('class', 'width-100') in attrs:
+                self.inTable = True
+                self.m += 1
+        elif not self.inTable:
+            pass
+        elif tag == 'tbody':
+            self.inBody = True
+        elif tag == 'tr' and self.inBody:
+            self.cells = []
+        elif tag == 'td' and self.cells is not None:
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        if not self.inTable:
+            return
+        if tag == 'td' and self.cell is not None:
+            self.cells.append(''.join(self.cell).strip())
+            self.cell = None
+        elif tag == 'tr' and self.cells is not None:
+            if len(self.cells) == 3:
+                self.records.append( self.decodeRecord(self.m, *self.cells) )
+            self.cells = None
+        elif tag == 'tbody':
+            self.inBody = False
+        elif tag == 'table':
+            self.inTable = False
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+class ResponseCache:
+    """
+    On-disk cache of the downloaded pages.
+    A page is stored under its URL path, with its validators
+    (ETag, Last-Modified) in a companion .meta.json file.
+    The cache directory can be replayed as is by tide-data-server.py.
+    """
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+
+    def __getPath(self, url):
+        pth = requests.utils.urlparse(url).path.strip('/')
+        return os.path.join(self.cacheDir, *pth.split('/'))
+
+    def getHeaders(self, url):
+        """
+        Return the headers for a conditional request on url
+        """
+        hdrs = {}
+        try:
+            with codecs.open(self.__getPath(url)+'.meta.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('etag'):          hdrs['If-None-Match']     = meta['etag']
+            if meta.get('last-modified'): hdrs['If-Modified-Since'] = meta['last-modified']
+        except (IOError, ValueError):
+            pass
+        return hdrs
+
+    def read(self, url):
+        with codecs.open(self.__getPath(url), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def write(self, url, body, headers):
+        fname = self.__getPath(url)
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        meta = {
+            'url'          : url,
+            'etag'         : headers.get('ETag', ''),
+            'last-modified': headers.get('Last-Modified', ''),
+        }
+        # ---  Write to temp file and rename, concurrent writers might exist
+        tmpName = '%s.%d.tmp' % (fname, threading.get_ident())
+        with codecs.open(tmpName, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmpName, fname)
+        with codecs.open(tmpName, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmpName, fname+'.meta.json')
+
 class DataReaderMPO:
     """
     Data reader for MPO tide tables
     """
-    def __init__(self, station = -1, year = datetime.date.today().year):
+    MAX_RETRY  = 3
+    RETRY_WAIT = 5.0        # [s]
+    TIMEOUT    = 60.0       # [s]
+    CHUNK_SIZE = 16*1024
+
+    def __init__(self, station = -1, year = datetime.date.today().year, baseUrl = MPO_URL):
         self.station = station
         self.year    = year
+        self.baseUrl = baseUrl
         self.tzinfo  = dateutil.tz.tzoffset('HNE', datetime.timedelta(hours=-5))
 
     def __buildURL(self):
         y = self.year
         i = self.station
-        url = 'http://www.waterlevels.gc.ca/fra/donnees/tableau/%i/wlev_sec/%i' % (y, i)
+        url = '%s/fra/donnees/tableau/%i/wlev_sec/%i' % (self.baseUrl.rstrip('/'), y, i)
         return url
 
-    def __decodeRecord(self, m, l1, l2, l3):
-        d = l1.split('>')[1].split('<')[0]
-        t = l2.split('>')[1].split('<')[0]
-        h = l3.split('>')[1].split('<')[0]
-
+    def __decodeRecord(self, m, d, t, h):
         yy = self.year
         dd = int(d)
         hh = [ int(tt) for tt in t.split(':') ]
@@ -77,81 +188,84 @@ class DataReaderMPO:
         utc_dt = lcl_dt.astimezone(pytz.utc)
         return TideRecord(utc_dt, wl)
 
-    def __skipToLine(self, lines, tgt):
-        while True:
-            l = self.__readLine(lines)
-            if l == tgt: 
-                LOGGER.debug('DataReaderMPO.__skipToLine found %s', tgt)
-                break
-
-    def __readLine(self, lines):
-        l = ''
-        while not l:
-            l = next(lines).strip()
-        return l
-
-    def __readData(self, lines):
+    def __get(self, session, url, headers):
         """
-        Return a list of TideRecord(s)
-        lines is an iterator on the content
+        GET with retries on connection failure
         """
-        records = []
-        m = 0
-        while True:
-            try:
-                self.__skipToLine(lines, '<table class="width-100">')
-            except StopIteration:
-                break
-
-            l = self.__readLine(lines)
-            if not l: break
-            l = l.strip()
-            assert l[:9] == '<caption>'
-            m += 1
-            self.__skipToLine(lines, '<tbody>')
-
-            self.__skipToLine(lines, '<tr>')
-            eob = False
-            while not eob:
-                l1 = self.__readLine(lines)
-                l2 = self.__readLine(lines)
-                l3 = self.__readLine(lines)
-                r = self.__decodeRecord(m, l1, l2, l3)
-                records.append(r)
-
-                l = self.__readLine(lines)
-                assert l[:9] == '</tr>'
-                l = self.__readLine(lines)
-                if l == '</tbody>': 
-                    eob = True
-                else:
-                    assert l[:8] == '<tr>'
-
-        return records
-
-    def read(self):
-        MAX_RETRY = 3
-        url = self.__buildURL()
-        LOGGER.info('Connecting to : %s', url)
-        for itry in range(MAX_RETRY):
+        for itry in range(DataReaderMPO.MAX_RETRY):
             try:
-                r = requests.get(url, stream=True)
+                return session.get(url, headers=headers, stream=True, timeout=DataReaderMPO.TIMEOUT)
             except requests.RequestException as e:
                 LOGGER.error('Connection failure: %s', str(e))
-                LOGGER.error('   Retrying %i/%i', itry+1, MAX_RETRY)
-                time.sleep(5) # (900)
+                if itry+1 >= DataReaderMPO.MAX_RETRY: raise
+                LOGGER.error('   Retrying %i/%i', itry+1, DataReaderMPO.MAX_RETRY)
+                time.sleep(DataReaderMPO.RETRY_WAIT)
 
-        if (r.status_code != 200):
-            raise ValueError('\n'.join((
-                        'Connection error:',
-                        '   HTTP Status: %i' % r.status_code,
-                        '   Reason: %s' % r.reason)))
+    def read(self, session = None, cache = None):
+        """
+        Download and decode the table. The page is parsed as it
+        streams in. With a cache, the request is conditional and a
+        non modified page is read from the cache.
+        """
+        url = self.__buildURL()
+        LOGGER.info('Connecting to : %s', url)
+        hdrs = cache.getHeaders(url) if cache else {}
+        if session is None: session = requests
+        r = self.__get(session, url, hdrs)
 
-        records = []
+        parser = PageParserMPO(self.__decodeRecord)
         with contextlib.closing(r) as r_:
-            records = self.__readData( r_.iter_lines(decode_unicode=True) )
-
-        return records
+            if r_.status_code == 304:
+                LOGGER.debug('DataReaderMPO.read: not modified %s', url)
+                parser.feed( cache.read(url) )
+            elif r_.status_code == 200:
+                if r_.encoding is None: r_.encoding = 'utf-8'
+                body = []
+                for chunk in r_.iter_content(chunk_size=DataReaderMPO.CHUNK_SIZE, decode_unicode=True):
+                    parser.feed(chunk)
+                    if cache: body.append(chunk)
+                if cache: cache.write(url, ''.join(body), r_.headers)
+            else:
+                raise ValueError('\n'.join((
+                            'Connection error:',
+                            '   HTTP Status: %i' % r_.status_code,
+                            '   Reason: %s' % r_.reason)))
+        parser.close()
+        return parser.records
+
+class DownloaderMPO:
+    """
+    Concurrent download of many station-years, over a
+    pooled session, with an optional on-disk cache.
+    """
+    def __init__(self, nworkers = 8, cacheDir = None, baseUrl = MPO_URL):
+        self.nworkers = nworkers
+        self.baseUrl  = baseUrl
+        self.cache    = ResponseCache(cacheDir) if cacheDir else None
+        self.session  = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=nworkers)
+        self.session.mount('http://',  adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __read(self, station, year):
+        r = DataReaderMPO(station, year, baseUrl=self.baseUrl)
+        return r.read(session=self.session, cache=self.cache)
+
+    def iterDownload(self, stationYears):
+        """
+        Generator on ((station, year), records), in completion order.
+        On failure, records is the exception.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.nworkers) as xctr:
+            ftrs = { xctr.submit(self.__read, s, y): (s, y) for s, y in stationYears }
+            for ftr in concurrent.futures.as_completed(ftrs):
+                try:
+                    yield ftrs[ftr], ftr.result()
+                except Exception as e:
+                    yield ftrs[ftr], e
 
 class TideTable:
     """
@@ -177,37 +291,65 @@ class TideTable:
         self.tbl.sort()
 
 if __name__ == '__main__':
-    def downloadTables():
-        for y in [2017, 2018, 2019, 2020]:
-            try:
-                tide_tbl = TideTable()
-                # ---  Download from internet
-                LOGGER.info('Reading tide table for year %i', y)
-                r = DataReaderMPO(3248, y)
-                tide_tbl.extend( r.read() )
-
-                # ---  Sort
-                tide_tbl.sort()
-
-                # ---  Check sorted
-                for r0, r1 in zip(tide_tbl.tbl, tide_tbl.tbl[1:]):
-                    if not r0 < r1:
-                        LOGGER.warning('Table not sorted: r0=%s r1=%s' %(str(r0), str(r1)))
-
-                # ---  Dump
-                fname = os.path.join('.', 'tide_3248-%i.txt' % y)
-                tide_tbl.dump(fname)
-            except Exception as e:
-                LOGGER.error('%s', str(e))
-                LOGGER.debug('%s', traceback.format_exc())
-        return tide_tbl
-
-    logHndlr = logging.StreamHandler()
-    FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    logHndlr.setFormatter( logging.Formatter(FORMAT) )
-
-    #LOGGER = logging.getLogger("INRS.ASModel.tide")
-    LOGGER.addHandler(logHndlr)
-    LOGGER.setLevel(logging.INFO)
-
-    tbl1 = downloadTables()
+    def downloadTables(stations, years, outDir, nworkers, cacheDir, baseUrl):
+        dldr = DownloaderMPO(nworkers=nworkers, cacheDir=cacheDir, baseUrl=baseUrl)
+        try:
+            for (s, y), rcds in dldr.iterDownload([ (s, y) for s in stations for y in years ]):
+                if isinstance(rcds, Exception):
+                    LOGGER.error('Station %i, year %i: %s', s, y, str(rcds))
+                    continue
+                try:
+                    tide_tbl = TideTable()
+                    tide_tbl.extend( rcds )
+
+                    # ---  Sort
+                    tide_tbl.sort()
+
+                    # ---  Check sorted
+                    for r0, r1 in zip(tide_tbl.tbl, tide_tbl.tbl[1:]):
+                        if not r0 < r1:
+                            LOGGER.warning('Table not sorted: r0=%s r1=%s' %(str(r0), str(r1)))
+
+                    # ---  Dump
+                    fname = os.path.join(outDir, 'tide_%i-%i.txt' % (s, y))
+                    tide_tbl.dump(fname)
+                except Exception as e:
+                    LOGGER.error('%s', str(e))
+                    LOGGER.debug('%s', traceback.format_exc())
+        finally:
+            dldr.close()
+
+    def main():
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+
+        #LOGGER = logging.getLogger("INRS.ASModel.tide")
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.INFO)
+
+        y = datetime.date.today().year
+        parser = optparse.OptionParser(usage='%prog [options]')
+        parser.add_option('-s', '--stations', dest='stations', default='3248',         help='comma separated station ids [%default]')
+        parser.add_option('-y', '--years',    dest='years',    default='%i,%i' % (y, y+1), help='comma separated years [%default]')
+        parser.add_option('-o', '--output',   dest='outDir',   default='.',            help='output directory [%default]')
+        parser.add_option('-j', '--jobs',     dest='nworkers', default=8, type='int',  help='concurrent downloads [%default]')
+        parser.add_option('-c', '--cache',    dest='cacheDir', default=None,           help='on-disk response cache directory')
+        parser.add_option('-u', '--url',      dest='baseUrl',  default=MPO_URL,        help='server base URL [%default]')
+        parser.add_option('-f', '--fixture',  dest='fixture',  default=None,           help='replay the pages recorded in this directory with a local server')
+        opts, args = parser.parse_args()
+
+        stations = [ int(s) for s in opts.stations.split(',') ]
+        years    = [ int(y) for y in opts.years.split(',') ]
+        baseUrl  = opts.baseUrl
+        server   = None
+        if opts.fixture:
+            import importlib
+            server  = importlib.import_module('tide-data-server').serve(opts.fixture)
+            baseUrl = 'http://%s:%i' % server.server_address[:2]
+        try:
+            downloadTables(stations, years, opts.outDir, opts.nworkers, opts.cacheDir, baseUrl)
+        finally:
+            if server: server.shutdown()
+
+    main()
@@ -18,32 +18,56 @@ cdef class TideRecord:
     @cython.locals (dt = str, wl = str)
     cpdef              load            (TideRecord self, str l)
 
-cdef class TideTable:
+cdef class TideStation:
     #cdef public double       DELTA_NRMTD
     #cdef public long         NPNTS_HW_LW
     #cdef public long         NPNTS_LW_HW
+    cdef public str          m_station
     cdef public list         tbl
+    cdef public list         m_hwT
+    cdef public list         m_lwT
+    cdef public object       m_tdDt
+    cdef public object       m_tdDh
+    cdef public list         m_cycleIdx
     #
     @cython.locals (f = object, r = TideRecord)
-    cpdef              dump            (TideTable self, str fname)
-    @cython.locals (f = object, fname = str, l = str, ptrn = str, r = TideRecord, uniquer = set)
-    cpdef              load            (TideTable self, str dataDir)
-    cpdef              append          (TideTable self, TideRecord r)
-    cpdef              extend          (TideTable self, list t)
-    cpdef              sort            (TideTable self)
+    cpdef              dump            (TideStation self, str fname)
+    @cython.locals (ptrn = str)
+    cpdef              load            (TideStation self, str dataDir)
+    @cython.locals (f = object, fname = str, l = str, r = TideRecord, uniquer = set)
+    cpdef              loadFiles       (TideStation self, list fnames)
+    cpdef              append          (TideStation self, TideRecord r)
+    cpdef              extend          (TideStation self, list t)
+    cpdef              sort            (TideStation self)
+    @cython.locals (ihw = object, ilw = list, isHW = object, t = object, wl = object)
+    cpdef              buildIndex      (TideStation self)
+    @cython.locals (cdh = object, cdt = object, cok = object, d2 = object, idx = list, sdh = double, sdt = double)
+    cpdef long         buildCycleIndex (TideStation self, list cycles, list among=*)
+    @cython.locals (i = long, idx = list)
+    cpdef long         getCycleIndex   (TideStation self, long cycleIdx, datetime.datetime dt)
+    @cython.locals (t0 = datetime.datetime, t1 = datetime.datetime)
+    cpdef object       getTimeRange    (TideStation self)
     @cython.locals (res = list, t_actu = datetime.datetime)
-    cpdef list         getTideSignal   (TideTable self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt)
+    cpdef list         getTideSignal   (TideStation self, datetime.datetime t_start, datetime.datetime t_end, datetime.timedelta dt)
     @cython.locals (a = double, h = double, i = long, r0 = TideRecord, r1 = TideRecord)
-    cpdef TideRecord   getWL           (TideTable self, datetime.datetime dt)
+    cpdef TideRecord   getWL           (TideStation self, datetime.datetime dt)
     @cython.locals (i = long)
-    cpdef TideRecord   getPreviousHW   (TideTable self, datetime.datetime dt)
+    cpdef TideRecord   getPreviousHW   (TideStation self, datetime.datetime dt)
     @cython.locals (i = long)
-    cpdef TideRecord   getPreviousLW   (TideTable self, datetime.datetime dt)
+    cpdef TideRecord   getPreviousLW   (TideStation self, datetime.datetime dt)
     @cython.locals (i = long)
-    cpdef TideRecord   getNextHW       (TideTable self, datetime.datetime dt)
+    cpdef TideRecord   getNextHW       (TideStation self, datetime.datetime dt)
     @cython.locals (i = long)
-    cpdef TideRecord   getNextLW       (TideTable self, datetime.datetime dt)
-    cpdef double       getNormalizedTime(TideTable self, datetime.datetime dt)
-    @cython.locals (doDebug = bint, dt2hw = double, dt2lw = double, hw0 = TideRecord, hw1 = TideRecord, hw2lw = double, inrm_tim = long, lw = TideRecord, lw2hw = double, nstp_dt2lw = long, nstp_hw2lw = long, stp_hw2lw = double, stp_lw2hw = double)
-    cpdef long         getNormalizedTimeIndex(TideTable self, datetime.datetime dt)
+    cpdef TideRecord   getNextLW       (TideStation self, datetime.datetime dt)
+    cpdef double       getNormalizedTime(TideStation self, datetime.datetime dt)
+    @cython.locals (hw0 = double, inrm_tim = long, k = long, lw = double, stp_hw2lw = double, stp_lw2hw = double, t = double)
+    cpdef long         getNormalizedTimeIndex(TideStation self, datetime.datetime dt)
 
+cdef class TideTable:
+    cdef public dict         m_stations
+    #
+    @cython.locals (fname = str, fnames = dict, fns = list, ptrn = str, station = TideStation, stn = str)
+    cpdef              load            (TideTable self, str dataDir)
+    cpdef              addStation      (TideTable self, TideStation station)
+    cpdef list         getStationIds   (TideTable self)
+    cpdef TideStation  getStation      (TideTable self, str station=*)
@@ -33,9 +33,15 @@ import logging
 import os
 import time
 import warnings
+import numpy as np
 import requests
 import pytz
 
+try:
+    from . import tideseries
+except ImportError:
+    import tideseries
+
 # Obscur bug in dateutil.parser
 # http://stackoverflow.com/questions/21296475/python-dateutil-str-warning
 # import dateutil.parser
@@ -137,17 +143,24 @@ class TideRecord:
         self.dt = fromisoformat(dt)
         self.wl = float(wl)
 
-class TideTable:
+class TideStation:
     """
-    A TideTable is a sequence of TideRecords
+    A TideStation is the sequence of TideRecords of one tide gauge,
+    with the precomputed arrays for the normalized time.
     """
 
     NPNTS_HW_LW = 31
     NPNTS_LW_HW = 19
     DELTA_NRMTD = 900.0     # delta t for normalized tide
 
-    def __init__(self):
+    def __init__(self, station=''):
+        self.m_station = station
         self.tbl = []
+        self.m_hwT  = []    # HW times [s since epoch], for bisect
+        self.m_lwT  = []    # LW time of each real tide [s since epoch]
+        self.m_tdDt = None  # Duration of each real tide (HW to next HW) [s]
+        self.m_tdDh = None  # Amplitude of each real tide (HW to LW) [m]
+        self.m_cycleIdx = []    # For each cycle index, nearest cycle for each real tide
 
     def dump(self, fname):
         f = codecs.open(fname, "w", encoding="utf-8")
@@ -170,9 +183,15 @@ class TideTable:
     #     LOGGER.debug('Tide table loaded, size = %i', len(self.tbl))
 
     def load(self, dataDir):
+        """
+        Load all the tide files of the station in dataDir
+        """
+        ptrn = os.path.join(dataDir, 'tide_%s-*.txt' % self.m_station)
+        self.loadFiles( glob.glob(ptrn) )
+
+    def loadFiles(self, fnames):
         uniquer = set()
-        ptrn = os.path.join(dataDir, 'tide_3248*.txt')
-        for fname in glob.glob(ptrn):
+        for fname in fnames:
             LOGGER.debug('Read tide file %s', fname)
             f = codecs.open(fname, "r", encoding="utf-8")
             for l in f.readlines():
@@ -183,6 +202,23 @@ class TideTable:
                 uniquer.add(r)
         self.tbl.extend( sorted(uniquer) )
         LOGGER.debug('Tide table loaded, size = %i', len(self.tbl))
+        self.buildIndex()
+
+    def loadSeries(self, fname, **kwargs):
+        """
+        Load the HW/LW extracted from a high frequency water level
+        series (see tideseries.readSeries for the file formats).
+        kwargs are passed to tideseries.findExtrema.
+        The records are merged with the actual content.
+        """
+        LOGGER.debug('Read water level series %s', fname)
+        rcds = tideseries.extractHWLW(fname, **kwargs)
+        uniquer = set(self.tbl)
+        for dt, wl in zip(rcds['dt'], rcds['wl']):
+            uniquer.add( TideRecord(tideseries.toDatetime(dt), float(wl)) )
+        self.tbl = sorted(uniquer)
+        LOGGER.debug('Tide table loaded, size = %i', len(self.tbl))
+        self.buildIndex()
 
     def append(self, r):
         self.tbl.append(r)
@@ -192,6 +228,100 @@ class TideTable:
 
     def sort(self):
         self.tbl.sort()
+        self.buildIndex()
+
+    def buildIndex(self):
+        """
+        Precompute, for every real tide (HW to next HW) in the table,
+        its start, duration and amplitude.
+        The cycle indexes are invalidated.
+        """
+        self.m_cycleIdx = []
+        if len(self.tbl) < 3:
+            self.m_hwT  = []
+            self.m_lwT  = []
+            self.m_tdDt = np.empty(0)
+            self.m_tdDh = np.empty(0)
+            return
+
+        t  = np.array([ r.dt.timestamp() for r in self.tbl ])
+        wl = np.array([ r.wl for r in self.tbl ])
+        isHW = np.empty(wl.shape, dtype=bool)
+        isHW[1:-1] = (wl[1:-1] > wl[:-2]) & (wl[1:-1] > wl[2:])
+        isHW[ 0] = wl[ 0] > wl[ 1]
+        isHW[-1] = wl[-1] > wl[-2]
+        ihw = np.nonzero(isHW)[0]
+
+        ilw = [ i0 + np.argmin(wl[i0:i1]) for i0, i1 in zip(ihw[:-1], ihw[1:]) ]
+
+        self.m_hwT  = t[ihw].tolist()
+        self.m_lwT  = t[ilw].tolist()
+        self.m_tdDt = np.diff(t[ihw])
+        self.m_tdDh = wl[ihw[:-1]] - wl[ilw]
+        LOGGER.debug('Tide station %s index: %i real tides', self.m_station, self.m_tdDt.shape[0])
+
+    def buildCycleIndex(self, cycles, among=None):
+        """
+        For every real tide in the table, find the nearest cycle
+        in cycles, a list of (duration [s], amplitude [m]) as in the
+        modelled tide cycles of a dataset.
+        among, if not None, is the list of the indexes in cycles
+        to choose from, e.g. the cycles of one point.
+        Distances are scaled by the extent of the cycles.
+        Returns the cycle index id, to be used with getCycleIndex.
+        """
+        cdt = np.array([ c[0] for c in cycles ], dtype=np.float64)
+        cdh = np.array([ c[1] for c in cycles ], dtype=np.float64)
+        sdt = np.ptp(cdt) if cdt.shape[0] > 1 and np.ptp(cdt) > 0.0 else 3600.0
+        sdh = np.ptp(cdh) if cdh.shape[0] > 1 and np.ptp(cdh) > 0.0 else 1.0
+        if among is not None:
+            cok = np.zeros(cdt.shape[0], dtype=bool)
+            cok[among] = True
+        else:
+            cok = np.ones(cdt.shape[0], dtype=bool)
+        if cok.any() and self.m_tdDt is not None:
+            d2 = ((self.m_tdDt[:,np.newaxis] - cdt[np.newaxis,:]) / sdt)**2 + \
+                 ((self.m_tdDh[:,np.newaxis] - cdh[np.newaxis,:]) / sdh)**2
+            d2[:,~cok] = np.inf
+            idx = np.argmin(d2, axis=1).tolist()
+        else:
+            idx = []
+        self.m_cycleIdx.append(idx)
+        return len(self.m_cycleIdx)-1
+
+    def getCycleIndex(self, cycleIdx, dt):
+        """
+        Return the nearest cycle, as index in the cycles of
+        buildCycleIndex, for the real tide that holds datetime dt.
+        Returns -1 if dt is outside the table.
+        """
+        i = bisect.bisect_left(self.m_hwT, dt.timestamp()) - 1
+        idx = self.m_cycleIdx[cycleIdx]
+        return idx[i] if 0 <= i < len(idx) else -1
+
+    def getCycleIndexes(self, cycleIdx, t):
+        """
+        Vectorized version of getCycleIndex.
+        t is an array of times in seconds since epoch.
+        Returns the array of nearest cycles, -1 for the times
+        outside the table.
+        """
+        t   = np.asarray(t, dtype=np.float64)
+        idx = np.asarray(self.m_cycleIdx[cycleIdx], dtype=np.int64)
+        i   = np.searchsorted(np.asarray(self.m_hwT), t, side='left') - 1
+        ok  = (i >= 0) & (i < idx.shape[0])
+        return np.where(ok, idx[np.where(ok, i, 0)] if idx.shape[0] > 0 else -1, -1)
+
+    def getTimeRange(self):
+        """
+        Return the time range (t_start, t_end) covered by the real
+        tides of the table, as UTC datetimes: first to last HW.
+        Returns None if the table has no real tide.
+        """
+        if len(self.m_hwT) < 2: return None
+        t0 = datetime.datetime.fromtimestamp(self.m_hwT[ 0], tz=pytz.utc)
+        t1 = datetime.datetime.fromtimestamp(self.m_hwT[-1], tz=pytz.utc)
+        return t0, t1
 
     def getTideSignal(self, t_start, t_end, dt):
         """
@@ -260,7 +390,7 @@ class TideTable:
             return self.tbl[i+1]
 
     def getNormalizedTime(self, dt):
-        return self.getNormalizedTimeIndex(dt) * TideTable.DELTA_NRMTD
+        return self.getNormalizedTimeIndex(dt) * TideStation.DELTA_NRMTD
 
     def getNormalizedTimeIndex(self, dt):
         """
@@ -270,53 +400,97 @@ class TideTable:
         Real LW to HW is divided in 19 intervals of ~ 900s
         The normalized time is based on intervals of exactly 900s
         from the previous HW
+
+        The real tide is found with one bisect in the precomputed
+        HW/LW arrays.
         """
-        doDebug = (LOGGER.getEffectiveLevel() == logging.DEBUG)
-        hw0 = self.getPreviousHW(dt)
-        lw  = self.getNextLW(hw0.dt)
-        hw1 = self.getNextHW(hw0.dt)
-        if doDebug:
-            LOGGER.debug('HW0: %s', str(hw0))
-            LOGGER.debug('LW:  %s', str(lw))
-            LOGGER.debug('HW1: %s', str(hw1))
-        assert hw0.dt <= dt <= hw1.dt
-        if dt <= lw.dt:
-            dt2hw = (   dt - hw0.dt).total_seconds()    # delta from item to previous HW
-            lw2hw = (lw.dt - hw0.dt).total_seconds()    # delta from LW to previous HW
-            stp_hw2lw  = lw2hw / TideTable.NPNTS_HW_LW
-            nstp_dt2lw = nint(dt2hw/stp_hw2lw)
-            inrm_tim = nstp_dt2lw
-            if doDebug:
-                LOGGER.debug('dt < lw.dt')
-                LOGGER.debug('   Delta HW-T : %6.3fh %9.1fs', dt2hw/3600.0, dt2hw)
-                LOGGER.debug('   Delta HW-LW: %6.3fh %9.1fs', lw2hw/3600.0, lw2hw)
-                LOGGER.debug('   Step  HW-LW: %9.1fs', stp_hw2lw)
-                LOGGER.debug('   nsteps: %i', nstp_dt2lw)
-                LOGGER.debug('   normalized time: %f %f', inrm_tim*TideTable.DELTA_NRMTD, dt2hw)
+        t = dt.timestamp()
+        k = bisect.bisect_left(self.m_hwT, t) - 1
+        if k < 0 or k >= len(self.m_lwT):
+            raise IndexError('TideStation %s: %s is outside of tide table' % (self.m_station, dt))
+        hw0 = self.m_hwT[k]
+        lw  = self.m_lwT[k]
+        if t <= lw:
+            stp_hw2lw = (lw - hw0) / TideStation.NPNTS_HW_LW
+            inrm_tim  = nint((t - hw0) / stp_hw2lw)
         else:
-            dt2lw = (    dt -  lw.dt).total_seconds()    # delta from item to LW
-            dt2hw = (    dt - hw0.dt).total_seconds()    # delta from item to previous HW
-            hw2lw = (hw1.dt -  lw.dt).total_seconds()    # delta from next HW to LW
-            lw2hw = ( lw.dt - hw0.dt).total_seconds()    # delta from LW to previous HW
-            stp_lw2hw  = hw2lw / TideTable.NPNTS_LW_HW
-            stp_hw2lw  = lw2hw / TideTable.NPNTS_HW_LW
-            nstp_dt2lw = nint(dt2lw/stp_lw2hw)
-            nstp_hw2lw = nint(lw2hw/stp_hw2lw)
-            inrm_tim = (nstp_hw2lw + nstp_dt2lw)
-            assert nstp_hw2lw == TideTable.NPNTS_HW_LW
-            if doDebug:
-                LOGGER.debug('dt > lw.dt')
-                LOGGER.debug('   Delta LW-T : %6.3fh %9.1fs', dt2lw/3600.0, dt2lw)
-                LOGGER.debug('   Delta HW-T : %6.3fh %9.1fs', dt2hw/3600.0, dt2hw)
-                LOGGER.debug('   Delta HW-LW: %6.3fh %9.1fs', lw2hw/3600.0, lw2hw)
-                LOGGER.debug('   Delta LW-HW: %6.3fh %9.1fs', hw2lw/3600.0, hw2lw)
-                LOGGER.debug('   step HW-LW: %9.1fs', stp_hw2lw)
-                LOGGER.debug('   step LW-HW: %9.1fs', stp_lw2hw)
-                LOGGER.debug('   nsteps HW-LW: %i', nstp_hw2lw)
-                LOGGER.debug('   nsteps LW-T : %i', nstp_dt2lw)
-                LOGGER.debug('   normalized time: %f %f', inrm_tim*TideTable.DELTA_NRMTD, dt2hw)
+            stp_lw2hw = (self.m_hwT[k+1] - lw) / TideStation.NPNTS_LW_HW
+            inrm_tim  = TideStation.NPNTS_HW_LW + nint((t - lw) / stp_lw2hw)
         return inrm_tim
 
+    def getNormalizedTimeIndexes(self, t):
+        """
+        Vectorized version of getNormalizedTimeIndex.
+        t is an array of times in seconds since epoch.
+        Returns the array of normalized time indexes, -1 for
+        the times outside the table.
+        """
+        t   = np.asarray(t, dtype=np.float64)
+        hwT = np.asarray(self.m_hwT)
+        lwT = np.asarray(self.m_lwT)
+        k   = np.searchsorted(hwT, t, side='left') - 1
+        ok  = (k >= 0) & (k < lwT.shape[0])
+        k   = np.where(ok, k, 0)
+        hw0 = hwT[k]
+        lw  = lwT[k]
+        hw1 = hwT[np.minimum(k+1, hwT.shape[0]-1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            i_hw = np.floor((t - hw0) / ((lw - hw0) / TideStation.NPNTS_HW_LW) + 0.5)
+            i_lw = np.floor((t - lw) / ((hw1 - lw) / TideStation.NPNTS_LW_HW) + 0.5) + TideStation.NPNTS_HW_LW
+        inrm = np.where(t <= lw, i_hw, i_lw)
+        return np.where(ok, inrm, -1).astype(np.int64)
+
+class TideTable:
+    """
+    Registry of the TideStation(s), indexed by station id.
+    The station id is taken from the tide file name:
+        tide_<station>-<year>.txt
+    """
+    DEFAULT_STATION = '3248'
+
+    def __init__(self):
+        self.m_stations = {}
+
+    def load(self, dataDir):
+        """
+        Load all the tide files in dataDir, for all stations
+        """
+        fnames = {}
+        ptrn = os.path.join(dataDir, 'tide_*.txt')
+        for fname in glob.glob(ptrn):
+            stn = os.path.basename(fname)[5:-4].split('-')[0]
+            fnames.setdefault(stn, []).append(fname)
+        for stn, fns in sorted(fnames.items()):
+            try:
+                station = self.m_stations[stn]
+            except KeyError:
+                station = TideStation(stn)
+                self.m_stations[stn] = station
+            station.loadFiles(fns)
+        LOGGER.debug('Tide table loaded, stations = %s', self.getStationIds())
+
+    def addStation(self, station):
+        self.m_stations[station.m_station] = station
+
+    def getStationIds(self):
+        return sorted(self.m_stations.keys())
+
+    def getStation(self, station=''):
+        """
+        Return the TideStation with id station. Without id, return
+        the default station, or the only station of the table.
+        """
+        if station:
+            return self.m_stations[station]
+        if TideTable.DEFAULT_STATION in self.m_stations:
+            return self.m_stations[TideTable.DEFAULT_STATION]
+        if len(self.m_stations) == 1:
+            return list(self.m_stations.values())[0]
+        raise KeyError('TideTable: No default station in %s' % self.getStationIds())
+
+    def __getitem__(self, station):
+        return self.m_stations[station]
+
 
 if __name__ == '__main__':
     def main():
@@ -341,6 +515,7 @@ if __name__ == '__main__':
 
         tbl = TideTable()
         tbl.load(dirname)
+        stn = tbl.getStation()
 
     def test():
         ts = [
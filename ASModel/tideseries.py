@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+"""
+Water level series
+Extraction of the HW/LW records from a high frequency water level
+series, as delivered by a tide gauge.
+
+The series is smoothed with a quadratic Savitzky-Golay filter, which
+preserves the height of the extrema, and the extrema are detected
+as the sign changes of the filtered derivative. Everything but the
+final hysteresis filter on the (few) candidate extrema is vectorized.
+"""
+
+import codecs
+import datetime
+import logging
+import os
+
+import numpy as np
+
+LOGGER = logging.getLogger("INRS.ASModel.tideseries")
+
+# ---  Record type, compatible with TideRecord (dt, wl)
+RECORD_DTYPE = np.dtype([('dt', 'datetime64[s]'), ('wl', 'f8'), ('hw', '?')])
+
+SMOOTH_WINDOW = 3600.0      # [s] Smoothing window
+MIN_DELTA_T   = 7200.0      # [s] Minimal time between HW and LW
+MIN_DELTA_H   = 0.10        # [m] Minimal range between HW and LW
+
+def _iso2epoch(dts):
+    """
+    Convert a sequence of iso strings to seconds since epoch.
+    numpy does the parsing as long as the time zone is UTC.
+    """
+    if all(s.endswith('Z') for s in dts):
+        dts = [s[:-1] for s in dts]
+    elif all(s.endswith('+00:00') for s in dts):
+        dts = [s[:-6] for s in dts]
+    try:
+        t = np.array(dts, dtype='datetime64[ms]')
+        return t.astype(np.int64) / 1000.0
+    except ValueError:
+        pass
+    try:
+        from .tide import fromisoformat
+    except ImportError:
+        from tide import fromisoformat
+    return np.array([fromisoformat(s).timestamp() for s in dts], dtype=np.float64)
+
+def _readText(fname):
+    """
+    Read a text file with one record per line:
+        datetime; water level
+    The separator might also be a ','. Lines starting with # are comments.
+    """
+    with codecs.open(fname, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    lines = [l for l in lines if l.strip() and l.lstrip()[0] != '#']
+    sep = ';' if ';' in lines[0] else ','
+    tks = [l.split(sep) for l in lines]
+    t = _iso2epoch([tk[0].strip() for tk in tks])
+    h = np.array([tk[1] for tk in tks], dtype=np.float64)
+    return t, h
+
+def readSeries(fname):
+    """
+    Read a water level series from file. Supported formats are:
+        .npy:   array (n, 2) of (t, h)
+        .npz:   arrays 't' and 'h'
+        other:  text file, with records "datetime; wl"
+    t is either a datetime64 or seconds since epoch, UTC.
+    Returns (t, h) as float64 arrays, t in seconds since epoch.
+    """
+    LOGGER.debug('Read water level series %s', fname)
+    ext = os.path.splitext(fname)[1].lower()
+    if ext == '.npy':
+        a = np.load(fname)
+        t, h = a[:,0], a[:,1]
+    elif ext == '.npz':
+        with np.load(fname) as a:
+            t, h = a['t'], a['h']
+    else:
+        t, h = _readText(fname)
+    if np.issubdtype(t.dtype, np.datetime64):
+        t = t.astype('datetime64[ms]').astype(np.int64) / 1000.0
+    return np.asarray(t, dtype=np.float64), np.asarray(h, dtype=np.float64)
+
+def _sgKernels(m):
+    """
+    Quadratic Savitzky-Golay kernels of half width m,
+    for the smoothed value and for the first derivative
+    (per sample).
+    """
+    k = np.arange(-m, m+1, dtype=np.float64)
+    n = 2*m + 1
+    c0 = (3.0*(3*m*m + 3*m - 1) - 15.0*k*k) / (n*(2*m - 1)*(2*m + 3))
+    c1 = k / np.sum(k*k)
+    return c0, c1
+
+def findExtrema(t, h, window=SMOOTH_WINDOW, min_dt=MIN_DELTA_T, min_dh=MIN_DELTA_H):
+    """
+    Detect the HW and LW of the regularly sampled series (t, h).
+        window: smoothing window [s]
+        min_dt: minimal time between consecutive HW and LW [s]
+        min_dh: minimal range between consecutive HW and LW [m]
+    Returns a structured array of RECORD_DTYPE, sorted on time,
+    alternating HW and LW.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    h = np.asarray(h, dtype=np.float64)
+    if t.shape[0] < 3:
+        return np.empty(0, dtype=RECORD_DTYPE)
+
+    # ---  Smoothing on a regular step
+    dt = float(np.median(np.diff(t)))
+    m  = max(int(window / dt / 2.0 + 0.5), 2)
+    if t.shape[0] <= 2*m + 2:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    c0, c1 = _sgKernels(m)
+    hs = np.convolve(h, c0[::-1], mode='valid')     # h[m:-m] smoothed
+    ds = np.convolve(h, c1[::-1], mode='valid')     # dh/di on h[m:-m]
+    ts = t[m:t.shape[0]-m]
+
+    # ---  Sign of derivative, plateaus take the previous sign
+    s = np.sign(ds)
+    nz = np.where(s != 0, np.arange(s.shape[0]), 0)
+    np.maximum.accumulate(nz, out=nz)
+    s = s[nz]
+
+    # ---  Candidates at sign changes, excluding the bounds
+    i = np.nonzero(s[1:] != s[:-1])[0] + 1
+    i = i[(i > 0) & (i < hs.shape[0]-1) & (s[i-1] != 0)]
+    isHW = s[i-1] > 0
+
+    # ---  Parabolic refinement of the extremum
+    y0, y1, y2 = hs[i-1], hs[i], hs[i+1]
+    den = y0 - 2.0*y1 + y2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(den != 0.0, 0.5*(y0 - y2) / den, 0.0)
+    p = np.clip(p, -0.5, 0.5)
+    te = ts[i] + p*(ts[i+1] - ts[i-1])*0.5
+    he = y1 - 0.25*(y0 - y2)*p
+
+    # ---  Hysteresis on the candidates (few of them, plain loop)
+    keep = []
+    if i.shape[0] > 0:
+        cur = 0
+        for k in range(1, i.shape[0]):
+            if isHW[k] == isHW[cur]:
+                if (he[k] > he[cur]) == isHW[k]: cur = k
+            elif abs(he[k]-he[cur]) >= min_dh and (te[k]-te[cur]) >= min_dt:
+                keep.append(cur)
+                cur = k
+        keep.append(cur)
+    keep = np.array(keep, dtype=np.int64)
+
+    res = np.empty(keep.shape[0], dtype=RECORD_DTYPE)
+    res['dt'] = np.round(te[keep]).astype(np.int64).astype('datetime64[s]')
+    res['wl'] = he[keep]
+    res['hw'] = isHW[keep]
+    LOGGER.debug('findExtrema: %d samples, %d candidates, %d extrema', t.shape[0], i.shape[0], res.shape[0])
+    return res
+
+def extractHWLW(fname, **kwargs):
+    """
+    Read the water level series in fname and return the HW/LW
+    records as a structured array of RECORD_DTYPE.
+    kwargs are passed to findExtrema.
+    """
+    t, h = readSeries(fname)
+    return findExtrema(t, h, **kwargs)
+
+def toDatetime(dt64):
+    """
+    Convert a datetime64 to an UTC aware datetime.
+    """
+    s = int(dt64.astype('datetime64[s]').astype(np.int64))
+    return datetime.datetime.fromtimestamp(s, datetime.timezone.utc)
+
+if __name__ == '__main__':
+    import sys
+    import time
+    def main():
+        logHndlr = logging.StreamHandler()
+        FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        logHndlr.setFormatter( logging.Formatter(FORMAT) )
+
+        LOGGER.addHandler(logHndlr)
+        LOGGER.setLevel(logging.DEBUG)
+
+        if len(sys.argv) > 1:
+            t, h = readSeries(sys.argv[1])
+        else:
+            # ---  One year of synthetic 1' data
+            t = np.arange(0, 365*86400, 60, dtype=np.float64)
+            w = 2.0*np.pi / (12.42*3600.0)
+            h = 2.5 + 2.0*np.cos(w*t) + 0.3*np.cos(2*w*t + 0.5) + np.random.normal(0.0, 0.02, t.shape)
+        t0 = time.time()
+        r = findExtrema(t, h)
+        t1 = time.time()
+        print('%d samples, %d HW/LW in %.3fs' % (t.shape[0], r.shape[0], t1-t0))
+        for rr in r[:6]:
+            print('%s %s %.3f' % ('HW' if rr['hw'] else 'LW', toDatetime(rr['dt']).isoformat(), rr['wl']))
+
+    main()
@@ -48,6 +48,7 @@ from IPImageProcessor.GDAL import GDLBasemap
 
 from ASPathParameters import ASPathParameters, CLR_SRC
 from ASEvents         import ASEventMotion, ASEventMessage
+from ASModel          import getLevelForResolution
 
 LOGGER = logging.getLogger("INRS.ASur.panel.path.plot")
 FONT_SIZE  = 8
@@ -89,6 +90,7 @@ class ASLayer:
     """
     def __init__(self, plume):
         self.plume  = plume
+        self.txy    = None      # Path data as drawn, at the level of detail
         self.visible= True
         self.CSS    = []
 
@@ -179,6 +181,8 @@ class ASPanelPathPlot(ASPanelWxMPL):
         self.layers   = []      # main CS
         self.olPlgCS  = None    # Overlay
         self.nVisible = -1      # number of visible layers
+        self.plumes   = []      # plumes plotted
+        self.lodLevel = 0       # level of detail of the paths
 
         self.params = ASPathParameters()
 
@@ -193,6 +197,7 @@ class ASPanelPathPlot(ASPanelWxMPL):
 
         self.__setAxes()
         self.__setSrsProj()
+        self.axes.callbacks.connect('xlim_changed', self.on_xlim_changed)
 
     def on_mouse_click(self, evt):
         """
@@ -203,6 +208,29 @@ class ASPanelPathPlot(ASPanelWxMPL):
             msg = "Curseurs désactivés: trop de tracés (%d/%d)" % (self.nVisible, ASPanelPathPlot.DATA_CURSOR_NMAX)
             wx.PostEvent(self, ASEventMessage(self.GetId(), text=msg, timeout=1.5))
 
+    def on_xlim_changed(self, axes):
+        """
+        On zoom, replot the paths if the level of detail has changed
+        """
+        if not self.layers: return
+        if self.__getLODLevel() != self.lodLevel:
+            wx.CallAfter(self.__replotLOD)
+
+    def __getLODLevel(self):
+        """
+        Level of detail for the current screen scale
+        """
+        x0, x1 = self.axes.get_xlim()
+        w = self.axes.bbox.width
+        return getLevelForResolution(abs(x1-x0) / w) if w > 0 else 0
+
+    def __replotLOD(self):
+        LOGGER.trace('ASPanelPathPlot.__replotLOD: %d -> %d', self.lodLevel, self.__getLODLevel())
+        if self.__getLODLevel() == self.lodLevel: return
+        visible = [ layer.plume for layer in self.layers if layer.isVisible() ]
+        self.plotPlumes(self.plumes, draw=False)
+        self.updatePlumes(visible)
+
     def on_mouse_move(self, evt):
         """
         Overload version from parent to implement coord transform.
@@ -427,10 +455,11 @@ class ASPanelPathPlot(ASPanelWxMPL):
             jj = idx[0]
 
             plume = self.layers[ip].plume
+            txy   = self.layers[ip].txy
             ti = plume.injectionTime.astimezone(LOCAL_TZ)
-            t0 = plume.plume[ 0][0]
-            tx = plume.plume[jj][0]
-            cx = plume.plume[jj][3]
+            t0 = txy[ 0][0]
+            tx = txy[jj][0]
+            cx = txy[jj][3]
             dt = datetime.timedelta(seconds=(tx-t0))
             st0 = 't0={t:s}'.format(t=ti.isoformat())
             sta = 'ta={t:s}'.format(t=(ti+dt).isoformat())
@@ -455,11 +484,12 @@ class ASPanelPathPlot(ASPanelWxMPL):
             jj = idx[0]*st if st >= 0 else -1
 
             plume = self.layers[ip].plume
+            txy   = self.layers[ip].txy
             ti = plume.injectionTime.astimezone(LOCAL_TZ)
             cl = plume.dilution
-            t0 = plume.plume[0][0]
-            tx = plume.plume[jj][0]
-            cx = plume.plume[jj][3]
+            t0 = txy[0][0]
+            tx = txy[jj][0]
+            cx = txy[jj][3]
             dt = datetime.timedelta(seconds=(tx-t0))
             st0 = 't0={t:s}'.format(t=ti.isoformat())
             sta = 'ta={t:s}'.format(t=(ti+dt).isoformat())
@@ -480,13 +510,21 @@ class ASPanelPathPlot(ASPanelWxMPL):
 
     def setBackground(self, bbox, fmap, fshr):
         LOGGER.trace('setBackground')
-        llx, lly, llz = self.wgs2proj.TransformPoint(bbox[0], bbox[1])
-        hrx, hry, hrz = self.wgs2proj.TransformPoint(bbox[2], bbox[3])
         self.projBbox = bbox
-        self.window   = (llx, lly, hrx, hry)
+        self.window   = self.getProjectionWindow()
         self.bgMapFil = fmap
         self.bgShrFil = fshr
 
+    def getProjectionWindow(self):
+        """
+        Returns the projection bbox in projected coordinates, as
+        (xmin, ymin, xmax, ymax), or None if not set.
+        """
+        if not self.projBbox: return None
+        llx, lly, llz = self.wgs2proj.TransformPoint(self.projBbox[0], self.projBbox[1])
+        hrx, hry, hrz = self.wgs2proj.TransformPoint(self.projBbox[2], self.projBbox[3])
+        return (llx, lly, hrx, hry)
+
     def on_btn_pan(self, enable):
         super(ASPanelPathPlot, self).on_btn_pan(enable)
 
@@ -692,14 +730,21 @@ class ASPanelPathPlot(ASPanelWxMPL):
         self.__remove_all_CS()
         self.__drawBgnd()
 
+        # ---  The lazy plumes are loaded one layer at a time, at the level of detail of the screen
+        self.plumes   = plumes
+        self.lodLevel = self.__getLODLevel()
+        doDraw = self.params.doDrawPath or self.params.doDrawEllipse
+
         hasColor = False
         polys = {}
         for plume in plumes:
             polys[plume.parentName] = plume.stationPolygon
             if plume.stationName == 'Root': continue
-            if not plume.plume: continue
+            if not doDraw: continue
+            txy = plume.getPath(self.lodLevel)
+            if txy is None or len(txy) == 0: continue
 
-            txy = np.array(plume.plume)
+            txy = np.asarray(txy)
             # ---  Indice du temps de contact
             # Les temps sont en epoch par rapport à une référence bâtarde
             # Les temps inversés sont en négatifs
@@ -719,6 +764,7 @@ class ASPanelPathPlot(ASPanelWxMPL):
                 DT = dt - DT
 
             layer = ASLayer(plume)
+            layer.txy = txy
             # ---  Slices X et Y
             X = txy[:itx,1]
             Y = txy[:itx,2]
@@ -750,6 +796,8 @@ class ASPanelPathPlot(ASPanelWxMPL):
 
             layer.setVisible(True)
             self.layers.append(layer)
+            # ---  The layer holds the drawn data, release the full path
+            plume.unload()
 
         self.nVisible = len( [1 for layer in self.layers if layer.isVisible()] )
 
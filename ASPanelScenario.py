@@ -192,6 +192,7 @@ class ASPanelScenario(wx.Panel):
         agwStyle |= HTL.TR_ELLIPSIZE_LONG_ITEMS
 
         self.tree = HTL.HyperTreeList(self, wx.ID_ANY, agwStyle=agwStyle)
+        self.applied = {}   # { point id: (tini, tend, tides) } at the last Apply
 
         self.__set_properties()
         self.__do_layout()
@@ -245,6 +246,7 @@ class ASPanelScenario(wx.Panel):
             None
         """
         self.tree.Hide()
+        self.applied = {}
         pnts = {}
         for bbModel in bbModels:
             for pnt in bbModel.getPointNames():
@@ -340,6 +342,28 @@ class ASPanelScenario(wx.Panel):
             errMsg = '\n'.join(errLst)
         return errMsg, pnts
 
+    def getPointsChanged(self, overflows):
+        """
+        Compare the overflows to the ones of the last Apply.
+
+        Args:
+            overflows (list):   List of Overflow
+
+        Returns:
+            list:   Overflow new or modified since the last Apply
+            list:   Point ids no longer selected
+        """
+        crnt = set(o.name for o in overflows)
+        chgd = [ o for o in overflows if self.applied.get(o.name) != (o.tini, o.tend, tuple(o.tides)) ]
+        rmvd = [ n for n in self.applied if n not in crnt ]
+        return chgd, rmvd
+
+    def setPointsApplied(self, overflows):
+        """
+        Record the overflows of the Apply, reference for getPointsChanged.
+        """
+        self.applied = { o.name: (o.tini, o.tend, tuple(o.tides)) for o in overflows }
+
     @staticmethod
     def setNode3State(node):
         """
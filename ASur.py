@@ -227,6 +227,7 @@ class ASur(wx.Frame):
         self.dirname = ''
         self.bbModels = []
         self.bbCycles = []
+        self.applyRes = {}      # { (id(bbModel), point id): results of the last Apply }
         self.__initConfig()
 
     def __initConfig(self):
@@ -393,6 +394,7 @@ class ASur(wx.Frame):
     def __fillPoints(self):
         addTides = self.appMode is GlbModes.expert
         self.pnl_pnts.fillTree(self.bbModels, self.bbCycles, addTides)
+        self.applyRes = {}
 
     def __getCycles(self, bbModel):
         """
@@ -516,11 +518,27 @@ class ASur(wx.Frame):
                 res = [ item.GetText() ]
         return res
 
-    def __getPlotData(self, bbModel, overflows, do_merge):
+    def __getPlotAndPathDataIncr(self, bbModel, overflows, changed, do_merge):
         """
-        Compute the global arrival time windows
+        Compute the global arrival time windows and the paths, in one
+        pass per point. The results of the points not in changed,
+        unchanged since the last Apply, are reused.
+        """
+        res = []
+        pth = []
+        for ofl in overflows:
+            key = (id(bbModel), ofl.name)
+            if ofl.name in changed or key not in self.applyRes:
+                self.applyRes[key] = bbModel.getOverflowDataAndPlumes(ASur.CLC_DELTAT, [ofl], do_merge)
+            r, p = self.applyRes[key]
+            res.extend(r)
+            pth.extend(p)
+        return res, pth
+
+    def __getPlotSpan(self, res, overflows):
+        """
+        Time span, in days, of the arrival time windows
         """
-        res = bbModel.getOverflowData(ASur.CLC_DELTAT, overflows, do_merge)
         dtini = min(ofl.tini for ofl in overflows)
         dtmax = dtini
         for pt, dtaPt in res:
@@ -530,7 +548,7 @@ class ASur(wx.Frame):
                     dtmax_arr = dtaXpo[-1][0]
                     if dtmax_arr: dtmax = max(dtmax, dtmax_arr)
         ndays = (dtmax - dtini).days + 1
-        return res, (dtini, dtini+datetime.timedelta(days=ndays))
+        return (dtini, dtini+datetime.timedelta(days=ndays))
 
     def __getPlotDataZoom(self, bbModel, dtini, dtfin, pts, do_merge):
         """
@@ -551,12 +569,6 @@ class ASur(wx.Frame):
         ndays = (dtmax - dtini).days + 1
         return res, (dtini, dtini+datetime.timedelta(days=ndays))
 
-    def __getPathData(self, bbModel, overflows):
-        """
-        """
-        res = bbModel.getOverflowPlumes(ASur.CLC_DELTAT, overflows)
-        return res
-
     def __printPlotData(self, dta):
         """
         """
@@ -680,6 +692,9 @@ class ASur(wx.Frame):
     def on_btn_apply(self, event):
         errMsg = ''
         erMsg, overflows = self.pnl_pnts.getPointsChecked()
+        changed, removed = self.pnl_pnts.getPointsChanged(overflows)
+        changed = set(ofl.name for ofl in changed)
+        self.LOGGER.debug('on_btn_apply: %d points changed, %d removed', len(changed), len(removed))
 
         wx.BeginBusyCursor()
         try:
@@ -691,8 +706,8 @@ class ASur(wx.Frame):
             # ---  With 1 model, do not merge transfer times
             if len(self.bbModels) == 1:
                 bbModel = self.bbModels[0]
-                dtaGlb, (dtmin_, dtmax_) = self.__getPlotData(bbModel, overflows, False)
-                pthGlb                   = self.__getPathData(bbModel, overflows)
+                dtaGlb, pthGlb = self.__getPlotAndPathDataIncr(bbModel, overflows, changed, False)
+                dtmin_, dtmax_ = self.__getPlotSpan(dtaGlb, overflows)
                 for ofl in overflows:
                     dtini = min(dtini, ofl.tini)
                     dtfin = max(dtfin, ofl.tend)
@@ -701,10 +716,13 @@ class ASur(wx.Frame):
                 self.pnl_slin.plotPaths(self.bbModels[0], pthGlb, dtini, dtfin, dtmax)
             # ---  With many models, merge transfer times and reorganize
             else:
+                pthMdl = {}
                 for ofl in overflows:
                     dtaPt = []
                     for bbModel in reversed(self.bbModels):
-                        dta, (dtmin_, dtmax_) = self.__getPlotData(bbModel, [ofl], True)
+                        dta, pth = self.__getPlotAndPathDataIncr(bbModel, [ofl], changed, True)
+                        dtmin_, dtmax_ = self.__getPlotSpan(dta, [ofl])
+                        pthMdl[(id(bbModel), id(ofl))] = pth
                         #self.__printPlotData(dta)
                         dtini = min(dtini, ofl.tini)
                         dtfin = max(dtfin, ofl.tend)
@@ -719,10 +737,13 @@ class ASur(wx.Frame):
 
                 for bbModel in reversed(self.bbModels):
                     for ofl in overflows:
-                        pth = self.__getPathData(bbModel, [ofl])
-                        pthGlb.extend( pth )
+                        pthGlb.extend( pthMdl[(id(bbModel), id(ofl))] )
                 self.pnl_slin.plotPaths(self.bbModels[0], pthGlb, dtini, dtfin, dtmax)
 
+            # ---  Keep the results of the selection only
+            names = set(ofl.name for ofl in overflows)
+            self.applyRes = { k: v for k, v in self.applyRes.items() if k[1] in names }
+            self.pnl_pnts.setPointsApplied(overflows)
             self.__set_state(GlbStates.data_loaded, BtnStates.on)
         except Exception as e:
             self.LOGGER.error('%s\n%s', str(e), traceback.format_exc())
@@ -742,7 +763,9 @@ class ASur(wx.Frame):
                 return
         # ---  Construct model
         self.LOGGER.trace('__do_mnu_open: %s', dirname)
-        self.bbModels.append( ASModel.ASModel(dirname) )
+        bbModel = ASModel.ASModel(dirname)
+        bbModel.setPathQuantization(self.pnl_slin.getProjectionWindow())
+        self.bbModels.append( bbModel )
         self.bbModels.sort(key = ASModel.ASModel.getDataDir)
         # ---  Fill active cycles list
         self.bbCycles = self.__getAllActivCycles()
@@ -968,6 +991,9 @@ class ASur(wx.Frame):
 
                 translator.loadFromFile(prm.fileTrnsl)
                 self.pnl_slin.setBackground(prm.projBbox, prm.fileBgnd, prm.fileShore)
+                bbox = self.pnl_slin.getProjectionWindow()
+                for bbModel in self.bbModels:
+                    bbModel.setPathQuantization(bbox)
         except Exception as e:
             self.LOGGER.error('%s\n%s', str(e), traceback.format_exc())
             errMsg = str(e)
@@ -20,7 +20,7 @@ ASModel_path = [
    os.path.join(ROOTDIR, 'ASModel'),
    os.path.join(os.environ['INRS_DEV'], 'H2D2-tools', 'script'),
    ]
-ASCmp = ('tide', 'river', 'station', 'overflow', 'asplume', 'asclass', 'asapi', '__init__')
+ASCmp = ('tide', 'tideseries', 'river', 'lrucache', 'diskcache', 'pathstore', 'aswindows', 'asclimate', 'station', 'overflow', 'asplume', 'asclass', 'asapi', '__init__')
 ASModel_hiddenimports = ['ASModel.'+c for c in ASCmp[:-1] ]
 ASModel_binaries = [
     ]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+
+import os
+
+from ASModel.diskcache import DiskCache, getKeyHash
+
+def test_key_hash():
+    assert getKeyHash(['data', 'P00', 900.0]) == getKeyHash(['data', 'P00', 900.0])
+    assert getKeyHash(['data', 'P00', 900.0]) != getKeyHash(['data', 'P01', 900.0])
+
+def test_get_put(tmp_path):
+    c = DiskCache(str(tmp_path / 'c.sqlite'))
+    assert c.get('fp', 'k') is None
+    v = [[['2019-03-10T04:00:00', 1.5]], [], {'a': None}]
+    c.put('fp', 'k', v)
+    assert c.get('fp', 'k') == v
+    assert c.get('other', 'k') is None
+    c.put('fp', 'k', 2)
+    assert c.get('fp', 'k') == 2
+    c.close()
+
+def test_persistent(tmp_path):
+    fname = str(tmp_path / 'c.sqlite')
+    c = DiskCache(fname)
+    c.put('fp', 'k', {'x': 1})
+    c.close()
+    c = DiskCache(fname)
+    assert c.get('fp', 'k') == {'x': 1}
+    c.close()
+
+def test_shared(tmp_path):
+    fname = str(tmp_path / 'c.sqlite')
+    c1 = DiskCache(fname)
+    c2 = DiskCache(fname)
+    c1.put('fp', 'k', 1)
+    assert c2.get('fp', 'k') == 1
+    c1.close()
+    c2.close()
+
+def test_clear(tmp_path):
+    c = DiskCache(str(tmp_path / 'c.sqlite'))
+    c.put('fp1', 'k', 1)
+    c.put('fp2', 'k', 2)
+    c.clear('fp1')
+    assert c.get('fp1', 'k') is None
+    assert c.get('fp2', 'k') == 2
+    c.clear()
+    assert c.get('fp2', 'k') is None
+    c.close()
+
+def test_trim(tmp_path):
+    c = DiskCache(str(tmp_path / 'c.sqlite'), maxBytes=10**9)
+    v = os.urandom(2000).hex()      # Not compressible
+    for i in range(10):
+        c.put('fp', 'k%d' % i, v)
+    c.get('fp', 'k0')               # k0 is now the most recently used
+    c.m_max = 5000
+    c.trim()
+    assert c.get('fp', 'k0') == v
+    assert c.get('fp', 'k1') is None
+    assert c.getStats()['bytes'] <= 5000
+    c.close()
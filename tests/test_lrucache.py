@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+from ASModel.lrucache import LRUCache
+
+def test_get_put():
+    c = LRUCache(100)
+    assert c.get('a') is None
+    assert c.get('a', 1) == 1
+    c.put('a', 'A', 10)
+    assert c.get('a') == 'A'
+    assert 'a' in c
+    assert len(c) == 1
+    s = c.getStats()
+    assert (s['hits'], s['misses'], s['bytes']) == (1, 2, 10)
+
+def test_replace():
+    c = LRUCache(100)
+    c.put('a', 'A', 10)
+    c.put('a', 'B', 30)
+    assert c.get('a') == 'B'
+    assert c.getStats()['bytes'] == 30
+
+def test_evict_least_recently_used():
+    c = LRUCache(30)
+    c.put('a', 'A', 10)
+    c.put('b', 'B', 10)
+    c.put('c', 'C', 10)
+    c.get('a')                  # b is now the least recently used
+    c.put('d', 'D', 10)
+    assert 'a' in c and 'c' in c and 'd' in c
+    assert 'b' not in c
+    s = c.getStats()
+    assert (s['items'], s['bytes'], s['evictions']) == (3, 30, 1)
+
+def test_too_big_not_kept():
+    c = LRUCache(30)
+    c.put('a', 'A', 10)
+    c.put('b', 'B', 40)
+    assert 'b' not in c
+    assert c.get('a') == 'A'
+
+def test_sizeof():
+    c = LRUCache(10, sizeof=len)
+    c.put('a', 'xxxxxx')
+    c.put('b', 'yyyyyy')
+    assert 'a' not in c
+    assert c.getStats()['bytes'] == 6
+
+def test_set_max_bytes():
+    c = LRUCache(100)
+    for k in 'abcde':
+        c.put(k, k, 10)
+    c.setMaxBytes(20)
+    assert sorted(c.m_items) == ['d', 'e']
+    assert c.getMaxBytes() == 20
+
+def test_pop_clear():
+    c = LRUCache(100)
+    c.put('a', 'A', 10)
+    c.put('b', 'B', 10)
+    assert c.pop('a') == 'A'
+    assert c.pop('a', 0) == 0
+    assert c.getStats()['bytes'] == 10
+    c.clear()
+    assert len(c) == 0
+    assert c.getStats()['bytes'] == 0
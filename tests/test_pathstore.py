@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from ASModel.pathstore import PATH_CACHE, PATH_NCOLS, LOD_TOLERANCES
+from ASModel.pathstore import PathStore, QuantizedPath, packPaths, normalizePath, simplifyPath, getPathFileName
+
+def makePath(seed, n=200):
+    """
+    Random walk path, as the list of rows of the path files
+    """
+    rnd = np.random.default_rng(seed)
+    pth = np.zeros((n, PATH_NCOLS))
+    pth[:,0] = np.arange(n) * 60.0
+    pth[:,1] = 640000.0 + np.cumsum(rnd.normal(0.0, 20.0, n))
+    pth[:,2] = 5190000.0 + np.cumsum(rnd.normal(0.0, 20.0, n))
+    pth[:,3] = np.linspace(1.0, 1.0e-4, n)
+    pth[:,4] = 50.0
+    pth[:,5] = 40.0
+    pth[:,6] = rnd.uniform(-np.pi, np.pi, n)
+    return pth.tolist()
+
+@pytest.fixture
+def dataDir(tmp_path):
+    """
+    Dataset with 3 paths in 2 directories, one of them in both
+    """
+    PATH_CACHE.clear()
+    paths = {}
+    for sub, seeds in (('P00', (0, 1)), ('P01', (1, 2))):
+        os.mkdir(str(tmp_path / sub))
+        for seed in seeds:
+            pth = makePath(seed)
+            md5 = hashlib.md5(str(seed).encode('ascii')).hexdigest()
+            with open(str(tmp_path / sub / getPathFileName(md5)), 'wb') as f:
+                pickle.dump(pth, f)
+            paths[md5] = pth
+    yield str(tmp_path), paths
+    PATH_CACHE.clear()
+
+def test_simplify_path():
+    xy = np.column_stack( (np.arange(10.0), np.zeros(10)) )
+    assert simplifyPath(xy, 1.0).tolist() == [0, 9]
+    xy[5,1] = 5.0
+    assert simplifyPath(xy, 1.0).tolist() == [0, 4, 5, 6, 9]
+    assert simplifyPath(xy, 10.0).tolist() == [0, 9]
+
+def test_read_path_files(dataDir):
+    dataDir, paths = dataDir
+    dirs = [ os.path.join(dataDir, 'P00'), os.path.join(dataDir, 'P01') ]
+    store = PathStore(dataDir)
+    assert not store.isPacked()
+    for md5, pth in paths.items():
+        r = store.getPath(md5, dirs)
+        assert r.dtype == np.float32 and r.shape == (len(pth), PATH_NCOLS)
+        assert np.array_equal(r, normalizePath(pth))
+        assert store.getPathLength(md5) == -1
+    assert store.getPath('0'*32, dirs) is None
+
+def test_pack_round_trip(dataDir):
+    dataDir, paths = dataDir
+    assert packPaths(dataDir) == len(paths)
+    store = PathStore(dataDir)
+    assert store.isPacked()
+    for md5, pth in paths.items():
+        r = store.getPath(md5)
+        assert np.array_equal(r, normalizePath(pth))
+        assert store.getPathLength(md5) == len(pth)
+    assert store.getPath('0'*32) is None
+
+def test_pack_levels_of_detail(dataDir):
+    dataDir, paths = dataDir
+    dirs = [ os.path.join(dataDir, 'P00'), os.path.join(dataDir, 'P01') ]
+    ref = {}
+    for level in range(1, len(LOD_TOLERANCES)+1):
+        for md5 in paths:
+            ref[(md5, level)] = PathStore(dataDir).getPath(md5, dirs, level)
+    PATH_CACHE.clear()
+    packPaths(dataDir)
+    store = PathStore(dataDir)
+    for (md5, level), pth in ref.items():
+        r = store.getPath(md5, level=level)
+        assert r.shape[0] < len(paths[md5])
+        assert np.array_equal(r, pth)
+
+def test_quantized_path():
+    pth = np.array(makePath(0))
+    bbox = (630000.0, 5180000.0, 650000.0, 5200000.0)
+    q = QuantizedPath(pth, bbox)
+    assert len(q) == pth.shape[0]
+    assert q.nbytes < normalizePath(pth).nbytes
+    r = q.decode()
+    scl = 20000.0 / (2*QuantizedPath.QMAX)
+    assert r.dtype == np.float32 and r.shape == pth.shape
+    assert np.allclose(r[:,[0,3]], pth[:,[0,3]], rtol=1.0e-6)
+    tol = 0.5*scl + np.spacing(np.float32(5200000.0))     # Quantization, then float32 rounding
+    assert np.abs(r[:,1:3] - pth[:,1:3]).max() <= tol
+    assert np.abs(r[:,4:6] - pth[:,4:6]).max() <= 0.5*scl + 1.0e-5
+    dag = np.remainder(r[:,6] - pth[:,6] + np.pi, 2*np.pi) - np.pi
+    assert np.abs(dag).max() <= 2*np.pi/QuantizedPath.QMAX
+
+def test_quantized_path_outside_bbox():
+    with pytest.raises(ValueError):
+        QuantizedPath(np.array(makePath(0)), (0.0, 0.0, 1000.0, 1000.0))
+
+def test_quantization(dataDir):
+    dataDir, paths = dataDir
+    dirs = [ os.path.join(dataDir, 'P00'), os.path.join(dataDir, 'P01') ]
+    store = PathStore(dataDir)
+    store.setQuantization( (630000.0, 5180000.0, 650000.0, 5200000.0) )
+    for md5, pth in paths.items():
+        store.getPath(md5, dirs)
+        assert isinstance(PATH_CACHE.get(md5), QuantizedPath)
+        r = store.getPath(md5, dirs)        # Decoded from PATH_CACHE
+        assert np.abs(r[:,1:3] - np.array(pth)[:,1:3]).max() <= 1.0
+    store.setQuantization(None)
+    assert store.getQuantization() is None
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#************************************************************************
+# --- Copyright (c) Yves Secretan 2018
+# ---
+# --- Licensed under the Apache License, Version 2.0 (the "License");
+# --- you may not use this file except in compliance with the License.
+# --- You may obtain a copy of the License at
+# ---
+# ---     http://www.apache.org/licenses/LICENSE-2.0
+# ---
+# --- Unless required by applicable law or agreed to in writing, software
+# --- distributed under the License is distributed on an "AS IS" BASIS,
+# --- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# --- See the License for the specific language governing permissions and
+# --- limitations under the License.
+#************************************************************************
+
+
+import datetime
+
+import numpy as np
+import pytest
+
+from ASModel.tideseries import RECORD_DTYPE, findExtrema, extractHWLW, readSeries, toDatetime
+
+T0     = 1552190400.0           # 2019-03-10 04:00 UTC
+PERIOD = 12.42*3600.0           # M2 [s]
+AMPL   = 2.0                    # [m]
+
+def makeSeries(days=3, dt=60.0, noise=0.0, seed=0):
+    """
+    Semi-diurnal water level series, with HW at T0 + k*PERIOD
+    """
+    t = T0 + np.arange(0.0, days*86400.0, dt)
+    h = AMPL*np.cos(2*np.pi*(t-T0)/PERIOD)
+    if noise > 0.0:
+        h += np.random.default_rng(seed).normal(0.0, noise, t.shape[0])
+    return t, h
+
+def checkExtrema(r, t, dtmax=5*60.0, dhmax=0.02):
+    assert r.dtype == RECORD_DTYPE
+    assert np.all(r['hw'][1:] != r['hw'][:-1])       # Alternating HW and LW
+    te = r['dt'].astype(np.int64).astype(np.float64)
+    k  = np.round((te - T0) / (PERIOD/2))
+    assert np.all(r['hw'] == (k % 2 == 0))
+    assert np.abs(te - (T0 + k*PERIOD/2)).max() <= dtmax
+    assert np.abs(np.abs(r['wl']) - AMPL).max() <= dhmax
+    # ---  All the inner extrema are found
+    assert r.shape[0] >= int((t[-1]-t[0]) / (PERIOD/2)) - 1
+
+def test_find_extrema():
+    t, h = makeSeries()
+    checkExtrema(findExtrema(t, h), t)
+
+def test_find_extrema_noise():
+    # ---  The extrema are flat, noise shifts them in time more than in height
+    t, h = makeSeries(noise=0.05)
+    checkExtrema(findExtrema(t, h), t, dtmax=15*60.0, dhmax=0.05)
+
+def test_find_extrema_min_dh():
+    # ---  Small oscillations of a flat signal are not extrema
+    t = T0 + np.arange(0.0, 86400.0, 60.0)
+    h = 0.02*np.sin(2*np.pi*(t-T0)/(4*3600.0))
+    assert findExtrema(t, h).shape[0] <= 1
+
+def test_find_extrema_short():
+    assert findExtrema([T0, T0+60.0], [0.0, 1.0]).shape[0] == 0
+    t, h = makeSeries(days=0.02)
+    assert findExtrema(t, h).shape[0] == 0
+
+@pytest.mark.parametrize('ext', ['.txt', '.npy', '.npz'])
+def test_read_series(tmp_path, ext):
+    t, h = makeSeries(days=1, dt=600.0)
+    fname = str(tmp_path / ('wl' + ext))
+    if ext == '.txt':
+        with open(fname, 'w', encoding='utf-8') as f:
+            f.write('# Test series\n')
+            for ti, hi in zip(t, h):
+                f.write('%s; %.4f\n' % (toDatetime(np.datetime64(int(ti), 's')).isoformat(), hi))
+    elif ext == '.npy':
+        np.save(fname, np.column_stack((t, h)))
+    else:
+        np.savez(fname, t=t.astype('datetime64[s]').astype(np.int64).astype('datetime64[s]'), h=h)
+    tr, hr = readSeries(fname)
+    assert np.array_equal(tr, t)
+    assert np.allclose(hr, h, atol=1.0e-4)
+
+def test_extract_hwlw(tmp_path):
+    t, h = makeSeries()
+    fname = str(tmp_path / 'wl.npy')
+    np.save(fname, np.column_stack((t, h)))
+    checkExtrema(extractHWLW(fname), t)
+
+def test_to_datetime():
+    dt = toDatetime(np.datetime64(int(T0), 's'))
+    assert dt == datetime.datetime(2019, 3, 10, 4, 0, tzinfo=datetime.timezone.utc)